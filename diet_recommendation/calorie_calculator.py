@@ -1,4 +1,20 @@
 # calorie_calculator.py
+import numpy as np
+
+ACTIVITY_MULTIPLIERS = {
+    "sedentary": 1.2,
+    "lightly active": 1.375,
+    "moderately active": 1.55,
+    "very active": 1.725
+}
+DEFAULT_ACTIVITY_MULTIPLIER = 1.2
+
+# Daily kcal deficit or surplus per kg/week of weight change (0.5 kg/week → 500 kcal)
+KCAL_PER_KG_WEEK = 1000
+# Sign of the adjustment per goal; anything else is maintenance
+GOAL_DIRECTIONS = {"weight loss": -1, "muscle gain": 1}
+LOSS_RATES = [0.25, 0.5, 1.0]  # kg/week
+GAIN_RATES = [0.25, 0.5, 0.75]
 
 def calculate_bmr(age, gender, weight, height):
     """
@@ -14,13 +30,14 @@ def calculate_tdee(bmr, activity_level):
     """
     Calculate Total Daily Energy Expenditure (TDEE).
     """
-    activity_multipliers = {
-        "sedentary": 1.2,
-        "lightly active": 1.375,
-        "moderately active": 1.55,
-        "very active": 1.725
-    }
-    return bmr * activity_multipliers.get(activity_level.lower(), 1.2)
+    return bmr * ACTIVITY_MULTIPLIERS.get(activity_level.lower(), DEFAULT_ACTIVITY_MULTIPLIER)
+
+def calorie_adjustment(goal, rate):
+    """
+    Daily kcal deficit (negative) or surplus for a goal and a rate of
+    weight change in kg/week.
+    """
+    return GOAL_DIRECTIONS.get(goal.lower(), 0) * rate * KCAL_PER_KG_WEEK
 
 def get_calorie_goal(tdee, goal, weight):
     """
@@ -32,14 +49,14 @@ def get_calorie_goal(tdee, goal, weight):
         print("2. Moderate (0.5 kg/week) → 500 kcal deficit")
         print("3. Aggressive (1 kg/week) → 1000 kcal deficit")
         choice = int(input("Enter your choice (1/2/3): "))
-        adjustment = [-250, -500, -1000][choice - 1]
+        adjustment = calorie_adjustment(goal, LOSS_RATES[choice - 1])
     elif goal.lower() == "muscle gain":
         print("Choose your muscle gain speed:")
         print("1. Slow (0.25 kg/week) → 250 kcal surplus")
         print("2. Moderate (0.5 kg/week) → 500 kcal surplus")
         print("3. Fast (0.75 kg/week) → 750 kcal surplus")
         choice = int(input("Enter your choice (1/2/3): "))
-        adjustment = [250, 500, 750][choice - 1]
+        adjustment = calorie_adjustment(goal, GAIN_RATES[choice - 1])
     else:
         adjustment = 0  # Maintenance mode, no change in calories
     return tdee + adjustment
@@ -59,6 +76,44 @@ def calculate_macronutrients(calories, weight):
     
     return protein_min, protein_max, fats, carbs, fiber
 
+def _lookup(values, table, default):
+    # Map strings to numbers once per distinct value, then gather
+    codes = {}
+    index = np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.intp)
+    return np.array([table.get(value.lower(), default) for value in codes], dtype=float)[index]
+
+def batch_targets(ages, genders, weights, heights, activity_levels, goals, rates=0.5):
+    """
+    BMR, TDEE, calorie goal and macronutrients for many people in one pass,
+    without prompts. Arguments are sequences of the same length; `rates`
+    (kg/week of weight change, ignored for maintenance) can also be one
+    number for everyone.
+
+    Returns a dict of float arrays with the keys bmr, tdee, calories,
+    protein_min, protein_max, fats, carbs and fiber, matching the
+    single-person functions above.
+    """
+    ages = np.asarray(ages, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    heights = np.asarray(heights, dtype=float)
+    male = _lookup(genders, {"male": 1.0}, 0.0).astype(bool)
+
+    bmr = 10 * weights + 6.25 * heights - 5 * ages + np.where(male, 5, -161)
+    tdee = bmr * _lookup(activity_levels, ACTIVITY_MULTIPLIERS, DEFAULT_ACTIVITY_MULTIPLIER)
+    calories = tdee + _lookup(goals, GOAL_DIRECTIONS, 0) * np.asarray(rates, dtype=float) * KCAL_PER_KG_WEEK
+    protein_min, protein_max, fats, carbs, fiber = calculate_macronutrients(calories, weights)
+
+    return {
+        "bmr": bmr,
+        "tdee": tdee,
+        "calories": calories,
+        "protein_min": protein_min,
+        "protein_max": protein_max,
+        "fats": fats,
+        "carbs": carbs,
+        "fiber": fiber,
+    }
+
 # Example usage
 if __name__ == "__main__":
     age = int(input("Enter age: "))
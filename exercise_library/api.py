@@ -0,0 +1,303 @@
+"""
+HTTP API over the exercise tracker, for the frontend:
+
+    PUT  /users/{user}                   {"weight_kg": 72.5}
+    POST /users/{user}/logs              {"entries": [entry, ...]}, a whole workout at once;
+                                         the reply lists the PRs it set
+    GET  /users/{user}/logs              ?limit=50&cursor=...  newest first
+    GET  /users/{user}/sessions          ?n=5
+    GET  /users/{user}/summary           ?period=week&dimension=muscle_group&since=&until=
+    GET  /users/{user}/volume            ?day=YYYY-MM-DD
+    GET  /users/{user}/records
+    GET  /users/{user}/progress          ?exercise=  1RM estimates, rep maxes, volume trend
+    GET  /exercises/search               ?q=&limit=10&muscle_group=&cardio=
+
+Entries are the dicts exercise_tracker logs. Calories are computed (in one
+vectorized pass per request) for entries that do not bring their own.
+
+SQLite calls are blocking, so they run on a small thread pool; every pool
+thread keeps its own connection to the database (LogStore opens one per
+thread), which makes the pool a connection pool of DB_POOL_SIZE.
+
+Run with `python api.py` (port EXERCISE_API_PORT, default 8001).
+"""
+import asyncio
+import base64
+import functools
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from calories import batch_calories
+from catalog import get_catalog
+from exercise_table import TABLE
+from log_store import TIMESTAMP_FORMAT, get_log_store
+from rollups import DIMENSIONS, PERIODS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("exercise_api")
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 4))
+MAX_BATCH = 500
+MAX_PAGE = 200
+# Largest duration, speed, weight or calories an entry may carry
+MAX_NUMBER = 1_000_000
+MAX_REPS = 1000
+# Everything else (exercise_id, user, id, ...) is derived by the server
+ENTRY_FIELDS = {"type", "exercise", "muscle_group", "variant", "sets", "duration_min", "speed_kmh", "incline",
+                "calories", "logged_at"}
+
+app = FastAPI()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Adjust in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+store = get_log_store()
+db_pool = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="log-store")
+
+
+async def run_db(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_pool, functools.partial(fn, *args, **kwargs))
+
+
+def error(status_code, message):
+    return JSONResponse(status_code=status_code, content={"error": message})
+
+
+def _number(entry, key, required=False):
+    value = entry.get(key)
+    if value is None:
+        if required:
+            raise ValueError(f"{key} is required")
+        return None
+    # Python's JSON parser accepts NaN and Infinity, and integers of any size
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0 or value > MAX_NUMBER \
+            or not math.isfinite(value):
+        raise ValueError(f"{key} must be a number from 0 to {MAX_NUMBER}")
+    return value
+
+
+def validate_entry(entry):
+    """
+    Check one submitted log entry and return (entry, logged_at datetime).
+    Raises ValueError.
+    """
+    if not isinstance(entry, dict):
+        raise ValueError("Each entry must be an object")
+    unknown = set(entry) - ENTRY_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown entry fields: {', '.join(sorted(map(str, unknown)))}")
+    entry = dict(entry)
+
+    if entry.get("type") not in ("strength", "cardio"):
+        raise ValueError("type must be 'strength' or 'cardio'")
+    if not isinstance(entry.get("exercise"), str) or not entry["exercise"].strip():
+        raise ValueError("exercise is required")
+    for key in ("muscle_group", "variant"):
+        if entry.get(key) is not None and not isinstance(entry[key], str):
+            raise ValueError(f"{key} must be a string")
+
+    for key in ("duration_min", "speed_kmh", "incline", "calories"):
+        _number(entry, key)
+
+    if entry["type"] == "strength":
+        sets = entry.get("sets")
+        if not isinstance(sets, list) or not sets:
+            raise ValueError("Strength entries need a list of sets")
+        entry["sets"] = []
+        for i, s in enumerate(sets, 1):
+            if not isinstance(s, dict) or not isinstance(s.get("reps"), int) or isinstance(s["reps"], bool) \
+                    or not 0 <= s["reps"] <= MAX_REPS:
+                raise ValueError(f"Every set needs an integer reps from 0 to {MAX_REPS}")
+            entry["sets"].append({"set": i, "reps": s["reps"], "weight": _number(s, "weight") or 0.0})
+    elif "sets" in entry:
+        raise ValueError("Cardio entries have no sets")
+
+    if entry.get("calories") is None:
+        _number(entry, "duration_min", required=True)
+
+    logged_at = entry.pop("logged_at", None)
+    if logged_at is None:
+        logged_at = datetime.now()
+    else:
+        try:
+            logged_at = datetime.fromisoformat(logged_at)
+        except (TypeError, ValueError):
+            raise ValueError("logged_at must be an ISO timestamp")
+        if logged_at.tzinfo is not None:
+            # Logs are stored in naive local time
+            logged_at = logged_at.astimezone().replace(tzinfo=None)
+    return entry, logged_at
+
+
+def encode_cursor(cursor):
+    if cursor is None:
+        return None
+    logged_at, log_id = cursor
+    return base64.urlsafe_b64encode(f"{logged_at}|{log_id}".encode()).decode()
+
+
+def decode_cursor(value):
+    try:
+        logged_at, log_id = base64.urlsafe_b64decode(value.encode()).decode().rsplit("|", 1)
+        datetime.strptime(logged_at, TIMESTAMP_FORMAT)
+        return logged_at, int(log_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_date(value, name):
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
+
+
+def save_entries(user, entries):
+    # Compute missing calories for the whole batch at once, then store it in one transaction
+    missing = [i for i, (entry, _) in enumerate(entries) if entry.get("calories") is None]
+    if missing:
+        weight = store.get_user_weight(user)
+        picked = [entries[i][0] for i in missing]
+        calories = batch_calories(
+            [entry["exercise"] for entry in picked],
+            [entry["type"] == "cardio" for entry in picked],
+            [entry["duration_min"] for entry in picked],
+            [weight] * len(picked),
+            [entry.get("speed_kmh") or 0 for entry in picked],
+            [entry.get("incline") or 0 for entry in picked],
+        )
+        for entry, value in zip(picked, calories.tolist()):
+            entry["calories"] = value
+
+    events = []
+    ids = store.add_many(((user, entry, logged_at) for entry, logged_at in entries), events=events)
+    logs = [{"id": log_id, "calories": entry["calories"]} for log_id, (entry, _) in zip(ids, entries)]
+    return logs, events
+
+
+@app.put("/users/{user}")
+async def set_user(user: str, request: Request):
+    try:
+        body = await request.json()
+        weight_kg = body.get("weight_kg") if isinstance(body, dict) else None
+        if not isinstance(weight_kg, (int, float)) or isinstance(weight_kg, bool) or not 20 <= weight_kg <= 400:
+            raise ValueError("weight_kg must be a number from 20 to 400")
+    except ValueError as e:
+        return error(400, str(e))
+
+    await run_db(store.set_user_weight, user, weight_kg)
+    return {"user": user, "weight_kg": weight_kg}
+
+
+@app.post("/users/{user}/logs")
+async def submit_logs(user: str, request: Request):
+    try:
+        body = await request.json()
+        entries = body.get("entries") if isinstance(body, dict) else body
+        if not isinstance(entries, list) or not entries:
+            raise ValueError("Send a non-empty list of entries")
+        if len(entries) > MAX_BATCH:
+            raise ValueError(f"At most {MAX_BATCH} entries per request")
+        entries = [validate_entry(entry) for entry in entries]
+    except ValueError as e:
+        return error(400, f"Invalid entries: {str(e)}")
+
+    saved, events = await run_db(save_entries, user, entries)
+    logger.info(f"Stored {len(saved)} entries for {user}")
+    return JSONResponse(status_code=201, content={"logs": saved, "records": events})
+
+
+@app.get("/users/{user}/logs")
+async def get_logs(user: str, limit: int = 50, cursor: str = None):
+    try:
+        if not 1 <= limit <= MAX_PAGE:
+            raise ValueError(f"limit must be from 1 to {MAX_PAGE}")
+        cursor = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return error(400, str(e))
+
+    entries, next_cursor = await run_db(store.page, user, limit, cursor)
+    return {"logs": entries, "next_cursor": encode_cursor(next_cursor)}
+
+
+@app.get("/users/{user}/sessions")
+async def get_sessions(user: str, n: int = 5):
+    if not 1 <= n <= 100:
+        return error(400, "n must be from 1 to 100")
+    return {"sessions": await run_db(store.last_sessions, user, n)}
+
+
+@app.get("/users/{user}/summary")
+async def get_summary(user: str, period: str = "week", dimension: str = "all", since: str = None,
+                      until: str = None):
+    try:
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"dimension must be one of {', '.join(DIMENSIONS)}")
+        since, until = parse_date(since, "since"), parse_date(until, "until")
+    except ValueError as e:
+        return error(400, str(e))
+
+    return {"buckets": await run_db(store.summary, user, period, dimension, since, until)}
+
+
+@app.get("/users/{user}/volume")
+async def get_volume(user: str, day: str = None):
+    try:
+        day = parse_date(day, "day")
+    except ValueError as e:
+        return error(400, str(e))
+    return {"muscle_groups": await run_db(store.volume_by_muscle_group, user, day)}
+
+
+@app.get("/users/{user}/records")
+async def get_records(user: str):
+    return {"records": await run_db(store.personal_records, user)}
+
+
+@app.get("/users/{user}/progress")
+async def get_progress(user: str, exercise: str = None):
+    return {"exercises": await run_db(store.progress, user, exercise)}
+
+
+@app.get("/exercises/search")
+async def search_exercises(q: str, limit: int = 10, muscle_group: str = None, cardio: bool = None):
+    if not 1 <= limit <= 50:
+        return error(400, "limit must be from 1 to 50")
+
+    # The index is in memory and answers in well under a millisecond
+    results = []
+    for match in get_catalog().search(q, limit, muscle_group=muscle_group, cardio=cardio):
+        results.append(dict(
+            match.exercise.to_dict(),
+            variant=match.variant,
+            exercise_id=TABLE.id_for(match.exercise.name, match.variant),
+            score=match.score,
+        ))
+    return {"results": results}
+
+
+@app.get("/")
+def read_root():
+    return {"status": "Exercise tracker API is running", "exercises": len(TABLE)}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("api:app", host="0.0.0.0", port=int(os.environ.get("EXERCISE_API_PORT", 8001)))
@@ -0,0 +1,139 @@
+"""
+Calorie estimates for logged exercises, one at a time or for a whole log
+history at once.
+
+Rates come precomputed from the compiled exercise table; names that are not
+in it (cardio typed in by hand) go through the keyword rules once and are
+cached. The batch functions work on numpy arrays, one row per log entry,
+and can take exercise ids instead of names.
+
+After changing the rates in exercise_data, recompute every stored log:
+    python calories.py recalculate [--user NAME]
+or only the logs stored without calories (e.g. imported ones):
+    python calories.py recalculate --missing
+"""
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+from exercise_data import DEFAULT_CARDIO_MET, DEFAULT_STRENGTH_RATE
+from exercise_table import TABLE, cardio_met_for_name, strength_class, strength_rate_for_class
+from log_store import get_log_store
+
+
+@lru_cache(maxsize=4096)
+def strength_rate(exercise_name):
+    record = TABLE.find(exercise_name)
+    if record is not None:
+        return record.strength_rate
+    return strength_rate_for_class(strength_class(exercise_name))
+
+
+@lru_cache(maxsize=4096)
+def cardio_met(exercise_name):
+    # NaN marks the treadmill, whose MET is computed per entry
+    record = TABLE.find(exercise_name)
+    if record is not None:
+        return record.cardio_met
+    return cardio_met_for_name(exercise_name)
+
+
+def treadmill_met(speed_kmh, incline_percent):
+    speed_mpm = speed_kmh * 1000 / 60
+    return (0.1 * speed_mpm) + (1.8 * speed_mpm * (incline_percent / 100)) + 3.5
+
+
+def batch_calories(exercises, cardio, durations, weights, speeds=None, inclines=None):
+    """
+    Calories for many log entries in one pass. All arguments are
+    sequences of the same length:
+        exercises:  exercise names
+        cardio:     True for cardio entries, False for strength
+        durations:  minutes
+        weights:    body weight in kg
+        speeds, inclines: km/h and percent, only used by treadmill entries
+
+    Every distinct name is resolved once. Returns a float array rounded to
+    two decimals, like the single-entry functions.
+    """
+    # Map names to small integer codes with a dict, cheaper than sorting strings
+    codes = {}
+    name_index = np.fromiter((codes.setdefault(name, len(codes)) for name in exercises), dtype=np.intp)
+    rates = np.array([strength_rate(name) for name in codes], dtype=float)[name_index]
+    mets = np.array([cardio_met(name) for name in codes], dtype=float)[name_index]
+    return _calories(rates, mets, cardio, durations, weights, speeds, inclines)
+
+
+def batch_calories_by_id(exercise_ids, cardio, durations, weights, speeds=None, inclines=None):
+    """
+    Like batch_calories, with exercise table ids instead of names: the
+    rates are gathered straight from the table's columns. Ids the table
+    does not know get the default rates.
+    """
+    rows, known = TABLE.find_rows(exercise_ids)
+    rates = np.where(known, TABLE.strength_rates[rows], DEFAULT_STRENGTH_RATE)
+    mets = np.where(known, TABLE.cardio_mets[rows], DEFAULT_CARDIO_MET)
+    return _calories(rates, mets, cardio, durations, weights, speeds, inclines)
+
+
+def _calories(rates, mets, cardio, durations, weights, speeds, inclines):
+    cardio = np.asarray(cardio, dtype=bool)
+    durations = np.asarray(durations, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    count = len(durations)
+    speeds = np.zeros(count) if speeds is None else np.nan_to_num(np.asarray(speeds, dtype=float))
+    inclines = np.zeros(count) if inclines is None else np.nan_to_num(np.asarray(inclines, dtype=float))
+
+    mets = np.where(np.isnan(mets), treadmill_met(speeds, inclines), mets)
+    calories = np.where(cardio, mets * weights / 200, rates) * durations
+    return np.round(calories, 2)
+
+
+def recalculate(store, user=None, missing=False):
+    """
+    Recompute the calories of every stored log (of `user`, or of everyone)
+    with the current rates, then rebuild the rollups. With `missing`, only
+    logs stored without calories are computed. Returns the number of logs
+    updated.
+    """
+    store.refresh_exercise_ids(user)
+    rows = store.calorie_inputs(user, missing)
+    if not rows:
+        return 0
+
+    ids, exercise_ids, exercises, cardio, weights, durations, speeds, inclines = zip(*rows)
+    durations = np.array(durations, dtype=float)
+    columns = (np.array(cardio, dtype=bool), np.nan_to_num(durations), np.array(weights, dtype=float),
+               np.array(speeds, dtype=float), np.array(inclines, dtype=float))
+
+    # Catalog exercises join on their id; free-typed names, and ids of
+    # exercises since renamed or removed, are resolved by name
+    has_id = np.array([exercise_id is not None and TABLE.is_known(exercise_id) for exercise_id in exercise_ids])
+    calories = np.empty(len(rows))
+    if has_id.any():
+        calories[has_id] = batch_calories_by_id(np.array(exercise_ids)[has_id].astype(np.int64),
+                                                *(column[has_id] for column in columns))
+    if not has_id.all():
+        calories[~has_id] = batch_calories(np.array(exercises, dtype=object)[~has_id],
+                                           *(column[~has_id] for column in columns))
+    # Entries without a duration (e.g. imported from the CSV) keep what they have
+    known = ~np.isnan(durations)
+
+    store.set_calories(zip(np.array(ids)[known].tolist(), calories[known].tolist()), user)
+    return int(known.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute the calories of stored exercise logs")
+    parser.add_argument("command", choices=["recalculate"])
+    parser.add_argument("--user", help="Only recompute this user's logs")
+    parser.add_argument("--missing", action="store_true", help="Only compute logs stored without calories")
+    args = parser.parse_args()
+
+    count = recalculate(get_log_store(), args.user, args.missing)
+    print(f"Recalculated {count} logs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Searchable catalog of the exercises in the compiled exercise table.
+
+Every base record of the table is one exercise, with the variants the table
+split off its display name (e.g. "Push-ups (Regular, Wide, Close-Grip,
+Weighted)") and every muscle group it is listed under, merged there.
+
+The index maps every word of a name or variant to its exercises, keeps the
+words sorted for prefix lookups and indexes their trigrams for typo-tolerant
+matches, so a search only scores the few exercises sharing a word with the
+query:
+    python catalog.py search "inclne dumbel pres"
+"""
+import argparse
+import bisect
+import re
+import time
+from collections import defaultdict, namedtuple
+
+from exercise_table import TABLE, exercise_key, parse_exercise
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Scores of a query word matching an indexed word
+EXACT, PREFIX, FUZZY = 3, 2, 1
+
+Match = namedtuple("Match", ["exercise", "variant", "score"])
+
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def index_words(text):
+    # Hyphenated words are also indexed joined up, so "pushups" finds "Push-ups"
+    joined = [word.replace("-", "") for word in re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)+", text.lower())]
+    return words(text) + joined
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein distance (adjacent swaps count once), or limit + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev_prev, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev_prev[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev_prev, prev = prev, row
+    return prev[-1]
+
+
+def typo_limit(word):
+    # One typo from 4 letters on, two from 8
+    return 0 if len(word) < 4 else 1 if len(word) < 8 else 2
+
+
+class Exercise:
+    def __init__(self, name, base, variants, muscle_groups, cardio):
+        self.name = name
+        self.base = base
+        self.variants = variants
+        self.muscle_groups = muscle_groups
+        self.cardio = cardio
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "base": self.base,
+            "variants": list(self.variants),
+            "muscle_groups": list(self.muscle_groups),
+            "cardio": self.cardio,
+        }
+
+    def __repr__(self):
+        return f"Exercise({self.name!r})"
+
+
+class ExerciseCatalog:
+    def __init__(self, records=None):
+        self.exercises = []
+        self._by_key = {}
+
+        for record in TABLE.records if records is None else records:
+            key = exercise_key(record.base)
+            exercise = self._by_key.get(key)
+            if exercise is None:
+                # The base record comes first, unless an id collision left it out
+                name = record.name if record.variant is None else record.base
+                exercise = Exercise(name, record.base, (), record.muscle_groups, record.cardio)
+                self._by_key[key] = exercise
+                self.exercises.append(exercise)
+            if record.variant is not None:
+                exercise.variants += (record.variant,)
+
+        self._build_index()
+
+    def _build_index(self):
+        # word -> {exercise index: variant the word came from, None for the base name}
+        postings = defaultdict(dict)
+        for idx, exercise in enumerate(self.exercises):
+            for variant in exercise.variants:
+                for word in index_words(variant):
+                    postings[word].setdefault(idx, variant)
+            for word in index_words(exercise.base):
+                postings[word][idx] = None
+
+        self._postings = dict(postings)
+        self._words = sorted(self._postings)
+        self._trigrams = defaultdict(set)
+        for word in self._words:
+            for gram in trigrams(word):
+                self._trigrams[gram].add(word)
+
+    def get(self, name):
+        """The exercise with this display or base name, or None."""
+        base, _ = parse_exercise(name)
+        return self._by_key.get(exercise_key(base))
+
+    def muscle_groups(self):
+        return list(dict.fromkeys(group for exercise in self.exercises for group in exercise.muscle_groups))
+
+    def _matching_words(self, query_word):
+        """{indexed word: score} for one query word."""
+        found = {}
+
+        # Prefix matches (which include the exact word) from the sorted list
+        start = bisect.bisect_left(self._words, query_word)
+        for word in self._words[start:]:
+            if not word.startswith(query_word):
+                break
+            found[word] = EXACT if word == query_word else PREFIX
+
+        limit = typo_limit(query_word)
+        if limit:
+            # Candidates share at least one trigram with the query word
+            candidates = set()
+            for gram in trigrams(query_word):
+                candidates |= self._trigrams.get(gram, set())
+            for word in candidates - found.keys():
+                if edit_distance(query_word, word[:len(query_word) + limit], limit) <= limit:
+                    found[word] = FUZZY
+        return found
+
+    def search(self, query, limit=10, muscle_group=None, cardio=None):
+        """
+        Exercises matching every word of `query`, by exact word, prefix or
+        up to two typos, best first. Returns Match(exercise, variant, score)
+        where variant is the variant the query picked out, if any.
+        """
+        query_words = words(query)
+        if not query_words:
+            return []
+
+        scores = None
+        variants = defaultdict(dict)
+        for query_word in query_words:
+            word_scores = {}
+            for word, score in self._matching_words(query_word).items():
+                for idx, variant in self._postings[word].items():
+                    if score > word_scores.get(idx, 0):
+                        word_scores[idx] = score
+                    if variant is not None:
+                        variants[idx][variant] = variants[idx].get(variant, 0) + score
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {idx: scores[idx] + s for idx, s in word_scores.items() if idx in scores}
+            if not scores:
+                return []
+
+        matches = []
+        for idx, score in scores.items():
+            exercise = self.exercises[idx]
+            if muscle_group is not None and muscle_group not in exercise.muscle_groups:
+                continue
+            if cardio is not None and exercise.cardio != cardio:
+                continue
+            variant = max(variants[idx], key=variants[idx].get) if variants[idx] else None
+            matches.append(Match(exercise, variant, score))
+
+        matches.sort(key=lambda m: (-m.score, len(m.exercise.base), m.exercise.base))
+        return matches[:limit]
+
+
+_catalog = None
+
+
+def get_catalog():
+    """The catalog of the exercise table, built on first use."""
+    global _catalog
+    if _catalog is None:
+        _catalog = ExerciseCatalog()
+    return _catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the exercise catalog")
+    parser.add_argument("command", choices=["search"])
+    parser.add_argument("query")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    start = time.perf_counter()
+    matches = catalog.search(args.query, args.limit)
+    elapsed = time.perf_counter() - start
+
+    for match in matches:
+        variant = f" [{match.variant}]" if match.variant else ""
+        print(f"{match.score:3d}  {match.exercise.base}{variant}  ({', '.join(match.exercise.muscle_groups) or 'Cardio'})")
+    print(f"{len(matches)} matches in {elapsed * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -56,3 +56,39 @@ CARDIO_EXERCISES = [
     "Jump Rope",
     "HIIT"
 ]
+
+# Strength training kcal per minute, by the first keyword found in the name
+STRENGTH_RATES = (
+    (("bench", "press"), 7.5),
+    (("deadlift", "row", "pull"), 8),
+    (("shoulder", "raise"), 6),
+    (("curl", "extension"), 5.5),
+    (("squat", "leg", "lunge"), 7),
+    (("crunch", "plank", "twist"), 5.5),
+)
+DEFAULT_STRENGTH_RATE = 4.5
+
+# Cardio METs; the treadmill MET depends on speed and incline instead
+CARDIO_METS = {
+    "cycling": 7.5,
+    "elliptical": 5,
+    "stairmaster": 8,
+    "rowing machine": 7,
+    "jump rope": 12,
+    "hiit": 9,
+}
+DEFAULT_CARDIO_MET = 6
+
+# Equipment, by the first keyword found in the variant, then in the name
+EQUIPMENT = (
+    (("ez bar",), "EZ Bar"),
+    (("trap bar",), "Trap Bar"),
+    (("t-bar",), "T-Bar"),
+    (("barbell", "good mornings"), "Barbell"),
+    (("dumbbell",), "Dumbbell"),
+    (("cable", "rope pushdown", "face pull", "lat pulldown"), "Cable"),
+    (("machine", "pec deck", "leg press", "hack squat", "treadmill", "cycling", "elliptical", "stairmaster"),
+     "Machine"),
+    (("jump rope",), "Jump Rope"),
+)
+DEFAULT_EQUIPMENT = "Bodyweight"
@@ -0,0 +1,294 @@
+"""
+Compiled exercise table: one record per exercise and per variant of it,
+with everything the calorie and progress code needs precomputed.
+
+Every record has a stable integer id, the crc32 of its exercise and variant
+names, so ids stay the same across runs and machines as long as the names
+do. Logs store these ids, and numpy code can join on them through
+`rows()`.
+
+Compiling parses every display name in exercise_data. The result is cached
+as a marshal file in __pycache__, keyed by a checksum of the source tables,
+so importing only reads that file until exercise_data changes.
+
+Two names whose ids collide would make one of them unreachable; compiling
+warns about the pair and leaves the later one out, so the table still
+loads. After editing exercise_data, check that no names collide:
+    python exercise_table.py check
+"""
+import argparse
+import marshal
+import os
+import re
+import sys
+import warnings
+import zlib
+
+import numpy as np
+
+from exercise_data import (
+    CARDIO_EXERCISES,
+    CARDIO_METS,
+    DEFAULT_CARDIO_MET,
+    DEFAULT_EQUIPMENT,
+    DEFAULT_STRENGTH_RATE,
+    EQUIPMENT,
+    EXERCISE_CATEGORIES,
+    STRENGTH_RATES,
+)
+
+CACHE_VERSION = 1
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__", "exercise_table.bin")
+TREADMILL = "treadmill"
+
+
+def parse_exercise(display_name):
+    """
+    Split "Base Name (Variant, Variant / Variant)" into the base name and a
+    tuple of variants. Names without parentheses have no variants.
+    """
+    match = re.match(r"^(.*?)\s*\((.*)\)\s*$", display_name)
+    if not match:
+        return display_name.strip(), ()
+    base, inside = match.groups()
+    variants = tuple(part.strip() for part in re.split(r",|/", inside) if part.strip())
+    return base, variants
+
+
+def exercise_key(name):
+    # Case and punctuation do not tell exercises apart
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def exercise_id(base, variant=None):
+    key = exercise_key(base) + ("|" + exercise_key(variant) if variant else "")
+    return zlib.crc32(key.encode()) & 0x7FFFFFFF
+
+
+def strength_class(name):
+    """Index of the STRENGTH_RATES rule for this name, -1 for the default rate."""
+    name = name.lower()
+    for index, (keywords, _) in enumerate(STRENGTH_RATES):
+        if any(keyword in name for keyword in keywords):
+            return index
+    return -1
+
+
+def strength_rate_for_class(index):
+    return STRENGTH_RATES[index][1] if index >= 0 else DEFAULT_STRENGTH_RATE
+
+
+def cardio_met_for_name(name):
+    # NaN marks the treadmill, whose MET is computed per entry
+    name = name.lower()
+    if name == TREADMILL:
+        return float("nan")
+    return CARDIO_METS.get(name, DEFAULT_CARDIO_MET)
+
+
+def equipment_for(base, variant=None):
+    for text in (variant, base):
+        if not text:
+            continue
+        text = text.lower()
+        for keywords, equipment in EQUIPMENT:
+            if any(keyword in text for keyword in keywords):
+                return equipment
+    return DEFAULT_EQUIPMENT
+
+
+class ExerciseRecord:
+    __slots__ = (
+        "id", "name", "base", "variant", "muscle_group", "muscle_groups",
+        "cardio", "equipment", "strength_class", "strength_rate", "cardio_met",
+    )
+
+    def __init__(self, id, name, base, variant, muscle_group, muscle_groups,
+                 cardio, equipment, strength_class, strength_rate, cardio_met):
+        self.id = id
+        self.name = name
+        self.base = base
+        self.variant = variant
+        self.muscle_group = muscle_group
+        self.muscle_groups = muscle_groups
+        self.cardio = cardio
+        self.equipment = equipment
+        self.strength_class = strength_class
+        self.strength_rate = strength_rate
+        self.cardio_met = cardio_met
+
+    def to_tuple(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"ExerciseRecord({self.id}, {self.name!r})"
+
+
+def source_checksum():
+    source = repr((CACHE_VERSION, EXERCISE_CATEGORIES, CARDIO_EXERCISES, STRENGTH_RATES,
+                   DEFAULT_STRENGTH_RATE, CARDIO_METS, DEFAULT_CARDIO_MET, EQUIPMENT, DEFAULT_EQUIPMENT))
+    return zlib.crc32(source.encode())
+
+
+def compile_records():
+    """Build the records from exercise_data, merging exercises listed more than once."""
+    exercises = {}  # key -> [display name, base, variants, muscle groups, cardio]
+    listed = [(name, group, False) for group, names in EXERCISE_CATEGORIES.items() for name in names]
+    listed += [(name, None, True) for name in CARDIO_EXERCISES]
+
+    for display_name, muscle_group, cardio in listed:
+        base, variants = parse_exercise(display_name)
+        exercise = exercises.setdefault(exercise_key(base), [display_name, base, [], [], False])
+        exercise[2] += [v for v in variants if v not in exercise[2]]
+        if muscle_group is not None and muscle_group not in exercise[3]:
+            exercise[3].append(muscle_group)
+        exercise[4] = exercise[4] or cardio
+
+    records = []
+    for display_name, base, variants, muscle_groups, cardio in exercises.values():
+        muscle_group = muscle_groups[0] if muscle_groups else "Cardio"
+        for variant in [None] + variants:
+            index = strength_class(display_name)
+            records.append(ExerciseRecord(
+                exercise_id(base, variant),
+                display_name if variant is None else f"{base} ({variant})",
+                base,
+                variant,
+                muscle_group,
+                tuple(muscle_groups),
+                cardio,
+                equipment_for(base, variant),
+                index,
+                strength_rate_for_class(index),
+                cardio_met_for_name(base),
+            ))
+
+    # Keep the first record of each id, so a collision cannot break every importer
+    by_id = {}
+    for record in records:
+        kept = by_id.setdefault(record.id, record)
+        if kept is not record:
+            warnings.warn(f"Exercise id collision: {record.name!r} has the id {record.id} of {kept.name!r} "
+                          f"and is left out of the table; rename one of them in exercise_data")
+    return list(by_id.values())
+
+
+def _read_cache(path, checksum):
+    try:
+        with open(path, "rb") as f:
+            cached_checksum, rows = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if cached_checksum != checksum:
+        return None
+    return [ExerciseRecord(*row) for row in rows]
+
+
+def _write_cache(path, checksum, records):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            marshal.dump((checksum, [record.to_tuple() for record in records]), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # A read-only checkout just compiles on every import
+        pass
+
+
+class ExerciseTable:
+    """
+    The compiled records with lookups by id and by (exercise, variant) name,
+    plus id-sorted numpy columns for vectorized joins.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.by_id = {record.id: record for record in records}
+        self._by_key = {}
+        for record in records:
+            self._by_key[(exercise_key(record.base), exercise_key(record.variant or ""))] = record
+            # The full display name of an exercise resolves to its base record
+            if record.variant is None:
+                self._by_key.setdefault((exercise_key(record.name), ""), record)
+
+        order = sorted(records, key=lambda record: record.id)
+        self.ids = np.array([record.id for record in order], dtype=np.int64)
+        self.strength_rates = np.array([record.strength_rate for record in order], dtype=float)
+        self.cardio_mets = np.array([record.cardio_met for record in order], dtype=float)
+
+    def __len__(self):
+        return len(self.records)
+
+    def find(self, name, variant=None):
+        """The record of an exercise (display or base name) and variant, or None."""
+        record = self._by_key.get((exercise_key(name), exercise_key(variant or "")))
+        if record is None:
+            base, variants = parse_exercise(name)
+            if variant is not None:
+                # A variant of the full display name
+                record = self._by_key.get((exercise_key(base), exercise_key(variant)))
+            elif len(variants) == 1:
+                # "Push-ups (Wide)" style names of a single variant
+                record = self._by_key.get((exercise_key(base), exercise_key(variants[0])))
+        return record
+
+    def id_for(self, name, variant=None):
+        record = self.find(name, variant)
+        return record.id if record is not None else None
+
+    def rows(self, ids):
+        """Positions of `ids` in the numpy columns; raises KeyError for unknown ids."""
+        rows, known = self.find_rows(ids)
+        if not known.all():
+            raise KeyError("Unknown exercise ids")
+        return rows
+
+    def find_rows(self, ids):
+        """
+        (positions, known mask) of `ids` in the numpy columns. Unknown ids,
+        e.g. of exercises since renamed in exercise_data, get position 0.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.zeros(len(ids), dtype=np.intp), np.zeros(len(ids), dtype=bool)
+        rows = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        known = self.ids[rows] == ids
+        return np.where(known, rows, 0), known
+
+    def is_known(self, exercise_id):
+        return exercise_id in self.by_id
+
+
+def load_table(cache_path=CACHE_PATH):
+    checksum = source_checksum()
+    records = _read_cache(cache_path, checksum) if cache_path else None
+    if records is None:
+        records = compile_records()
+        if cache_path:
+            _write_cache(cache_path, checksum, records)
+    return ExerciseTable(records)
+
+
+TABLE = load_table()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the exercise table from exercise_data")
+    parser.add_argument("command", choices=["check"])
+    parser.parse_args()
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        records = compile_records()
+    for warning in caught:
+        print(warning.message)
+    print(f"{len(records)} records, {len(caught)} id collisions")
+    return 1 if caught else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,67 +1,63 @@
 import json
 import os
+from datetime import date, timedelta
 from exercise_data import EXERCISE_CATEGORIES, CARDIO_EXERCISES
-
-# File to store logs
-LOG_FILE = "exercise_logs.json"
-USER_WEIGHT_KG = 80  # You can customize this later
-
-def save_log(entry):
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r") as f:
-            data = json.load(f)
-    else:
-        data = []
-    data.append(entry)
-    with open(LOG_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
-def load_logs():
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r") as f:
-            return json.load(f)
-    return []
+from catalog import get_catalog
+from calories import cardio_met, recalculate, strength_rate, treadmill_met
+from exercise_table import TREADMILL
+from log_store import DEFAULT_WEIGHT_KG, LEGACY_USER, get_log_store
+
+# Files written by earlier versions, imported into the store on first run
+LEGACY_JSON_FILE = "exercise_logs.json"
+LEGACY_CSV_FILE = "exercise_log.csv"
+
+store = get_log_store()
+
+def save_log(user, entry):
+    events = []
+    log_id = store.add(user, entry, events=events)
+    for event in events:
+        print(f"🏆 {describe_event(event)}")
+    return log_id
+
+def describe_event(event):
+    name = event["exercise"] + (f" ({event['variant']})" if event["variant"] else "")
+    if event["kind"] == "e1rm":
+        return f"New estimated 1RM for {name}: {event['value']} kg (was {event['previous']:.1f} kg)"
+    if event["kind"] == "rep_max":
+        return f"New {event['reps']}-rep max for {name}: {event['value']} kg (was {event['previous']} kg)"
+    return f"Most volume yet for {name}: {event['value']:g} kg (was {event['previous']:g} kg)"
+
+def load_logs(user):
+    # Streams the entries from the store, oldest first
+    return store.iter_logs(user)
 
 def calculate_strength_training_calories(weight_kg, exercise_name, duration_min):
-    name = exercise_name.lower()
-    if "bench" in name or "press" in name:
-        calories_per_min = 7.5
-    elif "deadlift" in name or "row" in name or "pull" in name:
-        calories_per_min = 8
-    elif "shoulder" in name or "raise" in name:
-        calories_per_min = 6
-    elif "curl" in name or "extension" in name:
-        calories_per_min = 5.5
-    elif "squat" in name or "leg" in name or "lunge" in name:
-        calories_per_min = 7
-    elif "crunch" in name or "plank" in name or "twist" in name:
-        calories_per_min = 5.5
-    else:
-        calories_per_min = 4.5
-    return round(calories_per_min * duration_min, 2)
+    return round(strength_rate(exercise_name) * duration_min, 2)
 
 def calculate_treadmill_calories(duration_min, speed_kmh, incline_percent, weight_kg):
-    speed_mpm = speed_kmh * 1000 / 60
-    METs = (0.1 * speed_mpm) + (1.8 * speed_mpm * (incline_percent / 100)) + 3.5
-    calories_per_min = (METs * weight_kg) / 200
+    calories_per_min = (treadmill_met(speed_kmh, incline_percent) * weight_kg) / 200
     return round(calories_per_min * duration_min, 2)
 
 def calculate_cardio_calories(exercise, duration, speed, incline, weight_kg):
-    if exercise.lower() == "treadmill":
+    if exercise.lower() == TREADMILL:
         return calculate_treadmill_calories(duration, speed, incline, weight_kg)
     else:
-        met_values = {
-            "cycling": 7.5,
-            "elliptical": 5,
-            "stairmaster": 8,
-            "rowing machine": 7,
-            "jump rope": 12,
-            "hiit": 9
-        }
-        met = met_values.get(exercise.lower(), 6)
-        return round((met * weight_kg / 200) * duration, 2)
-
-def log_strength_exercise():
+        return round((cardio_met(exercise) * weight_kg / 200) * duration, 2)
+
+def search_exercise(query, muscle_group):
+    # Returns (exercise name, variant or None), or None without a match
+    matches = get_catalog().search(query, limit=5, muscle_group=muscle_group)
+    if len(matches) <= 1:
+        return (matches[0].exercise.name, matches[0].variant) if matches else None
+
+    for i, match in enumerate(matches, 1):
+        variant = f" [{match.variant}]" if match.variant else ""
+        print(f"{i}. {match.exercise.name}{variant}")
+    match = matches[int(input("Choose a match by number: ")) - 1]
+    return match.exercise.name, match.variant
+
+def log_strength_exercise(user):
     print("\nAvailable Muscle Groups:")
     muscle_groups = list(EXERCISE_CATEGORIES.keys())
     for i, mg in enumerate(muscle_groups, 1):
@@ -75,8 +71,16 @@ def log_strength_exercise():
     for i, ex in enumerate(exercises, 1):
         print(f"{i}. {ex}")
 
-    exercise_choice = int(input("Choose an exercise by number: "))
-    chosen_exercise = exercises[exercise_choice - 1]
+    choice = input("Choose an exercise by number or type to search: ").strip()
+    variant = None
+    if choice.isdigit():
+        chosen_exercise = exercises[int(choice) - 1]
+    else:
+        found = search_exercise(choice, chosen_group)
+        if found is None:
+            print("No matching exercise found.")
+            return
+        chosen_exercise, variant = found
 
     sets = int(input("Enter number of sets: "))
     set_details = []
@@ -86,20 +90,21 @@ def log_strength_exercise():
         set_details.append({"set": i, "reps": reps, "weight": weight})
 
     duration_min = float(input("Estimated duration for this exercise (in minutes): "))
-    total_calories = calculate_strength_training_calories(USER_WEIGHT_KG, chosen_exercise, duration_min)
+    total_calories = calculate_strength_training_calories(store.get_user_weight(user), chosen_exercise, duration_min)
 
     print(f"\n✅ {chosen_exercise} logged!\n🔥 Total calories burned: {total_calories} kcal")
 
-    save_log({
+    save_log(user, {
         "type": "strength",
         "muscle_group": chosen_group,
         "exercise": chosen_exercise,
+        "variant": variant,
         "sets": set_details,
         "duration_min": duration_min,
         "calories": total_calories
     })
 
-def log_cardio_exercise():
+def log_cardio_exercise(user):
     print("\nAvailable Cardio Exercises:")
     for i, cardio in enumerate(CARDIO_EXERCISES, 1):
         print(f"{i}. {cardio}")
@@ -110,11 +115,11 @@ def log_cardio_exercise():
     speed = float(input("Enter speed (km/h): "))
     incline = float(input("Enter incline (%): "))
 
-    calories = calculate_cardio_calories(chosen_exercise, duration, speed, incline, USER_WEIGHT_KG)
+    calories = calculate_cardio_calories(chosen_exercise, duration, speed, incline, store.get_user_weight(user))
 
     print(f"\n✅ Cardio logged!\n🔥 Calories burned: {calories} kcal")
 
-    save_log({
+    save_log(user, {
         "type": "cardio",
         "exercise": chosen_exercise,
         "duration_min": duration,
@@ -123,16 +128,68 @@ def log_cardio_exercise():
         "calories": calories
     })
 
-def view_progress():
-    logs = load_logs()
-    if not logs:
+def view_progress(user):
+    found = False
+    for entry in load_logs(user):
+        if not found:
+            print("\n===== Exercise Progress Logs =====")
+            found = True
+        print(json.dumps(entry, indent=4))
+    if not found:
         print("\nNo logs found.")
         return
-    print("\n===== Exercise Progress Logs =====")
-    for entry in logs:
-        print(json.dumps(entry, indent=4))
+
+    records = store.personal_records(user)
+    if records:
+        print("\n===== Personal Records =====")
+        for exercise, record in records.items():
+            print(f"{exercise}: {record['weight']} kg ({record['logged_at']})")
+
+    weeks = store.summary(user, period="week", since=date.today() - timedelta(weeks=7))
+    if weeks:
+        print("\n===== Weekly Totals =====")
+        for week in weeks:
+            print(f"Week of {week['bucket']}: {week['calories']:g} kcal, {week['sets']} sets, "
+                  f"{week['reps']} reps, {week['volume']:g} kg")
+
+    this_week = store.summary(user, period="week", dimension="muscle_group", since=date.today())
+    if this_week:
+        print("\n===== This Week =====")
+        for totals in this_week:
+            print(f"{totals['key']}: {totals['sets']} sets, {totals['reps']} reps, {totals['volume']:g} kg")
+
+def choose_user():
+    default_user = os.environ.get("EXERCISE_USER", "")
+    prompt = f"Enter your name [{default_user}]: " if default_user else "Enter your name: "
+    user = input(prompt).strip() or default_user
+    while not user:
+        user = input("Enter your name: ").strip()
+
+    if not store.has_user(user):
+        weight = input(f"Enter your body weight in kg [{DEFAULT_WEIGHT_KG}]: ").strip()
+        store.set_user_weight(user, float(weight) if weight else DEFAULT_WEIGHT_KG)
+    return user
+
+def migrate_legacy_logs():
+    # The old JSON file names no user: its entries wait under LEGACY_USER until claimed
+    migrated = store.migrate_json(LEGACY_JSON_FILE) + store.migrate_csv(LEGACY_CSV_FILE)
+    if migrated:
+        recalculate(store, LEGACY_USER, missing=True)
+        print(f"Imported {migrated} entries from the old log files.")
+
+def claim_legacy_logs(user):
+    count = store.count_logs(LEGACY_USER)
+    if not count or user == LEGACY_USER:
+        return
+    answer = input(f"{count} entries from the old {LEGACY_JSON_FILE} belong to no one yet. Are they yours? [y/N]: ")
+    if answer.strip().lower() in ("y", "yes"):
+        store.reassign_logs(LEGACY_USER, user)
+        print(f"Moved {count} entries to {user}.")
 
 def main():
+    migrate_legacy_logs()
+    user = choose_user()
+    claim_legacy_logs(user)
     while True:
         print("\n===== Exercise Tracker =====")
         print("1. Log Strength Exercise")
@@ -141,13 +198,13 @@ def main():
         print("4. Exit")
         choice = input("Enter your choice: ")
         if choice == "1":
-            log_strength_exercise()
+            log_strength_exercise(user)
         elif choice == "2":
-            log_cardio_exercise()
+            log_cardio_exercise(user)
         elif choice == "3":
-            view_progress()
+            view_progress(user)
         elif choice == "4":
-            print("Exiting. Stay strong, Jack! 💪")
+            print(f"Exiting. Stay strong, {user}! 💪")
             break
         else:
             print("Invalid choice. Try again.")
@@ -0,0 +1,404 @@
+"""
+Streaming import/export of exercise logs between every format they have
+been kept in, normalised to one entry per row:
+
+    set-csv      exercise_log.csv: one row per set, no header
+                 (timestamp, user, muscle group, exercise, set, reps, weight)
+    logs-json    exercise_logs.json: a JSON array of tracker entries
+    groups-json  exercise_data.json: {muscle group: [entries]}
+    csv, jsonl   the normalised rows (FIELDS) with a header / one per line
+    parquet      the normalised rows as columns, needs pyarrow
+    db           the tracker's SQLite log store
+
+Readers and writers are generators over rows and write in batches, so
+memory stays bounded by BATCH_SIZE whatever the history size:
+    python log_io.py exercise_log.csv logs.parquet
+    python log_io.py exercise_logs.json logs.db --user jeevith
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from exercise_table import TABLE
+from rollups import set_totals
+
+BATCH_SIZE = 10_000
+CHUNK_SIZE = 1 << 16
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?$")
+
+FIELDS = (
+    "logged_at", "user", "type", "muscle_group", "exercise", "exercise_id", "variant",
+    "duration_min", "speed_kmh", "incline", "calories",
+    "sets", "reps", "volume", "set_reps", "set_weights",
+)
+INTEGER_FIELDS = {"exercise_id", "sets", "reps"}
+FLOAT_FIELDS = {"duration_min", "speed_kmh", "incline", "calories", "volume"}
+
+
+def pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Rows <-> tracker entries
+
+@lru_cache(maxsize=4096)
+def exercise_id_for(exercise, variant):
+    return TABLE.id_for(exercise, variant)
+
+
+def entry_to_row(entry, user=None, logged_at=None):
+    """A normalised row from a tracker entry (as stored by LogStore)."""
+    sets = entry.get("sets") or []
+    count, reps, volume, _ = set_totals(sets)
+    return {
+        "logged_at": entry.get("logged_at") or logged_at,
+        "user": entry.get("user") or user,
+        "type": entry["type"],
+        "muscle_group": entry.get("muscle_group"),
+        "exercise": entry["exercise"],
+        "exercise_id": entry.get("exercise_id") or exercise_id_for(entry["exercise"], entry.get("variant")),
+        "variant": entry.get("variant"),
+        "duration_min": entry.get("duration_min"),
+        "speed_kmh": entry.get("speed_kmh"),
+        "incline": entry.get("incline"),
+        "calories": entry.get("calories"),
+        "sets": count,
+        "reps": reps,
+        "volume": volume,
+        "set_reps": [s["reps"] for s in sets],
+        "set_weights": [float(s["weight"]) for s in sets],
+    }
+
+
+def row_to_entry(row):
+    """The tracker entry for a normalised row, without user and timestamp."""
+    entry = {"type": row["type"], "exercise": row["exercise"]}
+    for key in ("muscle_group", "exercise_id", "variant", "duration_min", "speed_kmh", "incline", "calories"):
+        if row.get(key) is not None:
+            entry[key] = row[key]
+    if row["type"] == "strength":
+        entry["sets"] = [
+            {"set": i, "reps": reps, "weight": weight}
+            for i, (reps, weight) in enumerate(zip(row["set_reps"], row["set_weights"]), 1)
+        ]
+    return entry
+
+
+# Readers
+
+def read_set_csv(path):
+    # Consecutive rows of the same timestamp, user and exercise are one entry
+    with open(path, newline="") as f:
+        group_key, entry = None, None
+        for timestamp, user, muscle_group, exercise, set_no, reps, weight in csv.reader(f):
+            key = (timestamp, user, exercise)
+            if key != group_key:
+                if entry is not None:
+                    yield entry_to_row(entry)
+                group_key = key
+                entry = {"type": "strength", "muscle_group": muscle_group, "exercise": exercise, "sets": [],
+                         "user": user, "logged_at": _normalise_timestamp(timestamp)}
+            entry["sets"].append({"set": int(set_no), "reps": int(reps), "weight": float(weight)})
+        if entry is not None:
+            yield entry_to_row(entry)
+
+
+def read_logs_json(path, user=None):
+    # Entries without a timestamp get the file's modification time
+    logged_at = datetime.fromtimestamp(os.path.getmtime(path)).strftime(TIMESTAMP_FORMAT)
+    with open(path) as f:
+        for _, entry in iter_json_items(f):
+            yield entry_to_row(entry, user, logged_at)
+
+
+def read_groups_json(path, user=None):
+    logged_at = datetime.fromtimestamp(os.path.getmtime(path)).strftime(TIMESTAMP_FORMAT)
+    with open(path) as f:
+        for group, item in iter_json_items(f):
+            if group == "Cardio":
+                entry = {"type": "cardio", "exercise": item["exercise"], "duration_min": item.get("duration"),
+                         "speed_kmh": item.get("speed"), "incline": item.get("incline")}
+            else:
+                entry = {"type": "strength", "muscle_group": group, "exercise": item["exercise"], "sets": [
+                    {"set": i, "reps": reps, "weight": weight}
+                    for i, (reps, weight) in enumerate(zip(item["reps_per_set"], item["weight_per_set"]), 1)
+                ]}
+            entry["calories"] = item.get("calories_burned")
+            yield entry_to_row(entry, user, logged_at)
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield _parse_csv_row(row)
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_parquet(path):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=BATCH_SIZE):
+        yield from batch.to_pylist()
+
+
+def read_db(path, user=None):
+    from log_store import LogStore
+
+    store = LogStore(path)
+    users = [user] if user else store.users()
+    for name in users:
+        for entry in store.iter_logs(name):
+            yield entry_to_row(entry)
+
+
+def iter_json_items(f):
+    """
+    Yield (key, item) for the items of a top-level JSON array (key None) or
+    of the arrays in a top-level object, decoding one item at a time from
+    CHUNK_SIZE reads.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos = "", 0
+
+    def fill():
+        nonlocal buffer, pos
+        chunk = f.read(CHUNK_SIZE)
+        buffer, pos = buffer[pos:] + chunk, 0
+        return bool(chunk)
+
+    def skip(chars=" \t\r\n,"):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return buffer[pos] if pos < len(buffer) else None
+
+    def decode():
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Item cut off at the end of the buffer
+                if not fill():
+                    raise
+                continue
+            if end == len(buffer) and fill():
+                # Numbers may continue in the next chunk
+                continue
+            pos = end
+            return value
+
+    def items(key):
+        nonlocal pos
+        pos += 1  # [
+        while skip() != "]":
+            yield key, decode()
+        pos += 1
+
+    first = skip()
+    if first == "[":
+        yield from items(None)
+    elif first == "{":
+        pos += 1
+        while skip() != "}":
+            key = decode()
+            skip(" \t\r\n:")
+            yield from items(key)
+    elif first is not None:
+        raise ValueError("Expected a JSON array or object")
+
+
+def _normalise_timestamp(timestamp):
+    # The set CSV has minute precision; a regex is much cheaper than strptime
+    match = TIMESTAMP_RE.match(timestamp)
+    if not match:
+        raise ValueError(f"Unknown timestamp: {timestamp}")
+    return timestamp if match.group(1) else timestamp + ":00"
+
+
+def _parse_csv_row(row):
+    parsed = {}
+    for field in FIELDS:
+        value = row.get(field, "")
+        if field in ("set_reps", "set_weights"):
+            parsed[field] = [(int if field == "set_reps" else float)(v) for v in value.split(";") if v]
+        elif value == "":
+            parsed[field] = None
+        elif field in INTEGER_FIELDS:
+            parsed[field] = int(value)
+        elif field in FLOAT_FIELDS:
+            parsed[field] = float(value)
+        else:
+            parsed[field] = value
+    return parsed
+
+
+# Writers, each takes an iterable of rows and returns the number written
+
+def write_csv(path, rows):
+    count = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for row in rows:
+            values = [row[field] for field in FIELDS]
+            values[-2] = ";".join(map(str, row["set_reps"]))
+            values[-1] = ";".join(map(str, row["set_weights"]))
+            writer.writerow(values)
+            count += 1
+    return count
+
+
+def write_jsonl(path, rows):
+    count = 0
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+            count += 1
+    return count
+
+
+def write_parquet(path, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("logged_at", pa.string()), ("user", pa.string()), ("type", pa.string()),
+        ("muscle_group", pa.string()), ("exercise", pa.string()), ("exercise_id", pa.int64()),
+        ("variant", pa.string()), ("duration_min", pa.float64()), ("speed_kmh", pa.float64()),
+        ("incline", pa.float64()), ("calories", pa.float64()), ("sets", pa.int32()),
+        ("reps", pa.int32()), ("volume", pa.float64()),
+        ("set_reps", pa.list_(pa.int32())), ("set_weights", pa.list_(pa.float32())),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for batch in _batches(rows):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def write_db(path, rows):
+    from log_store import LogStore
+
+    # Rollups and progress are rebuilt once per user at the end instead of
+    # updated per entry; if the import is interrupted, run the rebuild
+    # commands of rollups.py and progress.py
+    store = LogStore(path)
+    users = set()
+    count = 0
+    for batch in _batches(rows):
+        users.update(row["user"] for row in batch)
+        store.add_many(
+            ((row["user"], row_to_entry(row), datetime.strptime(row["logged_at"], TIMESTAMP_FORMAT))
+             for row in batch),
+            update_aggregates=False,
+        )
+        count += len(batch)
+    for user in sorted(users):
+        store.rebuild_rollups(user)
+        store.rebuild_progress(user)
+    return count
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+READERS = {
+    "set-csv": read_set_csv,
+    "logs-json": read_logs_json,
+    "groups-json": read_groups_json,
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+    "parquet": read_parquet,
+    "db": read_db,
+}
+WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "parquet": write_parquet,
+    "db": write_db,
+}
+NEEDS_USER = {"logs-json", "groups-json"}
+
+
+def detect_format(path, reading=True):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("jsonl", "parquet", "db"):
+        return extension
+    if extension == "csv":
+        if not reading:
+            return "csv"
+        with open(path, newline="") as f:
+            header = f.readline()
+        return "csv" if header.startswith("logged_at,") else "set-csv"
+    if extension == "json" and reading:
+        with open(path) as f:
+            first = f.read(CHUNK_SIZE).lstrip()[:1]
+        return "logs-json" if first == "[" else "groups-json"
+    raise ValueError(f"Cannot tell the format of {path}, pass it explicitly")
+
+
+def convert(source, target, source_format=None, target_format=None, user=None):
+    """Stream `source` into `target`. Returns (rows, seconds)."""
+    source_format = source_format or detect_format(source)
+    target_format = target_format or detect_format(target, reading=False)
+    if source_format in NEEDS_USER and not user:
+        raise ValueError(f"{source_format} files have no user column, pass a user")
+    if "parquet" in (source_format, target_format) and not pyarrow_available():
+        raise RuntimeError("Parquet needs pyarrow (pip install pyarrow)")
+
+    reader = READERS[source_format]
+    rows = reader(source, user) if source_format in NEEDS_USER or source_format == "db" else reader(source)
+
+    start = time.perf_counter()
+    count = WRITERS[target_format](target, rows)
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert exercise logs between formats")
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--from", dest="source_format", choices=sorted(READERS))
+    parser.add_argument("--to", dest="target_format", choices=sorted(WRITERS))
+    parser.add_argument("--user", help="User of JSON logs without a user field (or the only user to export)")
+    args = parser.parse_args()
+
+    try:
+        count, seconds = convert(args.source, args.target, args.source_format, args.target_format, args.user)
+    except (ValueError, RuntimeError) as e:
+        sys.exit(str(e))
+    print(f"{count} entries in {seconds:.2f}s ({count / max(seconds, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+import log_io
+import progress
+import rollups
+from exercise_table import TABLE
+from rollups import set_totals, week_start
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_WEIGHT_KG = 80
+# Owner of the entries imported from exercise_logs.json, which names no user
+LEGACY_USER = "legacy"
+
+
+class LogStore:
+    """
+    Exercise logs of every user in a local SQLite database in WAL mode.
+
+    Each entry is one row keyed by user and timestamp. The full entry is kept
+    as JSON, next to the columns the queries need (date, muscle group,
+    exercise and per-entry set totals), so "last N sessions", "volume by
+    muscle group this week" and "PR per exercise" are answered from the
+    (user, ...) indexes without reading a user's whole history.
+
+    Writes are single-row transactions: a crash never leaves a half-written
+    log, and concurrent writers are serialized by SQLite's own locking.
+    Every thread opens its own connection to the file.
+
+    Daily and weekly totals (rollups.py) and personal records and volume
+    trends (progress.py) are kept up to date on every write, and read with
+    `summary()` and `progress()`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        has_rollups = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'rollups'").fetchone()
+        has_progress = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'exercise_progress'").fetchone()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS users (
+                user       TEXT PRIMARY KEY,
+                weight_kg  REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS logs (
+                id           INTEGER PRIMARY KEY,
+                user         TEXT NOT NULL,
+                logged_at    TEXT NOT NULL,
+                date         TEXT NOT NULL,
+                type         TEXT NOT NULL,
+                muscle_group TEXT,
+                exercise     TEXT NOT NULL,
+                exercise_id  INTEGER,
+                sets         INTEGER NOT NULL DEFAULT 0,
+                reps         INTEGER NOT NULL DEFAULT 0,
+                volume       REAL NOT NULL DEFAULT 0,
+                max_weight   REAL,
+                calories     REAL NOT NULL DEFAULT 0,
+                data         TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS logs_user_date ON logs (user, date, logged_at);
+            CREATE INDEX IF NOT EXISTS logs_user_muscle_group ON logs (user, muscle_group, date, volume);
+            CREATE INDEX IF NOT EXISTS logs_user_exercise ON logs (user, exercise, max_weight);
+            CREATE TABLE IF NOT EXISTS migrations (
+                source      TEXT PRIMARY KEY,
+                entries     INTEGER NOT NULL,
+                migrated_at TEXT NOT NULL
+            );
+        """ + rollups.SCHEMA + progress.SCHEMA)
+        conn.commit()
+
+        if "exercise_id" not in [row[1] for row in conn.execute("PRAGMA table_info(logs)")]:
+            # Databases from before the exercise table existed
+            self._add_exercise_ids(conn)
+        conn.execute("CREATE INDEX IF NOT EXISTS logs_user_exercise_id ON logs (user, exercise_id, date)")
+        conn.commit()
+
+        # Databases from before the rollups or the progress tables existed
+        if not has_rollups:
+            self.rebuild_rollups()
+        if not has_progress:
+            self.rebuild_progress()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _add_exercise_ids(self, conn):
+        with conn:
+            conn.execute("ALTER TABLE logs ADD COLUMN exercise_id INTEGER")
+            rows = conn.execute("SELECT id, exercise, json_extract(data, '$.variant') FROM logs").fetchall()
+            conn.executemany(
+                "UPDATE logs SET exercise_id = ?, data = json_set(data, '$.exercise_id', ?) WHERE id = ?",
+                ((exercise_id, exercise_id, log_id) for log_id, exercise_id in (
+                    (log_id, TABLE.id_for(exercise, variant)) for log_id, exercise, variant in rows
+                ))
+            )
+
+    # Users
+
+    def get_user_weight(self, user, default=DEFAULT_WEIGHT_KG):
+        row = self._conn().execute("SELECT weight_kg FROM users WHERE user = ?", (user,)).fetchone()
+        return row[0] if row else default
+
+    def set_user_weight(self, user, weight_kg):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO users (user, weight_kg) VALUES (?, ?)", (user, weight_kg))
+
+    def has_user(self, user):
+        return self._conn().execute("SELECT 1 FROM users WHERE user = ?", (user,)).fetchone() is not None
+
+    def count_logs(self, user):
+        return self._conn().execute("SELECT COUNT(*) FROM logs WHERE user = ?", (user,)).fetchone()[0]
+
+    def reassign_logs(self, from_user, to_user):
+        """
+        Move every log of `from_user` (e.g. LEGACY_USER) to `to_user` and
+        rebuild the rollups and progress of both. Returns the number moved.
+        """
+        conn = self._conn()
+        with conn:
+            count = conn.execute(
+                "UPDATE logs SET user = ?, data = json_set(data, '$.user', ?) WHERE user = ?",
+                (to_user, to_user, from_user)
+            ).rowcount
+        if count:
+            for user in (from_user, to_user):
+                self.rebuild_rollups(user)
+                self.rebuild_progress(user)
+        return count
+
+    # Logs
+
+    def users(self):
+        """Every user with logs or a stored body weight."""
+        return [row[0] for row in self._conn().execute(
+            "SELECT user FROM users UNION SELECT DISTINCT user FROM logs ORDER BY 1"
+        )]
+
+    def add(self, user, entry, logged_at=None, events=None):
+        """
+        Store one log entry (a dict as built by exercise_tracker) for `user`.
+        `logged_at` is a datetime and defaults to now. PR events (see
+        progress.add_entry) are appended to `events` if given. Returns the
+        log id.
+        """
+        conn = self._conn()
+        with conn:
+            return self._insert(conn, user, entry, logged_at or datetime.now(), events=events)
+
+    def add_many(self, entries, update_aggregates=True, events=None):
+        """
+        Store many (user, entry, logged_at) tuples in one transaction, for
+        bulk imports. Without `update_aggregates` the caller has to rebuild
+        the rollups and progress of these users afterwards. Returns the new
+        log ids.
+        """
+        conn = self._conn()
+        with conn:
+            return [
+                self._insert(conn, user, entry, logged_at, update_aggregates, events)
+                for user, entry, logged_at in entries
+            ]
+
+    def _insert(self, conn, user, entry, logged_at, update_aggregates=True, events=None):
+        timestamp = logged_at.strftime(TIMESTAMP_FORMAT)
+        entry = dict(entry, user=user, logged_at=timestamp)
+        if not isinstance(entry.get("exercise_id"), int) or not TABLE.is_known(entry["exercise_id"]):
+            # None for exercises that are not in the catalog, e.g. typed-in cardio; ids
+            # of exported logs may be stale
+            entry["exercise_id"] = TABLE.id_for(entry["exercise"], entry.get("variant"))
+        sets, reps, volume, max_weight = set_totals(entry.get("sets", []))
+
+        cursor = conn.execute(
+            "INSERT INTO logs (user, logged_at, date, type, muscle_group, exercise, exercise_id, sets, reps, "
+            "volume, max_weight, calories, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (user, timestamp, timestamp[:10], entry["type"], entry.get("muscle_group"), entry["exercise"],
+             entry["exercise_id"], sets, reps, volume, max_weight, entry.get("calories") or 0, json.dumps(entry))
+        )
+        if update_aggregates:
+            rollups.add_entry(conn, user, entry, logged_at.date())
+            entry_events = progress.add_entry(conn, user, entry)
+            if events is not None:
+                events += [dict(event, log_id=cursor.lastrowid) for event in entry_events]
+        return cursor.lastrowid
+
+    def iter_logs(self, user, since=None, until=None):
+        """
+        Yield the entries of `user` oldest first, optionally limited to the
+        dates (date objects or "YYYY-MM-DD") from `since` up to `until`.
+        Rows are read from the cursor as they are consumed.
+        """
+        query = "SELECT data FROM logs WHERE user = ?"
+        params = [user]
+        if since is not None:
+            query += " AND date >= ?"
+            params.append(str(since))
+        if until is not None:
+            query += " AND date <= ?"
+            params.append(str(until))
+        query += " ORDER BY date, logged_at, id"
+
+        for (data,) in self._conn().execute(query, params):
+            yield json.loads(data)
+
+    def page(self, user, limit=50, cursor=None):
+        """
+        One page of the user's entries, newest first, each with its log "id".
+        Returns (entries, next cursor or None). The cursor is the timestamp
+        and id of the last entry, so each page is an index range scan.
+        """
+        query = "SELECT id, data FROM logs WHERE user = ?"
+        params = [user]
+        if cursor is not None:
+            logged_at, log_id = cursor
+            query += " AND date <= ? AND (logged_at, id) < (?, ?)"
+            params += [logged_at[:10], logged_at, log_id]
+        query += " ORDER BY date DESC, logged_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._conn().execute(query, params).fetchall()
+        entries = [dict(json.loads(data), id=log_id) for log_id, data in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = (entries[-1]["logged_at"], entries[-1]["id"])
+        return entries, next_cursor
+
+    def last_sessions(self, user, n=5):
+        """
+        The entries of the user's last `n` workout days, newest day first:
+        [{"date": "YYYY-MM-DD", "entries": [...]}, ...].
+        """
+        conn = self._conn()
+        dates = [row[0] for row in conn.execute(
+            "SELECT DISTINCT date FROM logs WHERE user = ? ORDER BY date DESC LIMIT ?", (user, n)
+        )]
+        if not dates:
+            return []
+
+        sessions = {day: [] for day in dates}
+        for (data,) in conn.execute(
+            "SELECT data FROM logs WHERE user = ? AND date >= ? ORDER BY logged_at, id", (user, dates[-1])
+        ):
+            entry = json.loads(data)
+            sessions[entry["logged_at"][:10]].append(entry)
+        return [{"date": day, "entries": sessions[day]} for day in dates]
+
+    def volume_by_muscle_group(self, user, day=None):
+        """
+        Sets, reps and tonnage per muscle group for the week (Monday to
+        Sunday) containing `day`, which defaults to today.
+        """
+        start = week_start(day or date.today())
+        end = start + timedelta(days=6)
+        rows = self._conn().execute(
+            "SELECT muscle_group, SUM(sets), SUM(reps), SUM(volume) FROM logs "
+            "WHERE user = ? AND muscle_group IS NOT NULL AND date BETWEEN ? AND ? "
+            "GROUP BY muscle_group ORDER BY muscle_group",
+            (user, start.isoformat(), end.isoformat())
+        )
+        return {
+            muscle_group: {"sets": sets, "reps": reps, "volume": volume}
+            for muscle_group, sets, reps, volume in rows
+        }
+
+    def personal_records(self, user):
+        """Heaviest weight lifted per exercise: {exercise: {"weight", "logged_at"}}."""
+        rows = self._conn().execute(
+            "SELECT exercise, MAX(max_weight), logged_at FROM logs "
+            "WHERE user = ? AND max_weight IS NOT NULL GROUP BY exercise ORDER BY exercise",
+            (user,)
+        )
+        return {exercise: {"weight": weight, "logged_at": logged_at} for exercise, weight, logged_at in rows}
+
+    # Rollups
+
+    def summary(self, user, period="week", dimension="all", since=None, until=None):
+        """Pre-aggregated totals per day or week, see rollups.summary."""
+        return rollups.summary(self._conn(), user, period, dimension, since, until)
+
+    def rebuild_rollups(self, user=None):
+        return rollups.rebuild(self._conn(), user)
+
+    # Personal records and progress
+
+    def progress(self, user, exercise=None):
+        """Estimated 1RMs, rep maxes and volume trends, see progress.progress."""
+        return progress.progress(self._conn(), user, exercise)
+
+    def rebuild_progress(self, user=None):
+        return progress.rebuild(self._conn(), user)
+
+    # Calories
+
+    def refresh_exercise_ids(self, user=None):
+        """
+        Look up again the exercise ids of the logs (of `user`, or of everyone)
+        whose id is missing or no longer in the exercise table, e.g. after an
+        exercise was renamed in exercise_data. Returns the number changed.
+        """
+        where, params = ("AND user = ?", (user,)) if user is not None else ("", ())
+        conn = self._conn()
+        rows = conn.execute(
+            f"SELECT id, exercise_id, exercise, json_extract(data, '$.variant') FROM logs WHERE 1 {where}", params
+        ).fetchall()
+        updates = []
+        for log_id, exercise_id, exercise, variant in rows:
+            if exercise_id is not None and TABLE.is_known(exercise_id):
+                continue
+            new_id = TABLE.id_for(exercise, variant)
+            if new_id != exercise_id:
+                updates.append((new_id, new_id, log_id))
+        with conn:
+            conn.executemany(
+                "UPDATE logs SET exercise_id = ?, data = json_set(data, '$.exercise_id', ?) WHERE id = ?", updates
+            )
+        return len(updates)
+
+    def calorie_inputs(self, user=None, missing=False):
+        """
+        (id, exercise_id, exercise, is_cardio, body weight, duration_min,
+        speed_kmh, incline) of every log of `user` (or of everyone), to
+        recompute calories from. With `missing`, only logs stored without.
+        """
+        conditions, params = [], ()
+        if user is not None:
+            conditions.append("logs.user = ?")
+            params += (user,)
+        if missing:
+            conditions.append("json_extract(logs.data, '$.calories') IS NULL")
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return self._conn().execute(f"""
+            SELECT logs.id, logs.exercise_id, logs.exercise, logs.type = 'cardio', COALESCE(users.weight_kg, ?),
+                   json_extract(logs.data, '$.duration_min'), json_extract(logs.data, '$.speed_kmh'),
+                   json_extract(logs.data, '$.incline')
+            FROM logs LEFT JOIN users ON users.user = logs.user {where}
+        """, (DEFAULT_WEIGHT_KG,) + params).fetchall()
+
+    def set_calories(self, calories, user=None):
+        """
+        Store (log id, calories) pairs in one transaction, then rebuild the
+        rollups of `user` (or of everyone).
+        """
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "UPDATE logs SET calories = ?, data = json_set(data, '$.calories', ?) WHERE id = ?",
+                ((value, value, log_id) for log_id, value in calories)
+            )
+        self.rebuild_rollups(user)
+
+    # Migration from the old file formats
+
+    def migrate_json(self, path, user=LEGACY_USER):
+        """
+        Import a legacy exercise_logs.json array, once. The file names no
+        user, so its entries belong to LEGACY_USER until reassign_logs()
+        hands them to their owner. They have no timestamps either and get
+        the file's modification time. Entries without calories are stored
+        with 0; `calories.py recalculate --missing` fills them in.
+        """
+        return self._migrate(path, lambda: log_io.read_logs_json(path, user))
+
+    def migrate_csv(self, path):
+        """
+        Import a legacy exercise_log.csv (timestamp, user, muscle group,
+        exercise, set, reps, weight per row), once. Consecutive rows of the
+        same timestamp, user and exercise become one strength entry.
+        """
+        return self._migrate(path, lambda: log_io.read_set_csv(path))
+
+    def _migrate(self, path, rows):
+        source = os.path.abspath(path)
+        if not os.path.exists(path):
+            return 0
+
+        conn = self._conn()
+        with conn:
+            if conn.execute("SELECT 1 FROM migrations WHERE source = ?", (source,)).fetchone():
+                return 0
+            count = 0
+            for row in rows():
+                logged_at = datetime.strptime(row["logged_at"], TIMESTAMP_FORMAT)
+                self._insert(conn, row["user"], log_io.row_to_entry(row), logged_at)
+                count += 1
+            conn.execute(
+                "INSERT INTO migrations (source, entries, migrated_at) VALUES (?, ?, ?)",
+                (source, count, datetime.now().strftime(TIMESTAMP_FORMAT))
+            )
+        return count
+
+
+def get_log_store():
+    """Open the store at EXERCISE_DB_PATH (default "exercise_logs.db")."""
+    return LogStore(os.environ.get("EXERCISE_DB_PATH", "exercise_logs.db"))
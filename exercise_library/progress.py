@@ -0,0 +1,227 @@
+"""
+Personal records and progressive overload, kept up to date as sets are
+logged.
+
+For every user and exercise (and variant) the store keeps:
+    - the best estimated 1RM (Epley), with the Brzycki estimate of the
+      same set
+    - a rep-max table: the heaviest weight lifted for 1 to MAX_REP_MAX reps
+    - the tonnage of the last entry and two moving averages of it, whose
+      ratio is the volume trend (above 0 means the volume is going up)
+
+Each logged entry reads and updates one state row and at most MAX_REP_MAX
+rep-max rows, in the same transaction as the log itself, and returns the
+PR events it caused. Nothing rescans the history, except the rebuild:
+    python progress.py rebuild [--user NAME]
+
+Events are relative to what was logged before, so entries backfilled out
+of order can miss or over-report PRs until the next rebuild.
+"""
+import argparse
+import json
+
+MAX_REP_MAX = 12
+# Rep counts above this give unreliable 1RM estimates
+MAX_E1RM_REPS = 12
+FAST_ALPHA = 0.5
+SLOW_ALPHA = 0.2
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS exercise_progress (
+        user          TEXT NOT NULL,
+        exercise      TEXT NOT NULL,
+        variant       TEXT NOT NULL,
+        e1rm          REAL,
+        e1rm_brzycki  REAL,
+        e1rm_at       TEXT,
+        entries       INTEGER NOT NULL,
+        last_volume   REAL NOT NULL,
+        volume_fast   REAL NOT NULL,
+        volume_slow   REAL NOT NULL,
+        max_volume    REAL NOT NULL,
+        last_logged_at TEXT NOT NULL,
+        PRIMARY KEY (user, exercise, variant)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS rep_maxes (
+        user      TEXT NOT NULL,
+        exercise  TEXT NOT NULL,
+        variant   TEXT NOT NULL,
+        reps      INTEGER NOT NULL,
+        weight    REAL NOT NULL,
+        logged_at TEXT NOT NULL,
+        PRIMARY KEY (user, exercise, variant, reps)
+    ) WITHOUT ROWID;
+"""
+
+
+def epley(weight, reps):
+    return weight if reps == 1 else weight * (1 + reps / 30)
+
+
+def brzycki(weight, reps):
+    return weight * 36 / (37 - reps)
+
+
+def volume_trend(fast, slow):
+    return round(fast / slow - 1, 3) if slow else 0.0
+
+
+def add_entry(conn, user, entry):
+    """
+    Fold one strength entry into the user's progress, inside the caller's
+    transaction. Returns the PR events it caused:
+        {"kind": "e1rm" | "rep_max" | "volume", "exercise", "variant",
+         "value", "previous", and "reps"/"weight" for e1rm and rep_max}
+    """
+    sets = entry.get("sets") or []
+    if entry.get("type") != "strength" or not sets:
+        return []
+
+    exercise, variant = entry["exercise"], entry.get("variant") or ""
+    logged_at = entry["logged_at"]
+    key = (user, exercise, variant)
+    events = []
+
+    def event(kind, value, previous, **extra):
+        events.append(dict(kind=kind, exercise=exercise, variant=variant or None,
+                           value=round(value, 2), previous=previous, **extra))
+
+    state = conn.execute(
+        "SELECT e1rm, e1rm_brzycki, entries, volume_fast, volume_slow, max_volume FROM exercise_progress "
+        "WHERE user = ? AND exercise = ? AND variant = ?", key
+    ).fetchone()
+    rep_maxes = dict(conn.execute(
+        "SELECT reps, weight FROM rep_maxes WHERE user = ? AND exercise = ? AND variant = ?", key
+    ))
+
+    # Best estimate and rep maxes of this entry's sets
+    best_e1rm, best_set = None, None
+    entry_rep_maxes = {}
+    volume = 0.0
+    for s in sets:
+        reps, weight = s["reps"], s["weight"]
+        volume += reps * weight
+        if weight <= 0 or reps <= 0:
+            continue
+        if reps <= MAX_E1RM_REPS and (best_e1rm is None or epley(weight, reps) > best_e1rm):
+            best_e1rm, best_set = epley(weight, reps), (reps, weight)
+        if reps <= MAX_REP_MAX and weight > entry_rep_maxes.get(reps, 0):
+            entry_rep_maxes[reps] = weight
+
+    if state is None:
+        e1rm, e1rm_brzycki, entries, fast, slow, max_volume = None, None, 0, volume, volume, 0.0
+    else:
+        e1rm, e1rm_brzycki, entries, fast, slow, max_volume = state
+        fast = FAST_ALPHA * volume + (1 - FAST_ALPHA) * fast
+        slow = SLOW_ALPHA * volume + (1 - SLOW_ALPHA) * slow
+
+    e1rm_at = None
+    if best_e1rm is not None and (e1rm is None or best_e1rm > e1rm):
+        # The first entry sets the baseline, only later ones are PRs
+        if e1rm is not None:
+            event("e1rm", best_e1rm, e1rm, reps=best_set[0], weight=best_set[1])
+        e1rm, e1rm_brzycki, e1rm_at = best_e1rm, brzycki(best_set[1], best_set[0]), logged_at
+
+    for reps, weight in sorted(entry_rep_maxes.items()):
+        previous = rep_maxes.get(reps)
+        if previous is None or weight > previous:
+            if previous is not None:
+                event("rep_max", weight, previous, reps=reps, weight=weight)
+            conn.execute(
+                "INSERT OR REPLACE INTO rep_maxes (user, exercise, variant, reps, weight, logged_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", key + (reps, weight, logged_at)
+            )
+
+    if volume > max_volume:
+        if entries:
+            event("volume", volume, max_volume)
+        max_volume = volume
+
+    conn.execute("""
+        INSERT INTO exercise_progress (user, exercise, variant, e1rm, e1rm_brzycki, e1rm_at, entries,
+                                       last_volume, volume_fast, volume_slow, max_volume, last_logged_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user, exercise, variant) DO UPDATE SET
+            e1rm = excluded.e1rm,
+            e1rm_brzycki = excluded.e1rm_brzycki,
+            e1rm_at = COALESCE(excluded.e1rm_at, e1rm_at),
+            entries = excluded.entries,
+            last_volume = excluded.last_volume,
+            volume_fast = excluded.volume_fast,
+            volume_slow = excluded.volume_slow,
+            max_volume = excluded.max_volume,
+            last_logged_at = excluded.last_logged_at
+    """, key + (e1rm, e1rm_brzycki, e1rm_at, entries + 1, volume, fast, slow, max_volume, logged_at))
+    return events
+
+
+def rebuild(conn, user=None):
+    """
+    Recompute the progress of `user` (or of everyone) by replaying the
+    strength logs in time order, in one transaction. Returns the number of
+    entries replayed.
+    """
+    where, params = ("AND user = ?", (user,)) if user is not None else ("", ())
+    count = 0
+    with conn:
+        conn.execute(f"DELETE FROM exercise_progress WHERE 1 {where}", params)
+        conn.execute(f"DELETE FROM rep_maxes WHERE 1 {where}", params)
+        rows = conn.execute(
+            f"SELECT user, data FROM logs WHERE type = 'strength' {where} ORDER BY user, logged_at, id", params
+        )
+        for log_user, data in rows:
+            add_entry(conn, log_user, json.loads(data))
+            count += 1
+    return count
+
+
+def progress(conn, user, exercise=None):
+    """
+    Current numbers per exercise (and variant) of `user`, or of one
+    exercise: {"exercise", "variant", "e1rm", "e1rm_brzycki", "e1rm_at",
+    "rep_maxes": {reps: weight}, "entries", "last_volume", "max_volume",
+    "volume_trend", "last_logged_at"}.
+    """
+    where, params = ("AND exercise = ?", (user, exercise)) if exercise else ("", (user,))
+    results = {}
+    for (name, variant, e1rm, e1rm_brzycki, e1rm_at, entries, last_volume, fast, slow, max_volume,
+         last_logged_at) in conn.execute(f"""
+            SELECT exercise, variant, e1rm, e1rm_brzycki, e1rm_at, entries, last_volume, volume_fast,
+                   volume_slow, max_volume, last_logged_at
+            FROM exercise_progress WHERE user = ? {where} ORDER BY exercise, variant
+         """, params):
+        results[(name, variant)] = {
+            "exercise": name,
+            "variant": variant or None,
+            "e1rm": round(e1rm, 2) if e1rm is not None else None,
+            "e1rm_brzycki": round(e1rm_brzycki, 2) if e1rm_brzycki is not None else None,
+            "e1rm_at": e1rm_at,
+            "rep_maxes": {},
+            "entries": entries,
+            "last_volume": last_volume,
+            "max_volume": max_volume,
+            "volume_trend": volume_trend(fast, slow),
+            "last_logged_at": last_logged_at,
+        }
+
+    for name, variant, reps, weight in conn.execute(
+        f"SELECT exercise, variant, reps, weight FROM rep_maxes WHERE user = ? {where} ORDER BY reps", params
+    ):
+        results[(name, variant)]["rep_maxes"][reps] = weight
+    return list(results.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the personal records and progress tables")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user", help="Only rebuild this user's progress")
+    args = parser.parse_args()
+
+    from log_store import get_log_store
+
+    count = get_log_store().rebuild_progress(args.user)
+    print(f"Replayed {count} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Pre-aggregated progress totals for the exercise log store.
+
+Every saved entry adds its calories, sets, reps and tonnage to a handful of
+buckets in the same transaction: one per period (day, week) and dimension
+(all exercises, its muscle group, the exercise itself). Progress views then
+read O(buckets) rows instead of every log.
+
+Rebuild the buckets from the logs after a backfill or a schema change:
+    python rollups.py rebuild [--user NAME]
+"""
+import argparse
+from datetime import date, timedelta
+
+PERIODS = ("day", "week")
+DIMENSIONS = ("all", "muscle_group", "exercise")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rollups (
+        user      TEXT NOT NULL,
+        period    TEXT NOT NULL,
+        bucket    TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        key       TEXT NOT NULL,
+        entries   INTEGER NOT NULL,
+        calories  REAL NOT NULL,
+        sets      INTEGER NOT NULL,
+        reps      INTEGER NOT NULL,
+        volume    REAL NOT NULL,
+        PRIMARY KEY (user, period, dimension, bucket, key)
+    ) WITHOUT ROWID;
+"""
+
+UPSERT = """
+    INSERT INTO rollups (user, period, bucket, dimension, key, entries, calories, sets, reps, volume)
+    VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?)
+    ON CONFLICT (user, period, dimension, bucket, key) DO UPDATE SET
+        entries = entries + 1,
+        calories = calories + excluded.calories,
+        sets = sets + excluded.sets,
+        reps = reps + excluded.reps,
+        volume = volume + excluded.volume
+"""
+
+
+def set_totals(sets):
+    """Number of sets, total reps, tonnage (reps x weight) and heaviest weight."""
+    reps = sum(s["reps"] for s in sets)
+    volume = sum(s["reps"] * s["weight"] for s in sets)
+    max_weight = max((s["weight"] for s in sets), default=None)
+    return len(sets), reps, volume, max_weight
+
+
+def week_start(day):
+    # Weeks start on Monday
+    return day - timedelta(days=day.weekday())
+
+
+def bucket_for(period, day):
+    return (day if period == "day" else week_start(day)).isoformat()
+
+
+def add_entry(conn, user, entry, day):
+    """Add one log entry to its buckets, inside the caller's transaction."""
+    sets, reps, volume, _ = set_totals(entry.get("sets", []))
+    totals = (entry.get("calories", 0), sets, reps, volume)
+    keys = {"all": "", "muscle_group": entry.get("muscle_group") or entry["type"], "exercise": entry["exercise"]}
+
+    conn.executemany(UPSERT, [
+        (user, period, bucket_for(period, day), dimension, keys[dimension]) + totals
+        for period in PERIODS
+        for dimension in DIMENSIONS
+    ])
+
+
+def rebuild(conn, user=None):
+    """
+    Recompute the buckets of `user` (or of everyone) from the logs table in
+    one transaction. Returns the number of buckets written.
+    """
+    where, params = ("WHERE user = ?", (user,)) if user is not None else ("", ())
+    keys = {"all": "''", "muscle_group": "COALESCE(muscle_group, type)", "exercise": "exercise"}
+    buckets = {"day": "date", "week": "date(date, '-' || ((CAST(strftime('%w', date) AS INTEGER) + 6) % 7) || ' days')"}
+
+    with conn:
+        conn.execute(f"DELETE FROM rollups {where}", params)
+        for period, bucket in buckets.items():
+            for dimension, key in keys.items():
+                conn.execute(f"""
+                    INSERT INTO rollups (user, period, bucket, dimension, key, entries, calories, sets, reps, volume)
+                    SELECT user, ?, {bucket}, ?, {key}, COUNT(*), SUM(calories), SUM(sets), SUM(reps), SUM(volume)
+                    FROM logs {where}
+                    GROUP BY user, {bucket}, {key}
+                """, (period, dimension) + params)
+        return conn.execute(f"SELECT COUNT(*) FROM rollups {where}", params).fetchone()[0]
+
+
+def summary(conn, user, period="week", dimension="all", since=None, until=None):
+    """
+    Totals per bucket: [{"bucket", "key", "entries", "calories", "sets",
+    "reps", "volume"}, ...] ordered by bucket, for buckets starting between
+    `since` and `until` (dates or "YYYY-MM-DD").
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown dimension: {dimension}")
+
+    query = ("SELECT bucket, key, entries, calories, sets, reps, volume FROM rollups "
+             "WHERE user = ? AND period = ? AND dimension = ?")
+    params = [user, period, dimension]
+    if since is not None:
+        query += " AND bucket >= ?"
+        params.append(bucket_for(period, date.fromisoformat(str(since))))
+    if until is not None:
+        query += " AND bucket <= ?"
+        params.append(str(until))
+    query += " ORDER BY bucket, key"
+
+    columns = ("bucket", "key", "entries", "calories", "sets", "reps", "volume")
+    return [dict(zip(columns, row)) for row in conn.execute(query, params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the exercise progress rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user", help="Only rebuild this user's buckets")
+    args = parser.parse_args()
+
+    from log_store import get_log_store
+
+    count = get_log_store().rebuild_rollups(args.user)
+    print(f"Rebuilt {count} buckets")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,7 @@ const SquatDetector = () => {
   const videoRef = useRef(null)
   const canvasRef = useRef(null)
   const wsRef = useRef(null)
+  const sessionTokenRef = useRef(null)
   const streamRef = useRef(null)
   const animationRef = useRef(null)
   
@@ -347,6 +348,10 @@ const SquatDetector = () => {
         wsRef.current.onopen = () => {
           debugLog('WebSocket connected successfully')
           setIsConnected(true)
+          if (sessionTokenRef.current) {
+            debugLog('Resuming previous session')
+            wsRef.current.send(`resume_${sessionTokenRef.current}`)
+          }
           const modeMessage = mode === 'beginner' ? 'mode_beginner' : 'mode_pro'
           debugLog('Sending initial mode:', modeMessage)
           wsRef.current.send(modeMessage)
@@ -400,6 +405,14 @@ const SquatDetector = () => {
               })
             }
             
+            if (data.session_token) {
+              sessionTokenRef.current = data.session_token
+            }
+            
+            if (data.resumed !== undefined) {
+              debugLog(`Session ${data.resumed ? 'resumed' : 'could not be resumed'}`)
+            }
+            
             if (data.mode_changed) {
               debugLog(`Mode changed to ${data.mode_changed}`)
             }
@@ -302,25 +302,21 @@ const VideoUpload = ({ mode }) => {
 								<div className="bg-cosmic rounded-lg overflow-hidden">
 {result.processed_video_url ? (
 	<div className="relative pt-[56.25%]">
-		{result.processed_video_url.endsWith('.gif') ? (
-			// For GIF files
-			<img
+		<video 
+			className="absolute inset-0 w-full h-full rounded-lg"
+			controls
+			autoPlay
+			muted
+			loop
+			playsInline
+			poster={result.thumbnail_url || ''}
+		>
+			<source
 				src={result.processed_video_url}
-				className="absolute inset-0 w-full h-full rounded-lg object-contain"
-				alt="Processed workout animation"
+				type={result.processed_video_url.endsWith('.webm') ? 'video/webm' : 'video/mp4'}
 			/>
-		) : (
-			// For video files (fallback)
-			<video 
-				className="absolute inset-0 w-full h-full rounded-lg"
-				controls
-				autoPlay
-				poster={result.thumbnail_url || ''}
-			>
-				<source src={result.processed_video_url} type="video/mp4" />
-				Your browser does not support the video tag.
-			</video>
-		)}
+			Your browser does not support the video tag.
+		</video>
 	</div>
 ) : (
 	<div className="w-full h-48 flex items-center justify-center bg-gray-100 rounded-lg">
@@ -331,6 +327,28 @@ const VideoUpload = ({ mode }) => {
 								<p className="text-sm text-gray-500 mt-2">
 									Mode: <span className="font-medium">{result.mode}</span>
 								</p>
+								{result.sprite_url && result.sprite && (
+									// One row of the sprite sheet per rep
+									<div className="mt-4 space-y-2 overflow-x-auto">
+										{result.sprite.reps.map((rep, index) => (
+											<div key={index} className="flex items-center gap-3">
+												<span className={`text-sm font-medium w-16 ${rep.correct ? 'text-emerald' : 'text-pastel'}`}>
+													Rep {index + 1}
+												</span>
+												<div
+													className="rounded flex-shrink-0"
+													title={`${rep.start_seconds}s - ${rep.end_seconds}s`}
+													style={{
+														width: result.sprite.tile_width * result.sprite.columns,
+														height: result.sprite.tile_height,
+														backgroundImage: `url(${result.sprite_url})`,
+														backgroundPosition: `0 -${index * result.sprite.tile_height}px`
+													}}
+												/>
+											</div>
+										))}
+									</div>
+								)}
 							</div>
 							<div className="md:w-1/3 bg-antique rounded-lg p-4">
 								<h3 className="font-semibold text-dark mb-3">Video Results</h3>
@@ -0,0 +1,386 @@
+"""
+Golden-video regression and micro-benchmark harness for ProcessFrame.
+
+Golden files (benchmarks/golden/*.json) hold the pose landmarks recorded
+for a clip together with the expected squat counts and feedback sequence.
+`check` replays the landmarks through squat_analysis.ProcessFrame, the
+core used by the FastAPI service and the Streamlit pages, so no MediaPipe
+(or GPU) is needed. It asserts that the results match the golden ones and
+reports per-stage timings.
+
+Usage (from the ml directory):
+    python benchmarks/golden.py record --clip ../squats/output_sample.mp4
+    python benchmarks/golden.py check
+    python benchmarks/golden.py check --pose live --output timings.json
+    python benchmarks/golden.py check --pose-skip 3 --motion 0.02
+    python benchmarks/golden.py check --roi --pose-skip 3
+
+--pose-skip/--motion run the clips through SkippingPose, to weigh the
+inference saved against the counts it gets wrong. Skipping changes the
+feedback timing: a rep is only seen once the next inferred frame lands, so
+feedback may come up to N-1 frames later than recorded. In skip mode the
+counts and feedback sequence must still match exactly, but each feedback
+frame may lag by up to --frame-tolerance frames (N-1 by default).
+
+--roi crops pose inference to the athlete. Replayed landmarks are mapped
+into the crop, so cropping and the mapping back to the frame are checked
+without MediaPipe, alone or together with --pose-skip.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import time
+import types
+
+import cv2
+import numpy as np
+
+ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+REPO_DIR = os.path.dirname(ML_DIR)
+GOLDEN_DIR = os.path.join(ML_DIR, 'benchmarks', 'golden')
+
+sys.path.append(REPO_DIR)
+
+from squat_analysis import (
+    PoseRecorder,
+    ReplayPose,
+    SkippingPose,
+    get_mediapipe_pose,
+    get_thresholds_beginner,
+    get_thresholds_pro,
+)
+from squat_analysis import pose_filter, process_frame
+from squat_analysis.pose_replay import Landmark, PoseLandmarks, PoseResult
+
+# Stages reported per frame; 'drawing' is whatever process() spends outside
+# of pose inference, landmark features and flipping.
+STAGES = ('decode', 'pose', 'features', 'drawing', 'flip', 'encode')
+
+
+@contextlib.contextmanager
+def patched(module, **attrs):
+    # Temporarily replace module globals, restoring them afterwards.
+    saved = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+class FrameClock:
+    # Stands in for the `time` module inside process_frame, so inactivity
+    # timers advance with the video instead of with the benchmark speed.
+    def __init__(self, fps):
+        self.frame_time = 1.0 / fps
+        self.now = 0.0
+
+    def tick(self):
+        self.now += self.frame_time
+
+    def perf_counter(self):
+        return self.now
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self._frame = dict.fromkeys(STAGES, 0.0)
+
+    def add(self, stage, seconds):
+        self._frame[stage] += seconds
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def end_frame(self):
+        for stage, seconds in self._frame.items():
+            self.samples[stage].append(seconds)
+        self._frame = dict.fromkeys(STAGES, 0.0)
+
+    def summary(self):
+        result = {}
+        for stage, samples in self.samples.items():
+            samples_ms = np.array(samples) * 1000
+            result[stage] = {
+                'mean_ms': round(float(samples_ms.mean()), 3) if len(samples_ms) else None,
+                'p95_ms': round(float(np.percentile(samples_ms, 95)), 3) if len(samples_ms) else None,
+            }
+        return result
+
+
+class CroppedReplay:
+    # Replays full-frame landmarks in the coordinates of the RoiCropper crop
+    # it is handed, the way MediaPipe would report them on that crop.
+    def __init__(self, replay, roi):
+        self.replay = replay
+        self.roi = roi
+        self.frame_shape = None
+
+    def process(self, image):
+        result = self.replay.process(image)
+        box = self.roi.box
+        if box is None:
+            self.frame_shape = image.shape[:2]
+            return result
+        x0, y0, x1, y1 = box
+        if not result.pose_landmarks or image.shape[:2] != (y1 - y0, x1 - x0):
+            return result
+
+        frame_height, frame_width = self.frame_shape
+        crop_width, crop_height = x1 - x0, y1 - y0
+        return PoseResult(PoseLandmarks([
+            Landmark((lm.x * frame_width - x0) / crop_width, (lm.y * frame_height - y0) / crop_height,
+                     lm.z * frame_width / crop_width, lm.visibility)
+            for lm in result.pose_landmarks.landmark
+        ]))
+
+
+# ---------------------------------- Running ----------------------------------
+
+def iter_frames(clip_path, timer=None):
+    cap = cv2.VideoCapture(clip_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open clip: {clip_path}")
+    try:
+        while True:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if timer:
+                timer.add('decode', time.perf_counter() - start)
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
+def clip_fps(clip_path):
+    cap = cv2.VideoCapture(clip_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return fps
+
+
+def run_clip(clip_path, thresholds, pose, fps, timer=None, roi_crop=False):
+    """
+    Run one clip through ProcessFrame and return counts and the per-frame
+    feedback sequence. With a timer, stages are timed as well.
+    """
+    clock = FrameClock(fps)
+    patches = {'time': clock}
+
+    # Skipped frames never reach a replayed pose, so it follows the frame index
+    replay = pose.pose if isinstance(pose, SkippingPose) else pose
+    if not isinstance(replay, ReplayPose):
+        replay = None
+
+    processor = process_frame.ProcessFrame(thresholds=thresholds, flip_frame=True, roi_crop=roi_crop)
+    if replay and roi_crop:
+        if isinstance(pose, SkippingPose):
+            pose.pose = CroppedReplay(pose.pose, processor.roi)
+        else:
+            pose = CroppedReplay(pose, processor.roi)
+
+    if timer:
+        # Instrument the names process() looks up in its own module
+        cv2_proxy = types.SimpleNamespace(**{name: getattr(cv2, name) for name in dir(cv2) if not name.startswith('__')})
+        cv2_proxy.flip = timer.wrap('flip', cv2.flip)
+        patches.update(
+            get_landmark_features=timer.wrap('features', process_frame.get_landmark_features),
+            find_angle=timer.wrap('features', process_frame.find_angle),
+            cv2=cv2_proxy,
+        )
+        if isinstance(pose, SkippingPose):
+            # ProcessFrame hands a SkippingPose the crop itself, keep its type
+            pose.process = timer.wrap('pose', pose.process)
+        else:
+            pose = types.SimpleNamespace(process=timer.wrap('pose', pose.process))
+
+    with patched(process_frame, **patches), patched(pose_filter, time=clock):
+        feedback = []
+
+        for frame_idx, frame in enumerate(iter_frames(clip_path, timer)):
+            clock.tick()
+            if replay:
+                replay.seek(frame_idx)
+
+            start = time.perf_counter()
+            processed_frame, play_sound = processor.process(frame, pose)
+            elapsed = time.perf_counter() - start
+
+            if timer:
+                timer.add('drawing', elapsed - sum(timer._frame[stage] for stage in ('pose', 'features', 'flip')))
+                start = time.perf_counter()
+                cv2.imencode('.jpg', processed_frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                timer.add('encode', time.perf_counter() - start)
+                timer.end_frame()
+
+            if play_sound:
+                feedback.append([frame_idx, play_sound])
+
+    return {
+        'squats_correct': int(processor.state_tracker['SQUAT_COUNT']),
+        'squats_incorrect': int(processor.state_tracker['IMPROPER_SQUAT']),
+        'feedback': feedback,
+    }
+
+
+def compare(result, expected, frame_tolerance=0):
+    """
+    True if the counts and feedback sounds match the expected ones and every
+    feedback frame is at most `frame_tolerance` frames later than expected.
+    """
+    if result['squats_correct'] != expected['squats_correct'] or \
+            result['squats_incorrect'] != expected['squats_incorrect'] or \
+            len(result['feedback']) != len(expected['feedback']):
+        return False
+    return all(
+        sound == expected_sound and 0 <= frame - expected_frame <= frame_tolerance
+        for (frame, sound), (expected_frame, expected_sound) in zip(result['feedback'], expected['feedback'])
+    )
+
+
+def get_thresholds(mode):
+    return get_thresholds_beginner() if mode == 'beginner' else get_thresholds_pro()
+
+
+def record(args):
+    clip_path = os.path.abspath(args.clip)
+    fps = clip_fps(clip_path)
+    recorder = PoseRecorder(get_mediapipe_pose())
+    for frame in iter_frames(clip_path):
+        recorder.process(frame)
+    recorder.close()
+    frames = recorder.frames
+
+    # Expected results come from replaying the (rounded) recording, so the
+    # golden file is self-consistent.
+    expected = run_clip(clip_path, get_thresholds(args.mode), ReplayPose(frames), fps)
+
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    name = args.name or os.path.splitext(os.path.basename(clip_path))[0]
+    golden_path = os.path.join(GOLDEN_DIR, f'{name}.json')
+    with open(golden_path, 'w') as f:
+        json.dump({
+            'clip': os.path.relpath(clip_path, GOLDEN_DIR),
+            'mode': args.mode,
+            'fps': fps,
+            'expected': expected,
+            'frames': frames,
+        }, f, separators=(',', ':'))
+
+    print(f"Recorded {len(frames)} frames to {golden_path}: "
+          f"{expected['squats_correct']} correct, {expected['squats_incorrect']} incorrect")
+
+
+def check(args):
+    golden_paths = args.golden or sorted(glob.glob(os.path.join(GOLDEN_DIR, '*.json')))
+    if not golden_paths:
+        print(f"No golden files found in {GOLDEN_DIR}")
+        return 1
+
+    failures = 0
+    report = {}
+    live_pose = get_mediapipe_pose() if args.pose == 'live' else None
+    frame_tolerance = args.frame_tolerance
+    if frame_tolerance is None:
+        frame_tolerance = max(0, args.pose_skip - 1)
+
+    for golden_path in golden_paths:
+        with open(golden_path) as f:
+            golden = json.load(f)
+        name = os.path.splitext(os.path.basename(golden_path))[0]
+        clip_path = os.path.normpath(os.path.join(os.path.dirname(golden_path), golden['clip']))
+        thresholds = get_thresholds(golden['mode'])
+
+        timer = StageTimer()
+        results = []
+        inferred = []
+        for _ in range(args.repeat):
+            pose = live_pose or ReplayPose(golden['frames'])
+            if args.pose_skip > 1:
+                pose = SkippingPose(pose, every=args.pose_skip, motion=args.motion)
+            results.append(run_clip(clip_path, thresholds, pose, golden['fps'], timer, roi_crop=args.roi))
+            if isinstance(pose, SkippingPose):
+                inferred.append(pose.frames_inferred / max(1, pose.frames_inferred + pose.frames_skipped))
+
+        result = results[0]
+        matches = all(compare(r, golden['expected'], frame_tolerance) for r in results)
+        if not matches:
+            failures += 1
+        report[name] = {
+            'matches_golden': matches,
+            'squats_correct': result['squats_correct'],
+            'squats_incorrect': result['squats_incorrect'],
+            'frames': len(golden['frames']),
+            'pose_inferred': round(sum(inferred) / len(inferred), 3) if inferred else 1.0,
+            'stages': timer.summary(),
+        }
+
+        status = 'OK' if matches else 'MISMATCH'
+        if matches and result != golden['expected']:
+            status = f'OK, feedback within {frame_tolerance} frames'
+        print(f"[{status}] {name}: "
+              f"{result['squats_correct']} correct, {result['squats_incorrect']} incorrect "
+              f"(expected {golden['expected']['squats_correct']}, {golden['expected']['squats_incorrect']}), "
+              f"pose inferred on {report[name]['pose_inferred']:.0%} of frames")
+        if not matches:
+            print(f"    feedback: {result['feedback']}")
+            print(f"    expected: {golden['expected']['feedback']}")
+        print("    " + ", ".join(
+            f"{stage} {timing['mean_ms']:.2f}ms" for stage, timing in report[name]['stages'].items()
+        ))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f"Timings saved to {args.output}")
+
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden-video regression and benchmarks for ProcessFrame")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="Record landmarks and expected results for a clip")
+    record_parser.add_argument('--clip', required=True)
+    record_parser.add_argument('--mode', choices=['beginner', 'pro'], default='beginner')
+    record_parser.add_argument('--name', help="Golden file name (defaults to the clip name)")
+
+    check_parser = subparsers.add_parser('check', help="Replay golden files and compare the results")
+    check_parser.add_argument('golden', nargs='*', help="Golden files (defaults to all in benchmarks/golden)")
+    check_parser.add_argument('--pose', choices=['replay', 'live'], default='replay',
+                              help="Replay recorded landmarks or run MediaPipe")
+    check_parser.add_argument('--repeat', type=int, default=1, help="Runs per clip, for steadier timings")
+    check_parser.add_argument('--output', help="Write the timings to this JSON file")
+    check_parser.add_argument('--roi', action='store_true', help="Run pose inference on a crop around the athlete")
+    check_parser.add_argument('--pose-skip', type=int, default=1, metavar='N',
+                              help="Run pose inference on every Nth frame only, see SkippingPose")
+    check_parser.add_argument('--motion', type=float,
+                              help="With --pose-skip, also infer when the frame changes by more than this (0-1)")
+    check_parser.add_argument('--frame-tolerance', type=int, metavar='N',
+                              help="Frames a feedback may lag behind the golden one "
+                                   "(defaults to 0, or to --pose-skip minus 1 when skipping)")
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args)
+        return 0
+    return check(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
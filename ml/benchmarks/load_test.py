@@ -0,0 +1,291 @@
+"""
+Load generator for the squat analysis service (main.py).
+
+Replays recorded clips as concurrent /ws clients, speaking the same
+data-URL protocol as frontend/src/components/SquatDetector.js, and
+optionally submits concurrent /upload-video jobs. Results are printed and
+saved as JSON so runs can be compared.
+
+Usage (from the ml directory, with the server running):
+    python benchmarks/load_test.py --clip ../squats/output_sample.mp4 \
+        --clients 4 --fps 10 --duration 30 --uploads 2 --output load_results.json
+
+Start the server with POSE_REPLAY_FILE=benchmarks/golden/output_sample.json
+to replay recorded landmarks instead of running MediaPipe, which measures
+decode, state machine, drawing and encoding on their own.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import time
+import urllib.request
+import uuid
+from collections import deque
+from datetime import datetime
+
+import cv2
+import websockets
+
+
+def load_frames(clip_paths, width=640, height=480, jpeg_quality=50, max_frames=300):
+    # Pre-encode the clips once so the client side does not limit the rate.
+    # Same as the browser: canvas sized to the video, toDataURL('image/jpeg', 0.5).
+    frames = []
+    for clip_path in clip_paths:
+        cap = cv2.VideoCapture(clip_path)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Could not open clip: {clip_path}")
+
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame = cv2.resize(frame, (width, height))
+            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+            frames.append("data:image/jpeg;base64," + base64.b64encode(buffer).decode('utf-8'))
+        cap.release()
+
+    if not frames:
+        raise ValueError("No frames could be read from the clips")
+    return frames
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return round(ordered[index], 2)
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def post_video(base_url, clip_path, mode):
+    # Minimal multipart/form-data body, same fields as VideoUpload.js
+    boundary = uuid.uuid4().hex
+    with open(clip_path, "rb") as f:
+        video_bytes = f.read()
+
+    body = b"".join([
+        f"--{boundary}\r\n".encode(),
+        b'Content-Disposition: form-data; name="mode"\r\n\r\n',
+        mode.encode(), b"\r\n",
+        f"--{boundary}\r\n".encode(),
+        f'Content-Disposition: form-data; name="video"; filename="{os.path.basename(clip_path)}"\r\n'.encode(),
+        b"Content-Type: video/mp4\r\n\r\n",
+        video_bytes, b"\r\n",
+        f"--{boundary}--\r\n".encode(),
+    ])
+    request = urllib.request.Request(
+        f"{base_url}/upload-video",
+        data=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.loads(response.read())
+
+
+async def run_ws_client(ws_url, frames, fps, duration, mode, offset, drain_timeout, pose_skip=None):
+    result = {"sent": 0, "received": 0, "errors": 0, "latencies_ms": []}
+    pending = deque()
+
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        await ws.send(f"mode_{mode}")
+        if pose_skip:
+            await ws.send("pose_skip_" + json.dumps(pose_skip))
+
+        async def receive():
+            async for message in ws:
+                data = json.loads(message)
+                # Only frames are answered with an image (or an error), in order
+                if "image" not in data and "error" not in data:
+                    continue
+                if not pending:
+                    continue
+                sent_at = pending.popleft()
+                if "error" in data:
+                    result["errors"] += 1
+                else:
+                    result["received"] += 1
+                    result["latencies_ms"].append((time.perf_counter() - sent_at) * 1000)
+
+        receiver = asyncio.create_task(receive())
+
+        interval = 1.0 / fps
+        start = time.perf_counter()
+        index = offset
+        while time.perf_counter() - start < duration:
+            pending.append(time.perf_counter())
+            await ws.send(frames[index % len(frames)])
+            result["sent"] += 1
+            index += 1
+
+            # Fixed-rate schedule like the browser, regardless of responses
+            next_send = start + result["sent"] * interval
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+        # Give in-flight frames a chance to come back, the rest count as dropped
+        drain_deadline = time.perf_counter() + drain_timeout
+        while pending and time.perf_counter() < drain_deadline:
+            await asyncio.sleep(0.05)
+
+        receiver.cancel()
+        result["seconds"] = time.perf_counter() - start
+
+    result["dropped"] = len(pending)
+    return result
+
+
+async def run_uploads(base_url, clip_path, count, mode, poll_interval=1.0, timeout=600.0):
+    loop = asyncio.get_running_loop()
+
+    async def one_upload():
+        start = time.perf_counter()
+        try:
+            response = await loop.run_in_executor(None, post_video, base_url, clip_path, mode)
+        except Exception as e:
+            return {"status": "rejected", "error": str(e)}
+
+        video_id = response["video_id"]
+        while time.perf_counter() - start < timeout:
+            await asyncio.sleep(poll_interval)
+            status = await loop.run_in_executor(None, get_json, f"{base_url}/video-status/{video_id}")
+            if status["status"] in ("completed", "failed"):
+                return {"status": status["status"], "seconds": time.perf_counter() - start}
+        return {"status": "timeout", "seconds": timeout}
+
+    return await asyncio.gather(*(one_upload() for _ in range(count)))
+
+
+async def run(args):
+    base_url = args.url.rstrip("/")
+    ws_url = base_url.replace("http", "ws", 1) + "/ws"
+
+    frames = load_frames(args.clip, jpeg_quality=args.jpeg_quality)
+    print(f"Loaded {len(frames)} frames, "
+          f"avg {sum(map(len, frames)) / len(frames) / 1024:.1f} KiB per message")
+
+    stats_before = get_json(f"{base_url}/stats")["server_stats"]
+    peak_rss = stats_before.get("rss_mb")
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            await asyncio.sleep(2.0)
+            try:
+                rss = get_json(f"{base_url}/stats")["server_stats"].get("rss_mb")
+            except Exception:
+                continue
+            if rss is not None:
+                peak_rss = max(peak_rss or 0.0, rss)
+
+    sampler = asyncio.create_task(sample_rss())
+    start = time.perf_counter()
+
+    pose_skip = {"every": args.pose_skip, "motion": args.motion} if args.pose_skip > 1 else None
+    ws_tasks = [
+        run_ws_client(ws_url, frames, args.fps, args.duration, args.mode,
+                      offset=i * 7, drain_timeout=args.drain_timeout, pose_skip=pose_skip)
+        for i in range(args.clients)
+    ]
+    upload_task = run_uploads(base_url, args.upload_clip or args.clip[0], args.uploads, args.mode)
+    *clients, uploads = await asyncio.gather(*ws_tasks, upload_task)
+
+    wall_seconds = time.perf_counter() - start
+    sampler.cancel()
+    stats_after = get_json(f"{base_url}/stats")["server_stats"]
+
+    latencies = [latency for client in clients for latency in client["latencies_ms"]]
+    sent = sum(client["sent"] for client in clients)
+    received = sum(client["received"] for client in clients)
+    dropped = sum(client["dropped"] for client in clients)
+    upload_seconds = [upload["seconds"] for upload in uploads if upload["status"] == "completed"]
+    # Uploads may outlive the streams, so throughput uses the streaming time
+    ws_seconds = max((client["seconds"] for client in clients), default=0.0)
+
+    cpu_before = stats_before.get("cpu_seconds")
+    cpu_after = stats_after.get("cpu_seconds")
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "url": base_url,
+            "clips": args.clip,
+            "clients": args.clients,
+            "target_fps": args.fps,
+            "duration_seconds": args.duration,
+            "uploads": args.uploads,
+            "mode": args.mode,
+            "jpeg_quality": args.jpeg_quality,
+            "pose_skip": args.pose_skip,
+            "motion": args.motion
+        },
+        "websocket": {
+            "frames_sent": sent,
+            "frames_received": received,
+            "frames_failed": sum(client["errors"] for client in clients),
+            "frames_dropped": dropped,
+            "drop_rate": round(dropped / sent, 4) if sent else None,
+            "throughput_fps": round(received / ws_seconds, 2) if ws_seconds else None,
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": percentile(latencies, 100)
+            }
+        },
+        "uploads": {
+            "submitted": len(uploads),
+            "completed": len(upload_seconds),
+            "failed": sum(1 for upload in uploads if upload["status"] != "completed"),
+            "seconds_p50": percentile(upload_seconds, 50),
+            "seconds_max": percentile(upload_seconds, 100)
+        },
+        "server": {
+            "workers": stats_after.get("workers"),
+            "cpu_percent": round(100 * (cpu_after - cpu_before) / wall_seconds, 1)
+                           if cpu_before is not None and cpu_after is not None else None,
+            "rss_mb_peak": peak_rss
+        },
+        "wall_seconds": round(wall_seconds, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the squat analysis service")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the service")
+    parser.add_argument("--clip", action="append", required=True, help="Clip to replay (repeatable)")
+    parser.add_argument("--clients", type=int, default=1, help="Concurrent /ws clients")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frames per second per client")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds each client streams")
+    parser.add_argument("--uploads", type=int, default=0, help="Concurrent /upload-video jobs")
+    parser.add_argument("--upload-clip", help="Clip to upload (defaults to the first --clip)")
+    parser.add_argument("--mode", choices=["beginner", "pro"], default="beginner")
+    parser.add_argument("--jpeg-quality", type=int, default=50)
+    parser.add_argument("--drain-timeout", type=float, default=5.0,
+                        help="Seconds to wait for in-flight frames before counting them as dropped")
+    parser.add_argument("--pose-skip", type=int, default=1, metavar="N",
+                        help="Ask the server to run pose inference on every Nth frame only")
+    parser.add_argument("--motion", type=float, help="With --pose-skip, also infer on motion above this (0-1)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=4))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
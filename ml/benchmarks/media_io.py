@@ -0,0 +1,123 @@
+"""
+Throughput benchmark for the video upload pipeline (decode, ProcessFrame,
+encode), comparing the old synchronous cv2.VideoCapture/VideoWriter loop
+with squat_analysis.media's threaded reader and writer on each backend.
+
+Landmarks are replayed from a golden file by default, which leaves decode,
+drawing and encode as the measured work; --pose live runs MediaPipe, where
+the threads hide decode and encode behind inference.
+
+Usage (from the ml directory):
+    python benchmarks/media_io.py
+    python benchmarks/media_io.py benchmarks/golden/squats.json --pose live --output media_io.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+REPO_DIR = os.path.dirname(ML_DIR)
+GOLDEN_DIR = os.path.join(ML_DIR, 'benchmarks', 'golden')
+
+sys.path.append(REPO_DIR)
+
+from squat_analysis import ProcessFrame, ReplayPose, get_mediapipe_pose, get_thresholds_beginner
+from squat_analysis.media import VideoReader, VideoWriter, pyav_available
+
+
+def run_sync(clip_path, output_path, processor, pose):
+    # The loop process_video_file used before the media layer
+    cap = cv2.VideoCapture(clip_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+
+    frames = 0
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        processed_frame, _ = processor.process(frame, pose)
+        out.write(processed_frame)
+        frames += 1
+
+    cap.release()
+    out.release()
+    return frames
+
+
+def run_threaded(clip_path, output_path, processor, pose, backend):
+    frames = 0
+    with VideoReader(clip_path, backend=backend) as reader:
+        with VideoWriter(output_path, reader.fps, (reader.width, reader.height), backend=backend) as out:
+            for frame in reader:
+                processed_frame, _ = processor.process(frame, pose)
+                out.write(processed_frame)
+                frames += 1
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark video decode/encode for uploads")
+    parser.add_argument('golden', nargs='?', default=os.path.join(GOLDEN_DIR, 'output_sample.json'),
+                        help="Golden file whose clip (and landmarks) to use")
+    parser.add_argument('--pose', choices=['replay', 'live'], default='replay')
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per variant, the fastest is reported")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.golden) as f:
+        golden = json.load(f)
+    clip_path = os.path.normpath(os.path.join(os.path.dirname(args.golden), golden['clip']))
+
+    variants = {'sync-opencv': None, 'threaded-opencv': 'opencv'}
+    if pyav_available():
+        variants['threaded-pyav'] = 'pyav'
+    else:
+        print("PyAV is not installed, skipping the pyav backend")
+
+    live_pose = get_mediapipe_pose() if args.pose == 'live' else None
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, backend in variants.items():
+            output_path = os.path.join(tmp_dir, f'{name}.mp4')
+            timings = []
+            for _ in range(args.repeat):
+                processor = ProcessFrame(thresholds=get_thresholds_beginner(), flip_frame=True)
+                pose = live_pose or ReplayPose(golden['frames'])
+
+                start = time.perf_counter()
+                if backend is None:
+                    frames = run_sync(clip_path, output_path, processor, pose)
+                else:
+                    frames = run_threaded(clip_path, output_path, processor, pose, backend)
+                timings.append(time.perf_counter() - start)
+
+            seconds = min(timings)
+            results[name] = {
+                'frames': frames,
+                'seconds': round(seconds, 3),
+                'fps': round(frames / seconds, 1),
+                'output_mb': round(os.path.getsize(output_path) / (1024 * 1024), 2),
+            }
+
+    baseline = results['sync-opencv']['seconds']
+    for name, result in results.items():
+        result['speedup'] = round(baseline / result['seconds'], 2)
+        print(f"{name:16s} {result['fps']:7.1f} fps  {result['seconds']:6.2f}s  "
+              f"x{result['speedup']:.2f}  {result['output_mb']:.2f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Parsing benchmark for ml/datasets/nutrition.csv, whose nutrient values are
+strings with a unit ("307.0 kcal", "0.0 mg", "" when missing). Compares the
+usual pandas cleanup (read_csv, then str.replace/astype on every column)
+with nutrient_store.parse_nutrition_csv, which splits value and unit a
+whole column at a time and converts units to the nutrient's.
+
+Both are timed end to end (reading the file included) and on the parsing
+alone, and their values are checked to agree. Only the parsing is clearly
+faster (about x1.4); end to end the time is mostly reading the CSV, and the
+two are on par (x0.95 to x1.15 across runs).
+
+Usage (from the ml directory):
+    python benchmarks/nutrition_parse.py
+    python benchmarks/nutrition_parse.py --repeat 10 --output nutrition_parse.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+sys.path.append(ML_DIR)
+
+from nutrient_store import DATASETS_DIR, NUTRIENTS, NUTRITION_COLUMNS, parse_nutrition_csv, parse_quantities, \
+    read_columns
+
+
+def pandas_available():
+    try:
+        import pandas  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def parse_naive(df):
+    # Strip every unit suffix and cast, one column at a time; units are not converted
+    parsed = {}
+    for column, nutrient in NUTRITION_COLUMNS.items():
+        values = df[column].str.replace(' kcal', '').str.replace(' mg', '').str.replace(' g', '')
+        parsed[nutrient] = values.astype(float)
+    return parsed
+
+
+def run_naive(path):
+    import pandas as pd
+    return parse_naive(pd.read_csv(path))
+
+
+def parse_vectorized(data):
+    units = dict(NUTRIENTS)
+    return {nutrient: parse_quantities(data[column], units[nutrient])
+            for column, nutrient in NUTRITION_COLUMNS.items()}
+
+
+def best_time(fn, *args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing the unit-suffixed values of nutrition.csv")
+    parser.add_argument('path', nargs='?', default=os.path.join(DATASETS_DIR, 'nutrition.csv'))
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per variant, the fastest is reported")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    seconds, vectorized = best_time(parse_nutrition_csv, args.path, repeat=args.repeat)
+    results['vectorized'] = {'seconds': seconds}
+    data = read_columns(args.path, list(NUTRITION_COLUMNS))
+    results['vectorized']['parse_seconds'], _ = best_time(parse_vectorized, data, repeat=args.repeat)
+
+    if pandas_available():
+        import pandas as pd
+        seconds, naive = best_time(run_naive, args.path, repeat=args.repeat)
+        df = pd.read_csv(args.path)
+        parse_seconds, _ = best_time(parse_naive, df, repeat=args.repeat)
+        results['pandas-naive'] = {'seconds': seconds, 'parse_seconds': parse_seconds}
+
+        # nutrition.csv is already in the store's units, so the values must agree as they are
+        for nutrient, (values, missing) in vectorized.items():
+            expected = naive[nutrient].to_numpy(dtype=np.float32)
+            if not np.array_equal(values, expected, equal_nan=True) or \
+                    not np.array_equal(missing, np.isnan(expected)):
+                raise SystemExit(f"Values of {nutrient} differ between the parsers")
+    else:
+        print("pandas is not installed, skipping the naive baseline")
+
+    rows = len(next(iter(vectorized.values()))[0])
+    baseline = results.get('pandas-naive', results['vectorized'])
+    print(f"{rows} rows x {len(NUTRITION_COLUMNS)} nutrient columns")
+    for name, result in results.items():
+        result['speedup'] = round(baseline['seconds'] / result['seconds'], 2)
+        result['parse_speedup'] = round(baseline['parse_seconds'] / result['parse_seconds'], 2)
+        result['seconds'] = round(result['seconds'], 4)
+        result['parse_seconds'] = round(result['parse_seconds'], 4)
+        print(f"{name:14s} total {result['seconds'] * 1000:7.1f} ms  x{result['speedup']:.2f}   "
+              f"parse {result['parse_seconds'] * 1000:7.1f} ms  x{result['parse_speedup']:.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
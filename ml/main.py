@@ -9,15 +9,33 @@ import asyncio
 import time
 import os
 import uuid
+import secrets
 from typing import Dict
 import re
 import logging
 import traceback
 from datetime import datetime
-import imageio
-from utils import get_mediapipe_pose
-from process_frame import ProcessFrame
-from thresholds import get_thresholds_beginner, get_thresholds_pro
+import sys
+
+# The analysis core lives in the squat_analysis package at the repository root
+BASE_DIR = os.path.abspath(os.path.join(__file__, '../../'))
+sys.path.append(BASE_DIR)
+
+from squat_analysis import (
+    ProcessFrame,
+    ReplayPose,
+    SkippingPose,
+    get_mediapipe_pose,
+    get_thresholds_beginner,
+    get_thresholds_pro,
+    validate_pose_skip,
+    validate_thresholds,
+)
+from squat_analysis.media import VideoReader, VideoWriter, default_backend
+from squat_analysis.preview import PreviewBuilder, preview_extension
+from squat_analysis.thumbnail import ThumbnailPicker
+from state_store import get_state_store
+from session_cache import SessionCache
 
 # Configure detailed logging
 logging.basicConfig(
@@ -43,13 +61,68 @@ app.add_middleware(
 # Store active connections
 connections: Dict[str, Dict] = {}
 
+# Replay recorded landmarks instead of running MediaPipe, to measure the
+# rest of the pipeline reproducibly (recordings come from pose_replay.PoseRecorder)
+POSE_REPLAY_FILE = os.environ.get("POSE_REPLAY_FILE")
+_replay_frames = None
+
+def create_pose():
+    global _replay_frames
+    if not POSE_REPLAY_FILE:
+        return get_mediapipe_pose()
+    
+    if _replay_frames is None:
+        with open(POSE_REPLAY_FILE) as f:
+            _replay_frames = json.load(f)["frames"]
+        logger.info(f"Replaying pose landmarks from {POSE_REPLAY_FILE}")
+    return ReplayPose(_replay_frames, loop=True)
+
+# Run pose inference on a crop around the athlete (ProcessFrame roi_crop),
+# for wide-angle videos where the athlete is small
+ROI_CROP = os.environ.get("ROI_CROP", "0") == "1"
+
+# Sessions whose socket dropped, kept for a short grace period so the
+# client can resume them (counters and MediaPipe pose included). They live
+# in the memory of the worker that parked them, so a reconnect only finds
+# its session when it lands on the same worker: run WORKERS=1 to rely on it.
+SESSION_RESUME_TTL = 60.0
+MAX_PARKED_SESSIONS = 16
+
+def release_session(session):
+    if session["pose"] is not None:
+        session["pose"].close()
+
+parked_sessions = SessionCache(
+    max_sessions=MAX_PARKED_SESSIONS,
+    ttl=SESSION_RESUME_TTL,
+    on_evict=release_session
+)
+
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = "uploads"
 PROCESSED_DIR = "processed"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
-# Stats for monitoring
+# Video decode/encode backend for uploads: "pyav" (H.264, default when PyAV
+# is installed) or "opencv" (mp4v)
+MEDIA_BACKEND = os.environ.get("MEDIA_BACKEND", default_backend())
+
+# Preview clip shown on the dashboard: PREVIEW_FORMAT is mp4 or webm (OpenCV
+# can only write webm), PREVIEW_BITRATE in bits per second
+PREVIEW_FORMAT = preview_extension(MEDIA_BACKEND, os.environ.get("PREVIEW_FORMAT", "mp4"))
+PREVIEW_BITRATE = int(os.environ.get("PREVIEW_BITRATE", 400_000))
+PREVIEW_FPS = 10
+
+# Job status and per-worker snapshots shared by all worker processes
+state_store = get_state_store()
+WORKER_ID = str(os.getpid())
+
+# How often this worker publishes its snapshot, and when a snapshot is considered dead
+STATS_PUBLISH_INTERVAL = 2.0
+WORKER_STALE_AFTER = 30.0
+
+# Stats for monitoring (counters of this worker only, see get_stats for the aggregate)
 stats = {
     "total_frames_received": 0,
     "total_frames_processed": 0,
@@ -60,6 +133,104 @@ stats = {
     "startup_time": datetime.now().isoformat()
 }
 
+def connection_stats(conn_id, conn_data):
+    elapsed = time.time() - conn_data["start_time"]
+    fps = conn_data["frames_processed"] / max(elapsed, 0.001)
+
+    return {
+        "connection_id": conn_id,
+        "worker_id": WORKER_ID,
+        "mode": conn_data["mode"],
+        "frames_received": conn_data["frames_received"],
+        "frames_processed": conn_data["frames_processed"],
+        "frames_failed": conn_data["frames_failed"],
+        "uptime_seconds": round(elapsed),
+        "fps": round(fps, 2),
+        "squats_correct": conn_data["processor"].state_tracker['SQUAT_COUNT'],
+        "squats_incorrect": conn_data["processor"].state_tracker['IMPROPER_SQUAT']
+    }
+
+def process_usage():
+    # CPU time and resident memory of this worker, for capacity measurements
+    times = os.times()
+    usage = {"cpu_seconds": round(times.user + times.system, 3), "rss_mb": None}
+    try:
+        with open("/proc/self/statm") as f:
+            rss_pages = int(f.read().split()[1])
+        usage["rss_mb"] = round(rss_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    return usage
+
+def worker_snapshot():
+    return {
+        "pid": os.getpid(),
+        "process": process_usage(),
+        "stats": stats,
+        "connections": [connection_stats(conn_id, conn_data) for conn_id, conn_data in connections.items()]
+    }
+
+def publish_worker_snapshot():
+    try:
+        state_store.publish_worker(WORKER_ID, worker_snapshot())
+    except Exception as e:
+        logger.error(f"Error publishing worker snapshot: {str(e)}")
+
+async def publish_worker_snapshots():
+    while True:
+        publish_worker_snapshot()
+        # Release parked sessions that nobody resumed in time
+        parked_sessions.purge_expired()
+        await asyncio.sleep(STATS_PUBLISH_INTERVAL)
+
+@app.on_event("startup")
+async def start_publishing():
+    logger.info(f"Worker {WORKER_ID} started")
+    asyncio.create_task(publish_worker_snapshots())
+
+@app.on_event("shutdown")
+async def stop_publishing():
+    # Keep the counters in the aggregate but drop the (now closed) connections
+    snapshot = worker_snapshot()
+    snapshot["connections"] = []
+    snapshot["stats"] = dict(stats, active_connections=0)
+    state_store.publish_worker(WORKER_ID, snapshot)
+
+def aggregate_worker_stats():
+    workers = state_store.get_workers()
+    # Always use the live numbers for this worker
+    workers[WORKER_ID] = dict(worker_snapshot(), updated_at=time.time())
+
+    server_stats = {}
+    active_connections = []
+    process = {"cpu_seconds": 0.0, "rss_mb": 0.0}
+    for worker in workers.values():
+        is_alive = time.time() - worker["updated_at"] <= WORKER_STALE_AFTER
+        
+        # Exited workers keep their CPU time but no longer hold memory
+        usage = worker.get("process", {})
+        process["cpu_seconds"] += usage.get("cpu_seconds") or 0.0
+        if is_alive:
+            process["rss_mb"] += usage.get("rss_mb") or 0.0
+
+        for key, value in worker["stats"].items():
+            if key == "startup_time":
+                server_stats[key] = min(server_stats.get(key, value), value)
+            elif key == "active_connections" and not is_alive:
+                continue
+            else:
+                server_stats[key] = server_stats.get(key, 0) + value
+
+        if is_alive:
+            active_connections.extend(worker["connections"])
+
+    server_stats["workers"] = sum(1 for worker in workers.values()
+                                  if time.time() - worker["updated_at"] <= WORKER_STALE_AFTER)
+    server_stats["cpu_seconds"] = round(process["cpu_seconds"], 3)
+    server_stats["rss_mb"] = round(process["rss_mb"], 1)
+
+    return server_stats, active_connections
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -70,8 +241,13 @@ async def websocket_endpoint(websocket: WebSocket):
     
     connections[connection_id] = {
         "websocket": websocket,
+        "resume_token": secrets.token_urlsafe(16),
         "mode": "beginner",
-        "processor": ProcessFrame(thresholds=get_thresholds_beginner(), flip_frame=True),
+        "processor": ProcessFrame(thresholds=get_thresholds_beginner(), flip_frame=True, roi_crop=ROI_CROP),
+        # Created on the first frame, unless a resumed session brings its own
+        "pose": None,
+        # Pose-skip settings (see SkippingPose), inference on every frame by default
+        "pose_skip": {},
         "frames_received": 0,
         "frames_processed": 0,
         "frames_failed": 0,
@@ -82,10 +258,6 @@ async def websocket_endpoint(websocket: WebSocket):
     stats["total_connections"] += 1
     stats["active_connections"] += 1
     
-    # Initialize pose detection
-    pose = get_mediapipe_pose()
-    logger.info(f"MediaPipe pose initialized for connection {connection_id}")
-    
     # Create a task to monitor connection and log stats
     async def monitor_connection():
         while connection_id in connections:
@@ -104,6 +276,9 @@ async def websocket_endpoint(websocket: WebSocket):
     monitor_task = asyncio.create_task(monitor_connection())
     
     try:
+        # Tell the client how to resume this session if the socket drops
+        await websocket.send_json({"session_token": connections[connection_id]["resume_token"]})
+        
         while True:
             # Receive data from client with a timeout to detect dead connections
             data = await asyncio.wait_for(
@@ -122,29 +297,90 @@ async def websocket_endpoint(websocket: WebSocket):
             
             # Handle mode changes
             if data == "mode_beginner":
+                # Swap thresholds in place, counters (and resumed sessions) are kept
                 logger.info(f"Setting mode to beginner for {connection_id}")
                 connections[connection_id]["mode"] = "beginner"
-                connections[connection_id]["processor"] = ProcessFrame(
-                    thresholds=get_thresholds_beginner(), 
-                    flip_frame=True
-                )
+                connections[connection_id]["processor"].set_thresholds(get_thresholds_beginner())
                 await websocket.send_json({
                     "mode_changed": "beginner"
                 })
                 continue
                 
             elif data == "mode_pro":
+                # Swap thresholds in place, counters (and resumed sessions) are kept
                 logger.info(f"Setting mode to pro for {connection_id}")
                 connections[connection_id]["mode"] = "pro"
-                connections[connection_id]["processor"] = ProcessFrame(
-                    thresholds=get_thresholds_pro(), 
-                    flip_frame=True
-                )
+                connections[connection_id]["processor"].set_thresholds(get_thresholds_pro())
                 await websocket.send_json({
                     "mode_changed": "pro"
                 })
                 continue
                 
+            # Handle a custom threshold profile sent as JSON
+            elif data.startswith("thresholds_"):
+                try:
+                    thresholds = validate_thresholds(json.loads(data[len("thresholds_"):]))
+                except ValueError as e:
+                    # json.JSONDecodeError is a ValueError too
+                    logger.warning(f"Invalid thresholds from {connection_id}: {str(e)}")
+                    await websocket.send_json({"error": f"Invalid thresholds: {str(e)}"})
+                    continue
+                
+                logger.info(f"Setting custom thresholds for {connection_id}")
+                connections[connection_id]["mode"] = "custom"
+                connections[connection_id]["processor"].set_thresholds(thresholds)
+                await websocket.send_json({
+                    "mode_changed": "custom"
+                })
+                continue
+                
+            # Handle pose-skip settings sent as JSON, e.g. {"every": 3, "motion": 0.02}
+            elif data.startswith("pose_skip_"):
+                try:
+                    pose_skip = validate_pose_skip(json.loads(data[len("pose_skip_"):]))
+                except ValueError as e:
+                    logger.warning(f"Invalid pose-skip settings from {connection_id}: {str(e)}")
+                    await websocket.send_json({"error": f"Invalid pose-skip settings: {str(e)}"})
+                    continue
+                
+                logger.info(f"Setting pose skip {pose_skip} for {connection_id}")
+                connections[connection_id]["pose_skip"] = pose_skip
+                if connections[connection_id]["pose"] is not None:
+                    connections[connection_id]["pose"].configure(**pose_skip)
+                await websocket.send_json({
+                    "pose_skip": pose_skip
+                })
+                continue
+                
+            # Handle session resume after a dropped connection
+            elif data.startswith("resume_"):
+                token = data[len("resume_"):]
+                session = parked_sessions.resume(token)
+                
+                if session is None:
+                    logger.info(f"No parked session to resume for {connection_id}")
+                    await websocket.send_json({"resumed": False})
+                    continue
+                
+                logger.info(f"Resuming parked session for {connection_id}")
+                conn_data = connections[connection_id]
+                if conn_data["pose"] is not None:
+                    conn_data["pose"].close()
+                conn_data.update(session)
+                conn_data["resume_token"] = token
+                # The time spent disconnected must not count as inactivity
+                conn_data["processor"].reset_inactivity_timers()
+                
+                await websocket.send_json({
+                    "resumed": True,
+                    "session_token": token,
+                    "mode": conn_data["mode"],
+                    "pose_skip": conn_data["pose_skip"],
+                    "squats_correct": conn_data["processor"].state_tracker['SQUAT_COUNT'],
+                    "squats_incorrect": conn_data["processor"].state_tracker['IMPROPER_SQUAT']
+                })
+                continue
+                
             # Handle heartbeat to keep connection alive
             elif data == "heartbeat":
                 logger.debug(f"Received heartbeat from {connection_id}")
@@ -206,8 +442,14 @@ async def websocket_endpoint(websocket: WebSocket):
                     elif frame.shape[2] == 4:  # RGBA
                         frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
                     
+                    # Initialize pose detection on the first frame
+                    if connections[connection_id]["pose"] is None:
+                        connections[connection_id]["pose"] = SkippingPose(create_pose(), **connections[connection_id]["pose_skip"])
+                        logger.info(f"MediaPipe pose initialized for connection {connection_id}")
+                    
                     # Process frame
                     processor = connections[connection_id]["processor"]
+                    pose = connections[connection_id]["pose"]
                     processed_frame, feedback = processor.process(frame, pose)
                     
                     # Update successful processing counter
@@ -267,84 +509,126 @@ async def websocket_endpoint(websocket: WebSocket):
                       f"Stats: received={conn_data['frames_received']}, "
                       f"processed={conn_data['frames_processed']}, "
                       f"failed={conn_data['frames_failed']}, "
+                      f"pose_inferred={conn_data['pose'].frames_inferred if conn_data['pose'] else 0}, "
                       f"duration={elapsed:.1f}s")
             
+            # Park the session so a reconnecting client can pick it up again
+            parked_sessions.park(conn_data["resume_token"], {
+                "mode": conn_data["mode"],
+                "processor": conn_data["processor"],
+                "pose": conn_data["pose"],
+                "pose_skip": conn_data["pose_skip"]
+            })
+            
             del connections[connection_id]
             stats["active_connections"] -= 1
         
         # Cancel the monitoring task
         monitor_task.cancel()
 
-def process_video_file(video_path, output_path, mode="beginner"):
+def process_video_file(video_path, output_path, mode="beginner", thresholds=None, preview_path=None, sprite_path=None, thumbnail_prefix=None):
     logger.info(f"Processing video file: {video_path}, mode: {mode}")
     
-    # Get appropriate thresholds based on mode
-    thresholds = get_thresholds_beginner() if mode == "beginner" else get_thresholds_pro()
+    # Get appropriate thresholds based on mode, unless a custom profile was given
+    if thresholds is None:
+        thresholds = get_thresholds_beginner() if mode == "beginner" else get_thresholds_pro()
     
     # Initialize processor and pose detector
-    processor = ProcessFrame(thresholds=thresholds, flip_frame=True)
-    pose = get_mediapipe_pose()
+    processor = ProcessFrame(thresholds=thresholds, flip_frame=True, roi_crop=ROI_CROP)
+    pose = create_pose()
     
-    # Open video file
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
+    # Decoding runs ahead and encoding behind on their own threads, so
+    # both overlap with pose inference
+    try:
+        reader = VideoReader(video_path, backend=MEDIA_BACKEND)
+    except IOError:
         logger.error(f"Could not open video file: {video_path}")
         return None
     
-    # Get video properties
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = reader.fps
+    width, height = reader.width, reader.height
+    frame_count = reader.frame_count
     
-    logger.info(f"Video properties: {width}x{height} @ {fps} fps, {frame_count} frames")
+    logger.info(f"Video properties: {width}x{height} @ {fps} fps, {frame_count} frames ({reader.backend} backend)")
     
-    # Create video writer for output
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+    # The preview clip, rep sprite sheet and thumbnail are built from the same pass
+    preview = None
+    thumbnail = ThumbnailPicker() if thumbnail_prefix else None
     
     # Process each frame
     frame_idx = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        frame_idx += 1
-        if frame_idx % 30 == 0:
-            logger.info(f"Processing frame {frame_idx}/{frame_count}")
-        
-        # Process frame
-        processed_frame, _ = processor.process(frame, pose)
+    try:
+        with reader, VideoWriter(output_path, fps, (width, height), backend=MEDIA_BACKEND) as out:
+            if preview_path:
+                preview = PreviewBuilder(preview_path, sprite_path, fps, (width, height),
+                                         preview_fps=PREVIEW_FPS, bitrate=PREVIEW_BITRATE, backend=MEDIA_BACKEND)
+            
+            for frame in reader:
+                frame_idx += 1
+                if frame_idx % 30 == 0:
+                    logger.info(f"Processing frame {frame_idx}/{frame_count}")
+                
+                # Process frame
+                processed_frame, _ = processor.process(frame, pose)
+                
+                # Write processed frame to output video
+                out.write(processed_frame)
+                
+                if preview:
+                    preview.add(processed_frame, processor)
+                if thumbnail:
+                    thumbnail.add(processed_frame, processor)
         
-        # Write processed frame to output video
-        out.write(processed_frame)
-    
-    # Release resources
-    cap.release()
-    out.release()
+        preview_result = preview.close() if preview else None
+    except Exception:
+        # Stop the preview encoder and leave no half-written files behind
+        if preview:
+            preview.abort()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
     
     # Return stats
     return {
         "correct_squats": processor.state_tracker['SQUAT_COUNT'],
         "incorrect_squats": processor.state_tracker['IMPROPER_SQUAT'],
         "total_frames": frame_idx,
-        "processed_video_path": output_path
+        "processed_video_path": output_path,
+        "preview": preview_result,
+        "thumbnails": thumbnail.save(thumbnail_prefix) if thumbnail else {}
     }
 
 @app.post("/upload-video")
 async def upload_video(
     background_tasks: BackgroundTasks,
     video: UploadFile = File(...), 
-    mode: str = Form("beginner")
+    mode: str = Form("beginner"),
+    thresholds: str = Form(None)
 ):
     # Validate mode
-    if mode not in ["beginner", "pro"]:
+    if mode not in ["beginner", "pro", "custom"]:
         return JSONResponse(
             status_code=400,
-            content={"error": "Invalid mode. Must be 'beginner' or 'pro'"}
+            content={"error": "Invalid mode. Must be 'beginner', 'pro' or 'custom'"}
         )
     
+    # Validate the custom threshold profile (JSON) before accepting the upload
+    custom_thresholds = None
+    if mode == "custom" or thresholds is not None:
+        if thresholds is None:
+            return JSONResponse(
+                status_code=400,
+                content={"error": "Custom mode requires a thresholds profile"}
+            )
+        try:
+            custom_thresholds = validate_thresholds(json.loads(thresholds))
+        except ValueError as e:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"Invalid thresholds: {str(e)}"}
+            )
+        mode = "custom"
+    
     # Generate unique ID for the video
     video_id = str(uuid.uuid4())
     
@@ -362,7 +646,7 @@ async def upload_video(
         logger.info(f"Video saved to {video_path}, queuing for processing...")
         
         # Process video in background
-        background_tasks.add_task(process_video_and_update_client, video_path, output_path, mode, video_id)
+        background_tasks.add_task(process_video_and_update_client, video_path, output_path, mode, video_id, custom_thresholds)
         
         # Return immediate response with job ID
         return JSONResponse(
@@ -381,158 +665,83 @@ async def upload_video(
             content={"error": f"Error uploading video: {str(e)}"}
         )
 
-# Global dictionary to store processing results
-video_results = {}
-
-def process_video_and_update_client(video_path, output_path, mode, video_id):
+def process_video_and_update_client(video_path, output_path, mode, video_id, thresholds=None):
     try:
         # Update status
-        video_results[video_id] = {"status": "processing"}
+        state_store.set_job(video_id, {"status": "processing"})
         
         # Process the video
-        result = process_video_file(video_path, output_path, mode)
+        preview_path = os.path.join(PROCESSED_DIR, f"preview_{video_id}.{PREVIEW_FORMAT}")
+        sprite_path = os.path.join(PROCESSED_DIR, f"sprites_{video_id}.jpg")
+        thumbnail_prefix = os.path.join(PROCESSED_DIR, f"thumb_{video_id}")
+        result = process_video_file(video_path, output_path, mode, thresholds, preview_path, sprite_path, thumbnail_prefix)
         
         if result:
             stats["videos_processed"] += 1
             
-            # Get a frame from the processed video to use as a thumbnail
-            cap = cv2.VideoCapture(output_path)
-            ret, frame = cap.read()
-            thumbnail_path = None
-            
-            if ret:
-                thumbnail_path = os.path.join(PROCESSED_DIR, f"thumb_{video_id}.jpg")
-                cv2.imwrite(thumbnail_path, frame)
-            
-            cap.release()
+            # Thumbnails (deepest point of the best rep) in every size and format
+            thumbnails = {
+                size: {
+                    extension: f"http://127.0.0.1:8000/api/thumbnails/{os.path.basename(path)}"
+                    for extension, path in formats.items()
+                }
+                for size, formats in result["thumbnails"].items()
+            }
             
-            # Convert mp4 to gif
-            gif_path = os.path.join(PROCESSED_DIR, f"processed_{video_id}.gif")
-            convert_video_to_gif(output_path, gif_path)
+            preview = result["preview"]
             
             # Update results
-            video_results[video_id] = {
+            job = {
                 "status": "completed",
                 "result": {
                     "correct_squats": result["correct_squats"],
                     "incorrect_squats": result["incorrect_squats"],
-                    "processed_video_url": f"http://127.0.0.1:8000/api/videos/{os.path.basename(gif_path)}",
-                    "thumbnail_url": f"http://127.0.0.1:8000/api/thumbnails/{os.path.basename(thumbnail_path)}" if thumbnail_path else None,
+                    "processed_video_url": f"http://127.0.0.1:8000/api/videos/{os.path.basename(preview['preview_path'])}",
+                    "full_video_url": f"http://127.0.0.1:8000/api/videos/{os.path.basename(output_path)}",
+                    "sprite_url": f"http://127.0.0.1:8000/api/videos/{os.path.basename(preview['sprite_path'])}" if preview["sprite_path"] else None,
+                    "sprite": preview["sprite"],
+                    "thumbnail_url": thumbnails.get("large", {}).get("jpg"),
+                    "thumbnails": thumbnails,
                     "video_id": video_id,
                     "mode": mode
                 }
             }
-            print(video_results[video_id])
+            state_store.set_job(video_id, job)
             
             logger.info(f"Video {video_id} processed successfully: {result['correct_squats']} correct, {result['incorrect_squats']} incorrect squats")
         else:
-            video_results[video_id] = {
+            state_store.set_job(video_id, {
                 "status": "failed",
                 "error": "Video processing failed"
-            }
+            })
             logger.error(f"Video {video_id} processing failed")
             
     except Exception as e:
         logger.error(f"Error processing video {video_id}: {str(e)}")
         logger.error(traceback.format_exc())
-        video_results[video_id] = {
+        state_store.set_job(video_id, {
             "status": "failed",
             "error": str(e)
-        }
-
-def convert_video_to_gif(video_path, gif_path, fps=10):
-    """
-    Convert an MP4 video to GIF format
-    
-    Args:
-        video_path: Path to the input video file
-        gif_path: Path where the output GIF will be saved
-        fps: Frames per second in the output GIF (lower = smaller file)
-    """
-    try:
-        logger.info(f"Converting video to GIF: {video_path} -> {gif_path}")
-        
-        # Read the video
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            logger.error(f"Could not open video file for GIF conversion: {video_path}")
-            return False
-        
-        # Get video properties
-        video_fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        # Calculate the frame step to achieve target FPS
-        # For example, if video is 30fps and we want 10fps, we take every 3rd frame
-        step = max(1, round(video_fps / fps))
-        
-        frames = []
-        frame_idx = 0
-        
-        logger.info(f"Reading frames for GIF, using every {step}th frame")
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Only use every nth frame
-            if frame_idx % step == 0:
-                # Convert BGR to RGB
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Resize to reduce file size if needed
-                # You can adjust the scale factor as needed
-                width = int(frame.shape[1] * 0.5)  # 50% of original width
-                height = int(frame.shape[0] * 0.5)  # 50% of original height
-                resized = cv2.resize(rgb_frame, (width, height))
-                
-                frames.append(resized)
-                
-                if len(frames) % 10 == 0:
-                    logger.debug(f"Collected {len(frames)} frames for GIF")
-            
-            frame_idx += 1
-            
-            # Optional: limit the number of frames to keep GIF size reasonable
-            if len(frames) >= 100:  # You can adjust this limit
-                logger.warning(f"Limiting GIF to 100 frames to control file size")
-                break
-        
-        cap.release()
-        
-        if not frames:
-            logger.error("No frames extracted for GIF")
-            return False
-            
-        logger.info(f"Writing GIF with {len(frames)} frames")
-        
-        # Write GIF
-        imageio.mimsave(gif_path, frames, format='GIF', fps=fps, loop=0, duration=1000/fps)
-        
-        # Check if GIF was created successfully
-        if os.path.exists(gif_path):
-            gif_size = os.path.getsize(gif_path) / (1024 * 1024)  # Size in MB
-            logger.info(f"GIF created successfully: {gif_path} ({gif_size:.2f} MB)")
-            return True
-        else:
-            logger.error(f"Failed to create GIF: {gif_path}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Error converting video to GIF: {str(e)}")
-        logger.error(traceback.format_exc())
-        return False
+        })
 
 @app.get("/video-status/{video_id}")
 async def get_video_status(video_id: str):
-    if video_id not in video_results:
+    job = state_store.get_job(video_id)
+    if job is None:
         return JSONResponse(
             status_code=404,
             content={"error": "Video ID not found"}
         )
     
-    return video_results[video_id]
+    return job
+
+# Processed videos, previews and sprite sheets (.gif for results from older versions)
+VIDEO_MEDIA_TYPES = {
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".jpg": "image/jpeg",
+    ".gif": "image/gif"
+}
 
 @app.get("/api/videos/{video_name}")
 async def get_video(video_name: str):
@@ -549,12 +758,7 @@ async def get_video(video_name: str):
     # Determine the correct media type based on file extension
     file_extension = os.path.splitext(video_name)[1].lower()
     
-    if file_extension == '.gif':
-        media_type = "image/gif"
-    elif file_extension == '.mp4':
-        media_type = "video/mp4"
-    else:
-        media_type = "application/octet-stream"
+    media_type = VIDEO_MEDIA_TYPES.get(file_extension, "application/octet-stream")
     
     # Serve the file
     return FileResponse(
@@ -574,47 +778,41 @@ async def get_thumbnail(thumbnail_name: str):
             content={"error": "Thumbnail not found"}
         )
     
+    media_type = "image/webp" if thumbnail_name.lower().endswith(".webp") else "image/jpeg"
     return FileResponse(
         thumbnail_path, 
-        media_type="image/jpeg", 
+        media_type=media_type, 
         filename=thumbnail_name
     )
 
 @app.get("/")
 def read_root():
+    server_stats, active_connections = aggregate_worker_stats()
     return {
         "status": "AI Fitness Trainer API is running",
-        "stats": stats,
-        "active_connections": len(connections)
+        "stats": server_stats,
+        "active_connections": len(active_connections)
     }
 
 @app.get("/stats")
 def get_stats():
-    active_conn_stats = []
-    for conn_id, conn_data in connections.items():
-        # Calculate connection stats
-        elapsed = time.time() - conn_data["start_time"]
-        fps = conn_data["frames_processed"] / max(elapsed, 0.001)
-        
-        active_conn_stats.append({
-            "connection_id": conn_id,
-            "mode": conn_data["mode"],
-            "frames_received": conn_data["frames_received"],
-            "frames_processed": conn_data["frames_processed"],
-            "frames_failed": conn_data["frames_failed"],
-            "uptime_seconds": round(elapsed),
-            "fps": round(fps, 2),
-            "squats_correct": conn_data["processor"].state_tracker['SQUAT_COUNT'],
-            "squats_incorrect": conn_data["processor"].state_tracker['IMPROPER_SQUAT']
-        })
+    server_stats, active_conn_stats = aggregate_worker_stats()
     
     return {
-        "server_stats": stats,
+        "server_stats": server_stats,
         "active_connections": active_conn_stats,
-        "server_uptime_seconds": round(time.time() - time.mktime(datetime.fromisoformat(stats["startup_time"]).timetuple()))
+        "server_uptime_seconds": round(time.time() - time.mktime(datetime.fromisoformat(server_stats["startup_time"]).timetuple()))
     }
 
 if __name__ == "__main__":
     import uvicorn
-    logger.info("Starting AI Fitness Trainer API server")
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, log_level="debug")
\ No newline at end of file
+    workers = int(os.environ.get("WORKERS", os.cpu_count() or 1))
+    # Snapshots from a previous run would be reported as dead workers
+    state_store.reset_workers()
+    logger.info(f"Starting AI Fitness Trainer API server with {workers} worker(s)")
+    if workers > 1:
+        logger.warning("Session resume only works when the client reconnects to the "
+                       "worker that parked its session; set WORKERS=1 to rely on it")
+    # Each websocket is a single long-lived connection, so it stays on the
+    # worker that accepted it; only jobs and stats go through state_store.
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, log_level="debug", workers=workers)
\ No newline at end of file
@@ -0,0 +1,660 @@
+"""
+One nutrient table for every food in datasets/, stored as a single
+memory-mappable file.
+
+The build step reads the three kinds of food data:
+    - food.csv                        USDA SR foods, per 100 g, units implied by column
+    - nutrition.csv                   USDA FDC foods, per 100 g, "307.0 kcal" style values
+                                      (parsed a column at a time by parse_quantities)
+    - FINAL FOOD DATASET/FOOD-DATA-GROUP*.csv   foods per serving, units implied by column
+                                      (some rows misaligned, see read_group_csv)
+maps their columns onto one list of NUTRIENTS, converts every value to the
+nutrient's unit, rejects (as missing) values above MAX_PER_100G and writes:
+    - a float32 matrix of foods x nutrients, NaN where a source has no value
+    - the food ids (sorted), source, name and category of every food
+    - a string table holding each distinct name and category once
+
+Food ids are a 52-bit hash of the source and the food's key in it (its
+USDA number, or its name for the group files), so they stay the same across
+builds as long as the source data does. (crc32 already collides among this
+many foods; 52 bits still fit exactly in a JSON/JavaScript number.)
+
+Opening the file only reads its header; the columns are numpy memmaps over
+the file, so every worker process shares one read-only copy through the
+page cache:
+    python nutrient_store.py build
+    python nutrient_store.py show "cream cheese"
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+DEFAULT_PATH = os.path.join(DATASETS_DIR, "nutrients.bin")
+
+MAGIC = b"NUTRSTOR"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Nutrient keys and the unit their values are stored in
+NUTRIENTS = [
+    ("energy", "kcal"),
+    ("protein", "g"),
+    ("carbohydrate", "g"),
+    ("sugars", "g"),
+    ("fiber", "g"),
+    ("fat", "g"),
+    ("saturated_fat", "g"),
+    ("monounsaturated_fat", "g"),
+    ("polyunsaturated_fat", "g"),
+    ("cholesterol", "mg"),
+    ("water", "g"),
+    ("alcohol", "g"),
+    ("ash", "g"),
+    ("calcium", "mg"),
+    ("copper", "mg"),
+    ("iron", "mg"),
+    ("magnesium", "mg"),
+    ("manganese", "mg"),
+    ("phosphorus", "mg"),
+    ("potassium", "mg"),
+    ("selenium", "µg"),
+    ("sodium", "mg"),
+    ("zinc", "mg"),
+    ("vitamin_a", "µg"),
+    ("retinol", "µg"),
+    ("alpha_carotene", "µg"),
+    ("beta_carotene", "µg"),
+    ("beta_cryptoxanthin", "µg"),
+    ("lutein_zeaxanthin", "µg"),
+    ("lycopene", "µg"),
+    ("thiamin", "mg"),
+    ("riboflavin", "mg"),
+    ("niacin", "mg"),
+    ("pantothenic_acid", "mg"),
+    ("vitamin_b6", "mg"),
+    ("folate", "µg"),
+    ("vitamin_b12", "µg"),
+    ("vitamin_c", "mg"),
+    ("vitamin_d", "µg"),
+    ("vitamin_e", "mg"),
+    ("vitamin_k", "µg"),
+    ("choline", "mg"),
+]
+
+# Highest plausible value per 100 g of food, in the nutrient's unit: the
+# richest food in USDA SR (e.g. table salt for sodium, Brazil nuts for
+# selenium), rounded up. Folate and vitamin D are not in SR; fortified yeast
+# and cod liver oil set theirs.
+MAX_PER_100G = {
+    "energy": 910, "protein": 90, "carbohydrate": 100, "sugars": 100, "fiber": 80, "fat": 100,
+    "saturated_fat": 96, "monounsaturated_fat": 84, "polyunsaturated_fat": 75, "cholesterol": 3100,
+    "water": 100, "alcohol": 50, "ash": 100,
+    "calcium": 7400, "copper": 16, "iron": 125, "magnesium": 800, "manganese": 135, "phosphorus": 10000,
+    "potassium": 16500, "selenium": 2000, "sodium": 39000, "zinc": 185,
+    "vitamin_a": 30000, "retinol": 30000, "alpha_carotene": 15000, "beta_carotene": 43000,
+    "beta_cryptoxanthin": 8000, "lutein_zeaxanthin": 40000, "lycopene": 47000,
+    "thiamin": 21, "riboflavin": 15, "niacin": 100, "pantothenic_acid": 35, "vitamin_b6": 12,
+    "folate": 4000, "vitamin_b12": 100, "vitamin_c": 2800, "vitamin_d": 250, "vitamin_e": 150,
+    "vitamin_k": 1800, "choline": 1400,
+}
+# What a serving of a per-serving source weighs is estimated from these (in g)
+MASS_NUTRIENTS = ("water", "protein", "fat", "carbohydrate")
+
+# unit -> (dimension, size in the dimension's base unit)
+UNITS = {
+    "kcal": ("energy", 1.0),
+    "kj": ("energy", 1 / 4.184),
+    "g": ("mass", 1.0),
+    "mg": ("mass", 1e-3),
+    "µg": ("mass", 1e-6),
+    "μg": ("mass", 1e-6),
+    "ug": ("mass", 1e-6),
+    "mcg": ("mass", 1e-6),
+}
+
+# Source columns -> (nutrient, unit of the column)
+FOOD_COLUMNS = {
+    "Data.Alpha Carotene": ("alpha_carotene", "µg"),
+    "Data.Ash": ("ash", "g"),
+    "Data.Beta Carotene": ("beta_carotene", "µg"),
+    "Data.Beta Cryptoxanthin": ("beta_cryptoxanthin", "µg"),
+    "Data.Carbohydrate": ("carbohydrate", "g"),
+    "Data.Cholesterol": ("cholesterol", "mg"),
+    "Data.Choline": ("choline", "mg"),
+    "Data.Fiber": ("fiber", "g"),
+    "Data.Kilocalories": ("energy", "kcal"),
+    "Data.Lutein and Zeaxanthin": ("lutein_zeaxanthin", "µg"),
+    "Data.Lycopene": ("lycopene", "µg"),
+    "Data.Manganese": ("manganese", "mg"),
+    "Data.Niacin": ("niacin", "mg"),
+    "Data.Pantothenic Acid": ("pantothenic_acid", "mg"),
+    "Data.Protein": ("protein", "g"),
+    "Data.Retinol": ("retinol", "µg"),
+    "Data.Riboflavin": ("riboflavin", "mg"),
+    "Data.Selenium": ("selenium", "µg"),
+    "Data.Sugar Total": ("sugars", "g"),
+    "Data.Thiamin": ("thiamin", "mg"),
+    "Data.Water": ("water", "g"),
+    # (sic) in the source
+    "Data.Fat.Monosaturated Fat": ("monounsaturated_fat", "g"),
+    "Data.Fat.Polysaturated Fat": ("polyunsaturated_fat", "g"),
+    "Data.Fat.Saturated Fat": ("saturated_fat", "g"),
+    "Data.Fat.Total Lipid": ("fat", "g"),
+    "Data.Major Minerals.Calcium": ("calcium", "mg"),
+    "Data.Major Minerals.Copper": ("copper", "mg"),
+    "Data.Major Minerals.Iron": ("iron", "mg"),
+    "Data.Major Minerals.Magnesium": ("magnesium", "mg"),
+    "Data.Major Minerals.Phosphorus": ("phosphorus", "mg"),
+    "Data.Major Minerals.Potassium": ("potassium", "mg"),
+    "Data.Major Minerals.Sodium": ("sodium", "mg"),
+    "Data.Major Minerals.Zinc": ("zinc", "mg"),
+    "Data.Vitamins.Vitamin A - RAE": ("vitamin_a", "µg"),
+    "Data.Vitamins.Vitamin B12": ("vitamin_b12", "µg"),
+    "Data.Vitamins.Vitamin B6": ("vitamin_b6", "mg"),
+    "Data.Vitamins.Vitamin C": ("vitamin_c", "mg"),
+    "Data.Vitamins.Vitamin E": ("vitamin_e", "mg"),
+    "Data.Vitamins.Vitamin K": ("vitamin_k", "µg"),
+}
+
+# The unit of each nutrition.csv value is in the value itself
+NUTRITION_COLUMNS = {
+    "Calories": "energy",
+    "Protein": "protein",
+    "Carbohydrate": "carbohydrate",
+    "Total fat": "fat",
+    "Cholesterol": "cholesterol",
+    "Fiber": "fiber",
+    "Water": "water",
+    "Alcohol": "alcohol",
+    "Vitamin C": "vitamin_c",
+}
+
+# The dataset's description files give no units. These (kcal; g for the
+# macronutrients, sodium and water; mg for everything else) are the ones
+# under which its values agree with USDA SR, per kcal, on the ~400 foods
+# both list.
+GROUP_COLUMNS = {
+    "Caloric Value": ("energy", "kcal"),
+    "Fat": ("fat", "g"),
+    "Saturated Fats": ("saturated_fat", "g"),
+    "Monounsaturated Fats": ("monounsaturated_fat", "g"),
+    "Polyunsaturated Fats": ("polyunsaturated_fat", "g"),
+    "Carbohydrates": ("carbohydrate", "g"),
+    "Sugars": ("sugars", "g"),
+    "Protein": ("protein", "g"),
+    "Dietary Fiber": ("fiber", "g"),
+    "Cholesterol": ("cholesterol", "mg"),
+    "Sodium": ("sodium", "g"),
+    "Water": ("water", "g"),
+    "Vitamin A": ("vitamin_a", "mg"),
+    "Vitamin B1": ("thiamin", "mg"),
+    "Vitamin B11": ("folate", "mg"),
+    "Vitamin B12": ("vitamin_b12", "mg"),
+    "Vitamin B2": ("riboflavin", "mg"),
+    "Vitamin B3": ("niacin", "mg"),
+    "Vitamin B5": ("pantothenic_acid", "mg"),
+    "Vitamin B6": ("vitamin_b6", "mg"),
+    "Vitamin C": ("vitamin_c", "mg"),
+    "Vitamin D": ("vitamin_d", "mg"),
+    "Vitamin E": ("vitamin_e", "mg"),
+    "Vitamin K": ("vitamin_k", "mg"),
+    "Calcium": ("calcium", "mg"),
+    "Copper": ("copper", "mg"),
+    "Iron": ("iron", "mg"),
+    "Magnesium": ("magnesium", "mg"),
+    "Manganese": ("manganese", "mg"),
+    "Phosphorus": ("phosphorus", "mg"),
+    "Potassium": ("potassium", "mg"),
+    "Selenium": ("selenium", "mg"),
+    "Zinc": ("zinc", "mg"),
+}
+
+# In some group rows every value from Vitamin A to Selenium sits one column
+# to the right (Selenium holds potassium, Copper calcium, ...) and zinc is lost
+GROUP_SHIFTED_COLUMNS = list(GROUP_COLUMNS)[list(GROUP_COLUMNS).index("Vitamin A"):]
+
+# Source name and the amount of food its values are for
+SOURCES = [
+    ("usda-sr", "100 g"),
+    ("usda-fdc", "100 g"),
+    ("food-data-group", "serving"),
+]
+
+
+def unit_factor(unit, to):
+    """Multiplier from `unit` to `to`; raises ValueError for unknown or incompatible units."""
+    try:
+        (dimension, size), (to_dimension, to_size) = UNITS[unit.lower()], UNITS[to.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown unit: {unit if unit.lower() not in UNITS else to}")
+    if dimension != to_dimension:
+        raise ValueError(f"Cannot convert {unit} to {to}")
+    return size / to_size
+
+
+def food_id(source, key):
+    key = " ".join(re.findall(r"[a-z0-9]+", str(key).lower()))
+    digest = hashlib.blake2b(f"{source}|{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 12
+
+
+# Longest unit read from the values themselves; anything longer is unknown
+MAX_UNIT_CHARS = 4
+# Exact powers of ten for the digits of a number
+POWERS_OF_TEN = 10.0 ** np.arange(23)
+
+
+def _split_quantities(texts, with_unit):
+    """
+    Split stripped quantity strings into float64 numbers, a missing mask and
+    the unit after the first space (if `with_unit`).
+
+    The strings are viewed as a matrix of code points and parsed one
+    character position at a time across all rows, so the Python loop runs
+    once per character of the longest value, not once per value. Digits
+    accumulate as an exact integer and are divided by a power of ten once,
+    which rounds the same as float(); anything but a plain decimal (e.g.
+    an exponent) goes through float() instead.
+    """
+    count, width = len(texts), texts.dtype.itemsize // 4
+    missing = texts == ""
+    numbers = np.zeros(count)
+    units = np.zeros(count, dtype=f"<U{MAX_UNIT_CHARS + 1}")
+    if width == 0:
+        return np.where(missing, np.nan, numbers), missing, units
+
+    columns = np.ascontiguousarray(texts.view(np.uint32).reshape(count, width).T)
+    space = columns == 32
+    split = np.where(space.any(0), space.argmax(0), width) if with_unit else np.full(count, width)
+
+    fraction_digits = np.zeros(count, dtype=np.intp)
+    digits = np.zeros(count, dtype=np.intp)
+    seen_dot = np.zeros(count, dtype=bool)
+    valid = ~missing
+    # Only up to the longest number, the units after it are read below
+    longest = int(split[~missing].max()) if valid.any() else 0
+    for position, chars in enumerate(columns[:longest]):
+        active = split > position
+        value = chars - 48  # wraps around for characters below "0"
+        digit = (value < 10) & active
+        numbers = np.where(digit, numbers * 10 + value, numbers)
+        digits += digit
+        fraction_digits += digit & seen_dot
+        dot = (chars == 46) & active
+        valid &= ~active | digit | (dot & ~seen_dot) | ((chars == 45) & (position == 0))
+        seen_dot |= dot
+
+    valid &= (digits > 0) & (digits < 16)
+    numbers /= POWERS_OF_TEN[np.minimum(fraction_digits, 22)]
+    numbers = np.where(columns[0] == 45, -numbers, numbers)
+    for row in np.flatnonzero(~valid & ~missing):
+        numbers[row] = float(str(texts[row]).partition(" ")[0] if with_unit else str(texts[row]))
+        # float() also accepts "nan" and "inf", which are not quantities
+        if not np.isfinite(numbers[row]):
+            raise ValueError(f"Not a finite number: {str(texts[row])!r}")
+    numbers[missing] = np.nan
+    if not with_unit:
+        return numbers, missing, units
+
+    # The characters after the space, up to one more than any known unit
+    padded = np.zeros((width + MAX_UNIT_CHARS + 2, count), dtype=np.uint32)
+    padded[:width] = columns
+    unit_chars = np.empty((count, MAX_UNIT_CHARS + 1), dtype=np.uint32)
+    rows = np.arange(count)
+    for i in range(MAX_UNIT_CHARS + 1):
+        unit_chars[:, i] = padded[split + 1 + i, rows]
+    return numbers, missing, unit_chars.view(units.dtype).ravel()
+
+
+def parse_quantities(texts, to, unit=None):
+    """
+    Parse a column of quantity strings in bulk and convert them to the unit
+    `to`. Values carry their unit ("307.0 kcal", "5.88 g") unless `unit`
+    gives the unit of the whole column. Empty strings are missing.
+
+    Returns (float32 values, bool missing mask); missing values are NaN.
+    Raises ValueError for unparseable numbers and unknown or incompatible
+    units.
+    """
+    texts = np.char.strip(np.asarray(texts, dtype=str))
+    numbers, missing, units = _split_quantities(texts, unit is None)
+
+    if unit is not None:
+        numbers *= unit_factor(unit, to)
+    else:
+        # A column has a handful of distinct units: convert each group of rows at once
+        pending = ~missing
+        while pending.any():
+            row = pending.argmax()
+            same = pending & (units == units[row])
+            numbers[same] *= unit_factor(texts[row].partition(" ")[2], to)
+            pending &= ~same
+    return numbers.astype(np.float32), missing
+
+
+def read_columns(path, columns):
+    """The named columns of a CSV file, as numpy string arrays."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        positions = [header.index(name) for name in columns]
+        rows = list(reader)
+    data = list(zip(*rows)) if rows else [()] * len(header)
+    return {name: np.array(data[i], dtype=str) for name, i in zip(columns, positions)}
+
+
+def _nutrient_matrix(data, mapping):
+    """foods x NUTRIENTS float32 matrix from {column: (nutrient, unit or None)}."""
+    units = dict(NUTRIENTS)
+    columns = {nutrient: i for i, (nutrient, _) in enumerate(NUTRIENTS)}
+    count = len(next(iter(data.values())))
+    matrix = np.full((count, len(NUTRIENTS)), np.nan, dtype=np.float32)
+    for column, (nutrient, unit) in mapping.items():
+        matrix[:, columns[nutrient]], _ = parse_quantities(data[column], units[nutrient], unit)
+    return matrix
+
+
+def read_food_csv(path):
+    data = read_columns(path, ["Category", "Description", "Nutrient Data Bank Number", *FOOD_COLUMNS])
+    return data["Nutrient Data Bank Number"], data["Description"], data["Category"], \
+        _nutrient_matrix(data, FOOD_COLUMNS)
+
+
+def read_nutrition_csv(path):
+    data = read_columns(path, ["FDC_ID", "Item", "Category", *NUTRITION_COLUMNS])
+    mapping = {column: (nutrient, None) for column, nutrient in NUTRITION_COLUMNS.items()}
+    return data["FDC_ID"], data["Item"], data["Category"], _nutrient_matrix(data, mapping)
+
+
+def parse_nutrition_csv(path=os.path.join(DATASETS_DIR, "nutrition.csv")):
+    """
+    Every nutrient column of nutrition.csv as {nutrient: (float32 values in
+    the nutrient's unit, missing mask)}, parsed in one pass.
+    """
+    data = read_columns(path, list(NUTRITION_COLUMNS))
+    units = dict(NUTRIENTS)
+    return {nutrient: parse_quantities(data[column], units[nutrient])
+            for column, nutrient in NUTRITION_COLUMNS.items()}
+
+
+def implausible(matrix, amount):
+    """
+    Mask of the values that no food could have: negative, or above
+    MAX_PER_100G. Values per serving (`amount`) are scaled to 100 g of the
+    serving's estimated mass; a serving without any mass fails every
+    positive value.
+    """
+    columns = {nutrient: i for i, (nutrient, _) in enumerate(NUTRIENTS)}
+    limits = np.array([MAX_PER_100G[nutrient] for nutrient, _ in NUTRIENTS], dtype=np.float32)
+    per_100g = matrix
+    if amount != "100 g":
+        mass = np.nansum(matrix[:, [columns[nutrient] for nutrient in MASS_NUTRIENTS]], axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_100g = np.where(matrix > 0, matrix * 100 / mass[:, None], matrix)
+    return (matrix < 0) | (per_100g > limits)
+
+
+def read_group_csv(path):
+    group = re.search(r"GROUP(\d+)", os.path.basename(path)).group(1)
+    data = read_columns(path, ["food", *GROUP_COLUMNS])
+    names = data["food"]
+    matrix = _nutrient_matrix(data, GROUP_COLUMNS)
+
+    # Read a row's GROUP_SHIFTED_COLUMNS one to the right where that leaves
+    # fewer implausible values (on the foods USDA SR also lists, this finds
+    # every row whose Selenium holds its potassium)
+    shifted = dict(data, **{column: data[next_column] for column, next_column
+                            in zip(GROUP_SHIFTED_COLUMNS, GROUP_SHIFTED_COLUMNS[1:])})
+    shifted[GROUP_SHIFTED_COLUMNS[-1]] = np.full(len(names), "")
+    shifted_matrix = _nutrient_matrix(shifted, GROUP_COLUMNS)
+    misaligned = implausible(shifted_matrix, "serving").sum(1) < implausible(matrix, "serving").sum(1)
+    if misaligned.any():
+        logger.info("%s: realigned %d shifted rows", os.path.basename(path), misaligned.sum())
+        matrix[misaligned] = shifted_matrix[misaligned]
+    return names, names, np.full(len(names), f"Group {group}"), matrix
+
+
+def source_files(datasets_dir=DATASETS_DIR):
+    """(source index, reader, path) of every dataset file."""
+    files = [
+        (0, read_food_csv, os.path.join(datasets_dir, "food.csv")),
+        (1, read_nutrition_csv, os.path.join(datasets_dir, "nutrition.csv")),
+    ]
+    for path in sorted(glob.glob(os.path.join(datasets_dir, "FINAL FOOD DATASET", "FOOD-DATA-GROUP*.csv"))):
+        files.append((2, read_group_csv, path))
+    return files
+
+
+def collect_foods(datasets_dir=DATASETS_DIR):
+    """Read every source into (ids, sources, names, categories, float32 values matrix)."""
+    ids, sources, names, categories, matrices = [], [], [], [], []
+    seen = {}
+    for source, reader, path in source_files(datasets_dir):
+        source_name = SOURCES[source][0]
+        keys, file_names, file_categories, matrix = reader(path)
+        keep = []
+        for row, (key, name, category) in enumerate(zip(keys.tolist(), file_names.tolist(),
+                                                         file_categories.tolist())):
+            identifier = food_id(source_name, key)
+            if identifier in seen:
+                if seen[identifier] != (source_name, key):
+                    raise ValueError(f"Food id collision between {seen[identifier]} and {(source_name, key)}")
+                # Listed twice in a source: keep the first
+                continue
+            seen[identifier] = (source_name, key)
+            ids.append(identifier)
+            sources.append(source)
+            names.append(name.strip())
+            categories.append(category.strip())
+            keep.append(row)
+        matrix = matrix[keep]
+
+        rejected = implausible(matrix, SOURCES[source][1])
+        if rejected.any():
+            logger.warning("%s: rejected %d implausible values of %d foods", os.path.basename(path),
+                           rejected.sum(), rejected.any(1).sum())
+            matrix[rejected] = np.nan
+        matrices.append(matrix)
+
+    return ids, sources, names, categories, np.vstack(matrices)
+
+
+def string_table(strings):
+    """Each distinct string once: (index of every input string, utf-8 bytes, offsets)."""
+    codes = {}
+    index = np.fromiter((codes.setdefault(s, len(codes)) for s in strings), dtype=np.int32, count=len(strings))
+    encoded = [s.encode() for s in codes]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return index, np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def build(path=DEFAULT_PATH, datasets_dir=DATASETS_DIR):
+    """Build the store file from the datasets. Returns the number of foods."""
+    ids, sources, names, categories, matrix = collect_foods(datasets_dir)
+
+    # Sort by id for binary search lookups
+    order = np.argsort(np.array(ids, dtype=np.int64), kind="stable")
+    string_index, strings, offsets = string_table(names + categories)
+    count = len(ids)
+    columns = {
+        "ids": np.array(ids, dtype=np.int64)[order],
+        "source_index": np.array(sources, dtype=np.uint8)[order],
+        "name_index": string_index[:count][order],
+        "category_index": string_index[count:][order],
+        "values": np.ascontiguousarray(matrix[order]),
+        "strings": strings,
+        "string_offsets": offsets,
+    }
+    write_store(path, columns)
+    return count
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_store(path, columns):
+    """
+    Write the columns after a JSON header describing them:
+        MAGIC, header length (uint64), header, then every column at a
+        64-byte aligned offset.
+    Written to a temporary file and renamed, so readers never see half a file.
+    """
+    layout = {}
+    header = b""
+    # The header size depends on the offsets it lists, so lay out until it stops growing
+    while True:
+        offset = _align(len(MAGIC) + 8 + len(header))
+        for name, array in columns.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _align(offset + array.nbytes)
+        new_header = json.dumps({
+            "version": FORMAT_VERSION,
+            "nutrients": NUTRIENTS,
+            "sources": SOURCES,
+            "columns": layout,
+        }, ensure_ascii=False).encode()
+        if len(new_header) == len(header):
+            break
+        header = new_header
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + np.uint64(len(header)).tobytes() + header)
+        for name, array in columns.items():
+            f.write(b"\0" * (layout[name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+
+
+class NutrientStore:
+    """
+    Read-only view of a store file. Columns are memmaps, so opening is
+    cheap and pages are loaded (and shared between processes) on use.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a nutrient store")
+            header = json.loads(f.read(int(np.frombuffer(f.read(8), dtype=np.uint64)[0])))
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {header['version']}, rebuild it")
+
+        self.nutrients = [nutrient for nutrient, _ in header["nutrients"]]
+        self.units = dict(header["nutrients"])
+        self.sources = [tuple(source) for source in header["sources"]]
+        self._columns = {nutrient: i for i, nutrient in enumerate(self.nutrients)}
+        for name, column in header["columns"].items():
+            setattr(self, name, np.memmap(path, dtype=np.dtype(column["dtype"]), mode="r",
+                                          offset=column["offset"], shape=tuple(column["shape"])))
+        self._by_name = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def string(self, index):
+        start, end = self.string_offsets[index], self.string_offsets[index + 1]
+        return self.strings[start:end].tobytes().decode()
+
+    def rows(self, food_ids):
+        """Row positions of `food_ids`; raises KeyError for unknown ids."""
+        food_ids = np.asarray(food_ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, food_ids)
+        rows = np.minimum(rows, len(self.ids) - 1)
+        if not np.array_equal(self.ids[rows], food_ids):
+            raise KeyError("Unknown food ids")
+        return rows
+
+    def column(self, nutrient):
+        """Values of one nutrient for every food, NaN where unknown."""
+        return self.values[:, self._columns[nutrient]]
+
+    def food(self, row):
+        """Everything about the food at `row`, with the known nutrient values."""
+        source, basis = self.sources[self.source_index[row]]
+        values = self.values[row]
+        return {
+            "id": int(self.ids[row]),
+            "name": self.string(self.name_index[row]),
+            "category": self.string(self.category_index[row]),
+            "source": source,
+            "per": basis,
+            "nutrients": {
+                nutrient: {"value": round(float(value), 6), "unit": self.units[nutrient]}
+                for nutrient, value in zip(self.nutrients, values.tolist()) if value == value
+            },
+        }
+
+    def get(self, food_id):
+        """The food with this id, or None."""
+        try:
+            return self.food(int(self.rows([food_id])[0]))
+        except KeyError:
+            return None
+
+    def find(self, name):
+        """Rows of the foods with this name, ignoring case."""
+        if self._by_name is None:
+            # Built on first use: one decode per distinct string, not per food
+            by_string = {}
+            for row, index in enumerate(self.name_index.tolist()):
+                by_string.setdefault(index, []).append(row)
+            self._by_name = {}
+            for index, rows in by_string.items():
+                self._by_name.setdefault(self.string(index).lower(), []).extend(rows)
+        return self._by_name.get(name.strip().lower(), [])
+
+
+_store = None
+
+
+def get_nutrient_store():
+    """The store at NUTRIENT_STORE_PATH (default datasets/nutrients.bin), opened on first use."""
+    global _store
+    if _store is None:
+        _store = NutrientStore(os.environ.get("NUTRIENT_STORE_PATH", DEFAULT_PATH))
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the nutrient store")
+    parser.add_argument("command", choices=["build", "show"])
+    parser.add_argument("name", nargs="?", help="Food name to show")
+    parser.add_argument("--path", default=os.environ.get("NUTRIENT_STORE_PATH", DEFAULT_PATH))
+    parser.add_argument("--datasets", default=DATASETS_DIR)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build(args.path, args.datasets)
+        print(f"Stored {count} foods in {args.path} ({os.path.getsize(args.path) / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - start:.2f} s")
+        return
+
+    if not args.name:
+        parser.error("show needs a food name")
+    start = time.perf_counter()
+    store = NutrientStore(args.path)
+    opened = time.perf_counter() - start
+    rows = store.find(args.name)
+    for row in rows:
+        print(json.dumps(store.food(row), indent=2, ensure_ascii=False))
+    print(f"{len(rows)} foods; opened the store in {opened * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
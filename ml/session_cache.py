@@ -0,0 +1,49 @@
+import time
+from collections import OrderedDict
+
+
+class SessionCache:
+    """
+    Bounded TTL cache for websocket sessions whose socket dropped.
+
+    A parked session can be resumed with its token until it expires or is
+    pushed out by newer sessions. Evicted sessions are passed to `on_evict`
+    so their resources (e.g. the MediaPipe pose) can be released.
+    """
+
+    def __init__(self, max_sessions=16, ttl=60.0, on_evict=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def park(self, token, session):
+        self.purge_expired()
+        self._sessions[token] = (time.monotonic() + self.ttl, session)
+        self._sessions.move_to_end(token)
+
+        while len(self._sessions) > self.max_sessions:
+            _, (_, evicted) = self._sessions.popitem(last=False)
+            self._evict(evicted)
+
+    def resume(self, token):
+        self.purge_expired()
+        entry = self._sessions.pop(token, None)
+        return entry[1] if entry else None
+
+    def purge_expired(self):
+        now = time.monotonic()
+        # Sessions are kept in parking order, so expired ones are at the front
+        while self._sessions:
+            token, (expires_at, session) = next(iter(self._sessions.items()))
+            if expires_at > now:
+                break
+            del self._sessions[token]
+            self._evict(session)
+
+    def _evict(self, session):
+        if self.on_evict:
+            self.on_evict(session)
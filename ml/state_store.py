@@ -0,0 +1,191 @@
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+
+
+# Finished jobs (completed or failed) are deleted this long after their last update
+JOB_TTL = float(os.environ.get("JOB_TTL", 24 * 3600))
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class StateStore(ABC):
+    """
+    State shared by every worker process of the API server.
+
+    Holds two kinds of data:
+        - jobs: status/result of uploaded videos, keyed by video id
+        - workers: a periodic snapshot from each worker with its counters
+          and its (sticky) websocket connections
+
+    Per-frame counters stay process-local and are published as part of the
+    worker snapshot, so the hot path never touches the store.
+
+    Finished jobs are kept for job_ttl seconds, then pruned when another job
+    is written.
+    """
+
+    @abstractmethod
+    def set_job(self, job_id, data):
+        pass
+
+    @abstractmethod
+    def get_job(self, job_id):
+        pass
+
+    @abstractmethod
+    def publish_worker(self, worker_id, snapshot):
+        pass
+
+    @abstractmethod
+    def get_workers(self, max_age=None):
+        pass
+
+    @abstractmethod
+    def reset_workers(self):
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """Process-local store, only correct with a single worker."""
+
+    def __init__(self, job_ttl=JOB_TTL):
+        self.job_ttl = job_ttl
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._workers = {}
+
+    def set_job(self, job_id, data):
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = (now, data)
+            expired = [
+                other_id for other_id, (updated_at, job) in self._jobs.items()
+                if job.get("status") in FINISHED_STATUSES and now - updated_at > self.job_ttl
+            ]
+            for other_id in expired:
+                del self._jobs[other_id]
+
+    def get_job(self, job_id):
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            return entry[1] if entry else None
+
+    def publish_worker(self, worker_id, snapshot):
+        with self._lock:
+            self._workers[worker_id] = (time.time(), snapshot)
+
+    def get_workers(self, max_age=None):
+        now = time.time()
+        with self._lock:
+            return {
+                worker_id: dict(snapshot, updated_at=updated_at)
+                for worker_id, (updated_at, snapshot) in self._workers.items()
+                if max_age is None or now - updated_at <= max_age
+            }
+
+    def reset_workers(self):
+        with self._lock:
+            self._workers.clear()
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Store backed by a local SQLite database in WAL mode.
+
+    Every process (and thread) opens its own connection to the same file,
+    which makes it safe to share between uvicorn workers on one box.
+    """
+
+    def __init__(self, path, job_ttl=JOB_TTL):
+        self.path = path
+        self.job_ttl = job_ttl
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id     TEXT PRIMARY KEY,
+                data       TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id  TEXT PRIMARY KEY,
+                snapshot   TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def set_job(self, job_id, data):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, updated_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(data), now)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE updated_at < ? AND json_extract(data, '$.status') IN (?, ?)",
+                (now - self.job_ttl,) + FINISHED_STATUSES
+            )
+
+    def get_job(self, job_id):
+        row = self._conn().execute(
+            "SELECT data FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def publish_worker(self, worker_id, snapshot):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, snapshot, updated_at) VALUES (?, ?, ?)",
+                (worker_id, json.dumps(snapshot), time.time())
+            )
+
+    def get_workers(self, max_age=None):
+        query = "SELECT worker_id, snapshot, updated_at FROM workers"
+        params = ()
+        if max_age is not None:
+            query += " WHERE updated_at >= ?"
+            params = (time.time() - max_age,)
+
+        return {
+            worker_id: dict(json.loads(snapshot), updated_at=updated_at)
+            for worker_id, snapshot, updated_at in self._conn().execute(query, params)
+        }
+
+    def reset_workers(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM workers")
+
+
+def get_state_store():
+    """
+    Build the store selected by the STATE_BACKEND environment variable.
+
+    STATE_BACKEND=sqlite (default) uses STATE_DB_PATH (default "state.db"),
+    STATE_BACKEND=memory keeps everything in the current process.
+    """
+    backend = os.environ.get("STATE_BACKEND", "sqlite").lower()
+
+    if backend == "memory":
+        return MemoryStateStore()
+    elif backend == "sqlite":
+        return SQLiteStateStore(os.environ.get("STATE_DB_PATH", "state.db"))
+    else:
+        raise ValueError(f"Unknown STATE_BACKEND: {backend}")
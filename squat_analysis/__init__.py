@@ -0,0 +1,19 @@
+"""
+Squat analysis core shared by the FastAPI service (ml/main.py) and the
+Streamlit app (squats/).
+"""
+from .process_frame import ProcessFrame
+from .thresholds import (
+    THRESHOLDS_BEGINNER,
+    THRESHOLDS_PRO,
+    THRESHOLDS_STRICT_BEGINNER,
+    THRESHOLDS_STRICT_PRO,
+    get_thresholds_beginner,
+    get_thresholds_pro,
+    get_thresholds_strict_beginner,
+    get_thresholds_strict_pro,
+    validate_thresholds,
+)
+from .utils import get_mediapipe_pose
+from .pose_replay import PoseRecorder, ReplayPose
+from .pose_filter import OneEuroFilter, SkippingPose, validate_pose_skip
@@ -0,0 +1,249 @@
+"""
+Video decode/encode used by the upload paths of the service and the
+Streamlit app.
+
+VideoReader decodes ahead of the consumer on its own thread and
+VideoWriter encodes behind it, so decoding, pose inference and encoding
+overlap (OpenCV and FFmpeg release the GIL while they work). Both take a
+backend:
+    - 'opencv': cv2.VideoCapture / cv2.VideoWriter with the mp4v codec
+    - 'pyav':   PyAV (FFmpeg); writes H.264 mp4 that browsers can play
+The default is 'pyav' when the `av` package is installed.
+"""
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+
+_END = object()
+
+
+def pyav_available():
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def default_backend():
+    return 'pyav' if pyav_available() else 'opencv'
+
+
+# ---------------------------------- Backends ---------------------------------
+
+class OpenCVSource:
+    def __init__(self, path):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video file: {path}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def frames(self):
+        while True:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            yield frame
+
+    def close(self):
+        self.cap.release()
+
+
+class PyAVSource:
+    def __init__(self, path):
+        import av
+
+        self.container = av.open(path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = 'AUTO'
+
+        rate = self.stream.average_rate or self.stream.guessed_rate
+        self.fps = float(rate) if rate else 30.0
+        self.width = self.stream.codec_context.width
+        self.height = self.stream.codec_context.height
+        self.frame_count = self.stream.frames or 0
+
+    def frames(self):
+        for frame in self.container.decode(self.stream):
+            yield frame.to_ndarray(format='bgr24')
+
+    def close(self):
+        self.container.close()
+
+
+class OpenCVSink:
+    def __init__(self, path, fps, size, codec=None, bitrate=None):
+        fourcc = cv2.VideoWriter_fourcc(*(codec or 'mp4v'))
+        self.writer = cv2.VideoWriter(path, fourcc, fps, size)
+        if not self.writer.isOpened():
+            raise IOError(f"Could not open video writer: {path}")
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def close(self):
+        self.writer.release()
+
+
+class PyAVSink:
+    def __init__(self, path, fps, size, codec=None, bitrate=None):
+        import av
+        from fractions import Fraction
+
+        self.av = av
+        # faststart moves the index to the front so playback can start
+        # before the whole file is downloaded
+        self.container = av.open(path, mode='w', options={'movflags': 'faststart'} if path.endswith('.mp4') else {})
+        self.stream = self.container.add_stream(codec or 'libx264', rate=Fraction(fps).limit_denominator(1001))
+        # yuv420p needs even dimensions; odd frames lose their last row/column
+        self.width, self.height = size[0] & ~1, size[1] & ~1
+        self.stream.width, self.stream.height = self.width, self.height
+        self.stream.pix_fmt = 'yuv420p'
+        self.stream.thread_type = 'AUTO'
+        if bitrate:
+            self.stream.bit_rate = int(bitrate)
+
+        codec_name = self.stream.codec_context.name
+        if codec_name == 'libx264':
+            # ultrafast keeps encoding cheaper than mp4v while the file stays smaller
+            self.stream.options = {'preset': 'ultrafast'} if bitrate else {'preset': 'ultrafast', 'crf': '23'}
+        elif codec_name.startswith('libvpx'):
+            self.stream.options = {'deadline': 'realtime', 'cpu-used': '8'}
+
+    def write(self, frame):
+        frame = np.ascontiguousarray(frame[:self.height, :self.width])
+        video_frame = self.av.VideoFrame.from_ndarray(frame, format='bgr24')
+        for packet in self.stream.encode(video_frame):
+            self.container.mux(packet)
+
+    def close(self):
+        for packet in self.stream.encode():
+            self.container.mux(packet)
+        self.container.close()
+
+
+SOURCES = {'opencv': OpenCVSource, 'pyav': PyAVSource}
+SINKS = {'opencv': OpenCVSink, 'pyav': PyAVSink}
+
+
+# ---------------------------------- Threads ----------------------------------
+
+class VideoReader:
+    """
+    Iterates over the BGR frames of a video file, decoded up to `queue_size`
+    frames ahead on a background thread.
+    """
+
+    def __init__(self, path, backend=None, queue_size=8):
+        self.backend = backend or default_backend()
+        self.source = SOURCES[self.backend](path)
+        self.fps = self.source.fps
+        self.width = self.source.width
+        self.height = self.source.height
+        self.frame_count = self.source.frame_count
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._decode, daemon=True)
+        self._thread.start()
+
+    def _decode(self):
+        try:
+            for frame in self.source.frames():
+                if not self._put(frame):
+                    return
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(_END)
+
+    def _put(self, item):
+        # Give up once the consumer has closed the reader
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _END:
+                break
+            yield frame
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class VideoWriter:
+    """
+    Writes BGR frames to a video file; encoding happens on a background
+    thread with up to `queue_size` frames waiting. Errors from the encoder
+    are raised by the next write() or by close().
+    """
+
+    def __init__(self, path, fps, size, backend=None, codec=None, bitrate=None, queue_size=8):
+        self.backend = backend or default_backend()
+        self.path = path
+        self.sink = SINKS[self.backend](path, fps, size, codec=codec, bitrate=bitrate)
+        self.frames_written = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._encode, daemon=True)
+        self._thread.start()
+
+    def _encode(self):
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is _END:
+                    break
+                self.sink.write(frame)
+                self.frames_written += 1
+        except Exception as e:
+            self._error = e
+            # Keep draining so write() never blocks on a dead encoder
+            while self._queue.get() is not _END:
+                pass
+        finally:
+            self.sink.close()
+
+    def write(self, frame):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_END)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
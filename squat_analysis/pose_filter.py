@@ -0,0 +1,203 @@
+import math
+import time
+
+import cv2
+import numpy as np
+
+from .pose_replay import Landmark, PoseLandmarks, PoseResult
+
+
+def smoothing_factor(dt, cutoff):
+    r = 2 * math.pi * cutoff * dt
+    return r / (r + 1)
+
+
+class OneEuroFilter:
+    """
+    One-Euro filter (Casiez et al., 2012) over a whole array of values,
+    e.g. the 33 x 3 landmark coordinates of one pose.
+
+    Slow movements are smoothed towards `min_cutoff` Hz, fast ones follow
+    more closely as the cutoff rises by `beta` per unit/s of speed. The
+    filtered speed is kept, so `predict()` can extrapolate between samples.
+    """
+
+    def __init__(self, min_cutoff=5.0, beta=1.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x_prev = None
+        self.dx_prev = None
+        self.t_prev = None
+
+    def __call__(self, x, t):
+        if self.x_prev is None:
+            self.x_prev = x
+            self.dx_prev = np.zeros_like(x)
+            self.t_prev = t
+            return x
+
+        dt = t - self.t_prev
+        if dt <= 0:
+            return self.x_prev
+
+        a_d = smoothing_factor(dt, self.d_cutoff)
+        dx = a_d * (x - self.x_prev) / dt + (1 - a_d) * self.dx_prev
+
+        a = smoothing_factor(dt, self.min_cutoff + self.beta * np.abs(dx))
+        x_hat = a * x + (1 - a) * self.x_prev
+
+        self.x_prev, self.dx_prev, self.t_prev = x_hat, dx, t
+        return x_hat
+
+    def predict(self, t, horizon=None):
+        # Linear extrapolation, at most `horizon` seconds past the last sample
+        dt = t - self.t_prev
+        if horizon is not None:
+            dt = min(dt, horizon)
+        return self.x_prev + self.dx_prev * dt
+
+
+def motion_score(prev_small, small):
+    # Mean absolute difference of two small grayscale frames, from 0 to 1
+    return float(cv2.absdiff(prev_small, small).mean()) / 255.0
+
+
+# Upper bounds of the filter settings a client may send
+MAX_SETTINGS = {'min_cutoff': 100.0, 'beta': 100.0}
+
+
+def _is_number(value):
+    # bools are ints, and NaN/Infinity parse as JSON numbers in Python
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def validate_pose_skip(settings):
+    """
+    Check pose-skip settings (e.g. from a client) and return them as
+    keyword arguments for SkippingPose.configure. Raises ValueError.
+    """
+    if not isinstance(settings, dict):
+        raise ValueError("Pose-skip settings must be an object")
+
+    unknown = set(settings) - {'every', 'motion', 'min_cutoff', 'beta'}
+    if unknown:
+        raise ValueError(f"Unknown pose-skip settings: {', '.join(sorted(unknown))}")
+
+    every = settings.get('every', 1)
+    if not isinstance(every, int) or isinstance(every, bool) or not 1 <= every <= 30:
+        raise ValueError("every must be an integer from 1 to 30")
+
+    motion = settings.get('motion')
+    if motion is not None and (not _is_number(motion) or not 0 < motion < 1):
+        raise ValueError("motion must be between 0 and 1")
+
+    for key, maximum in MAX_SETTINGS.items():
+        if key in settings and (not _is_number(settings[key]) or not 0 <= settings[key] <= maximum):
+            raise ValueError(f"{key} must be a number from 0 to {maximum:g}")
+
+    return dict(settings, every=every, motion=motion)
+
+
+class SkippingPose:
+    """
+    Wraps a pose model and runs inference on only some frames; the
+    landmarks of the other frames are extrapolated from a One-Euro filter
+    over the inferred ones. ProcessFrame uses it like the plain pose.
+
+    every:  run inference at least every Nth frame (1 turns skipping off)
+    motion: if set, also run it as soon as the frame differs from the last
+            inferred one by more than this mean pixel change (0 to 1), so
+            the gap of `every` only applies while the athlete holds still
+
+    A frame without a detected pose always forces inference on the next one.
+    With a RoiCropper, inference runs on its crop and the landmarks are
+    mapped back to the full frame before they are filtered, so moving the
+    box never shows up as movement of the athlete.
+    Extrapolation stops after MAX_EXTRAPOLATION seconds and the landmarks
+    are held, so turning points at the top and bottom of a rep do not
+    overshoot. MediaPipe already smooths its landmarks; the light default
+    filter keeps the golden clips' counts exact up to every=10. Feedback
+    timing does change: a rep can register up to every-1 frames late.
+    """
+
+    MOTION_SIZE = (32, 24)
+    MAX_EXTRAPOLATION = 0.1
+
+    def __init__(self, pose, every=1, motion=None, min_cutoff=5.0, beta=1.0):
+        self.pose = pose
+        self.filter = OneEuroFilter()
+        self.frames_inferred = 0
+        self.frames_skipped = 0
+        self._visibility = None
+        self._motion_ref = None
+        self._since_inference = 0
+        self.configure(every=every, motion=motion, min_cutoff=min_cutoff, beta=beta)
+
+    def configure(self, every=1, motion=None, min_cutoff=5.0, beta=1.0):
+        self.every = every
+        self.motion = motion
+        self.filter.min_cutoff = min_cutoff
+        self.filter.beta = beta
+        # Start over from a real inference with the new settings
+        self.filter.reset()
+        self._visibility = None
+
+    @property
+    def enabled(self):
+        return self.every > 1
+
+    def process(self, frame, roi=None):
+        if not self.enabled:
+            self.frames_inferred += 1
+            return self._detect(frame, roi)
+
+        now = time.perf_counter()
+        small = None
+        if self.motion is not None:
+            small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), self.MOTION_SIZE, interpolation=cv2.INTER_AREA)
+
+        if self._should_infer(small):
+            return self._infer(frame, small, now, roi)
+
+        self.frames_skipped += 1
+        self._since_inference += 1
+        return self._result(self.filter.predict(now, self.MAX_EXTRAPOLATION))
+
+    def _should_infer(self, small):
+        if self._visibility is None or self._since_inference + 1 >= self.every:
+            return True
+        if small is None or self._motion_ref is None:
+            return False
+        return motion_score(self._motion_ref, small) > self.motion
+
+    def _detect(self, frame, roi):
+        return roi.process(frame, self.pose) if roi is not None else self.pose.process(frame)
+
+    def _infer(self, frame, small, now, roi):
+        result = self._detect(frame, roi)
+        self.frames_inferred += 1
+        self._since_inference = 0
+        self._motion_ref = small
+
+        if not result.pose_landmarks:
+            self.filter.reset()
+            self._visibility = None
+            return result
+
+        landmarks = result.pose_landmarks.landmark
+        points = np.array([(lm.x, lm.y, lm.z) for lm in landmarks])
+        self._visibility = [lm.visibility for lm in landmarks]
+        return self._result(self.filter(points, now))
+
+    def _result(self, points):
+        return PoseResult(PoseLandmarks([
+            Landmark(x, y, z, visibility)
+            for (x, y, z), visibility in zip(points.tolist(), self._visibility)
+        ]))
+
+    def close(self):
+        self.pose.close()
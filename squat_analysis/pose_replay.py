@@ -0,0 +1,110 @@
+import json
+
+
+class Landmark:
+    __slots__ = ('x', 'y', 'z', 'visibility')
+
+    def __init__(self, x, y, z=0.0, visibility=1.0):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.visibility = visibility
+
+
+class PoseLandmarks:
+    def __init__(self, landmark):
+        self.landmark = landmark
+
+
+class PoseResult:
+    # Same shape as the MediaPipe result that ProcessFrame reads.
+    def __init__(self, pose_landmarks=None):
+        self.pose_landmarks = pose_landmarks
+
+
+def landmarks_to_list(result):
+    # Compact, JSON friendly form of one MediaPipe result (None if no pose).
+    if not result.pose_landmarks:
+        return None
+    return [
+        [round(lm.x, 5), round(lm.y, 5), round(lm.z, 5), round(lm.visibility, 4)]
+        for lm in result.pose_landmarks.landmark
+    ]
+
+
+def list_to_result(points):
+    if not points:
+        return PoseResult(None)
+    return PoseResult(PoseLandmarks([Landmark(*point) for point in points]))
+
+
+class ReplayPose:
+    """
+    Drop-in replacement for the MediaPipe pose that returns recorded
+    landmarks frame by frame and ignores the image it is given.
+
+    Used to benchmark and test everything around pose inference
+    reproducibly. With loop=True the recording repeats forever, otherwise
+    frames past the end are reported as "no pose".
+    """
+
+    def __init__(self, frames, loop=False):
+        self._results = [list_to_result(points) for points in frames]
+        self.loop = loop
+        self._index = 0
+
+    @classmethod
+    def from_file(cls, path, loop=False):
+        # Accepts recordings from PoseRecorder.save and golden benchmark files.
+        with open(path) as f:
+            return cls(json.load(f)['frames'], loop=loop)
+
+    def __len__(self):
+        return len(self._results)
+
+    def process(self, frame):
+        if self._index >= len(self._results):
+            if not self.loop or not self._results:
+                return PoseResult(None)
+            self._index = 0
+
+        result = self._results[self._index]
+        self._index += 1
+        return result
+
+    def seek(self, index):
+        # Line up with a frame index, e.g. when some frames are not inferred
+        self._index = index
+
+    def reset(self):
+        self._index = 0
+
+    def close(self):
+        pass
+
+
+class PoseRecorder:
+    """
+    Wraps a pose model (get_mediapipe_pose() by default) and records the
+    landmarks of every processed frame, so they can be replayed later
+    with ReplayPose.
+    """
+
+    def __init__(self, pose=None, **pose_kwargs):
+        if pose is None:
+            from .utils import get_mediapipe_pose
+            pose = get_mediapipe_pose(**pose_kwargs)
+        self.pose = pose
+        self.frames = []
+
+    def process(self, frame):
+        result = self.pose.process(frame)
+        self.frames.append(landmarks_to_list(result))
+        return result
+
+    def save(self, path, **metadata):
+        with open(path, 'w') as f:
+            json.dump(dict(metadata, frames=self.frames), f, separators=(',', ':'))
+
+    def close(self):
+        self.pose.close()
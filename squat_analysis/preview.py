@@ -0,0 +1,155 @@
+"""
+Lightweight previews of a processed workout, built during the processing
+pass from the frames ProcessFrame has already drawn:
+    - a downscaled, low frame rate MP4 (H.264) or WebM clip of the whole
+      video, encoded while frames arrive at a configurable bitrate
+    - a sprite sheet with one row of key frames per rep
+"""
+import os
+
+import cv2
+import numpy as np
+
+from .media import VideoWriter, default_backend
+
+
+# Codec per (backend, container) for clips browsers can play; OpenCV cannot
+# write H.264, so it always produces VP8 WebM.
+PREVIEW_CODECS = {
+    ('pyav', 'mp4'): 'libx264',
+    ('pyav', 'webm'): 'libvpx-vp9',
+    ('opencv', 'webm'): 'VP80',
+}
+
+
+def preview_extension(backend=None, preferred='mp4'):
+    backend = backend or default_backend()
+    return preferred if (backend, preferred) in PREVIEW_CODECS else 'webm'
+
+
+class PreviewBuilder:
+    """
+    Feed every processed (BGR) frame to `add()` together with the
+    ProcessFrame that drew it, then call `close()`, or `abort()` if
+    processing failed.
+
+    The preview keeps one frame out of every fps / preview_fps and scales it
+    by `scale`. For the sprite sheet, the frames between a rep leaving s1 and
+    being counted are kept as small tiles; when the rep is counted,
+    `frames_per_rep` of them (first, last and evenly spaced in between)
+    become its row. The bitrate only applies to the pyav backend.
+    """
+
+    def __init__(
+        self,
+        preview_path,
+        sprite_path,
+        fps,
+        size,
+        preview_fps=10,
+        scale=0.5,
+        bitrate=400_000,
+        backend=None,
+        frames_per_rep=4,
+        tile_width=160,
+        max_reps=50,
+    ):
+        self.backend = backend or default_backend()
+        self.preview_path = preview_path
+        self.sprite_path = sprite_path
+        self.step = max(1, round(fps / preview_fps))
+        self.frame_time = 1.0 / fps
+
+        extension = preview_path.rsplit('.', 1)[-1].lower()
+        codec = PREVIEW_CODECS.get((self.backend, extension))
+        if codec is None:
+            raise ValueError(f"The {self.backend} backend cannot write browser playable .{extension} previews")
+
+        # Even dimensions keep yuv420p encoders happy
+        width, height = size
+        self.preview_size = (int(width * scale) & ~1, int(height * scale) & ~1)
+        self.writer = VideoWriter(preview_path, fps / self.step, self.preview_size,
+                                  backend=self.backend, codec=codec, bitrate=bitrate)
+
+        self.frames_per_rep = frames_per_rep
+        self.tile_size = (tile_width, round(tile_width * height / width))
+        self.max_reps = max_reps
+        self.reps = []
+        self._rep_tiles = None
+        self._rep_start = None
+        self._prev_counts = (0, 0)
+        self._frame_idx = 0
+
+    def add(self, frame, processor):
+        frame_idx = self._frame_idx
+        self._frame_idx += 1
+
+        if frame_idx % self.step == 0:
+            self.writer.write(cv2.resize(frame, self.preview_size, interpolation=cv2.INTER_AREA))
+
+        self._track_rep(frame, processor.state_tracker, frame_idx)
+
+    def _track_rep(self, frame, state_tracker, frame_idx):
+        counts = (state_tracker['SQUAT_COUNT'], state_tracker['IMPROPER_SQUAT'])
+        prev_correct, prev_incorrect = self._prev_counts
+        self._prev_counts = counts
+
+        if sum(counts) < prev_correct + prev_incorrect:
+            # Counters were reset after inactivity, the pending rep is gone
+            self._rep_tiles = None
+
+        if self._rep_tiles is None:
+            if state_tracker['curr_state'] in ('s2', 's3'):
+                self._rep_tiles = []
+                self._rep_start = frame_idx
+            else:
+                return
+
+        # Tiles at the preview rate are plenty to pick key frames from
+        if frame_idx % self.step == 0 or sum(counts) > prev_correct + prev_incorrect:
+            self._rep_tiles.append(cv2.resize(frame, self.tile_size, interpolation=cv2.INTER_AREA))
+
+        if sum(counts) > prev_correct + prev_incorrect:
+            if len(self.reps) < self.max_reps:
+                picks = np.linspace(0, len(self._rep_tiles) - 1, self.frames_per_rep).round().astype(int)
+                self.reps.append({
+                    'correct': counts[0] > prev_correct,
+                    'start_seconds': round(self._rep_start * self.frame_time, 2),
+                    'end_seconds': round(frame_idx * self.frame_time, 2),
+                    'tiles': [self._rep_tiles[i] for i in picks],
+                })
+            self._rep_tiles = None
+
+    def abort(self):
+        """Stop the encoder and delete the partial preview; never raises."""
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+        self.reps = []
+        for path in (self.preview_path, self.sprite_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        self.writer.close()
+
+        sprite = None
+        if self.reps:
+            rows = [np.hstack(rep['tiles']) for rep in self.reps]
+            cv2.imwrite(self.sprite_path, np.vstack(rows), [cv2.IMWRITE_JPEG_QUALITY, 80])
+            sprite = {
+                'tile_width': self.tile_size[0],
+                'tile_height': self.tile_size[1],
+                'columns': self.frames_per_rep,
+                'reps': [
+                    {key: value for key, value in rep.items() if key != 'tiles'}
+                    for rep in self.reps
+                ],
+            }
+
+        return {
+            'preview_path': self.preview_path,
+            'sprite_path': self.sprite_path if sprite else None,
+            'sprite': sprite,
+        }
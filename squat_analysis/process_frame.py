@@ -1,65 +1,85 @@
 import time
+import logging
+import traceback
 import cv2
 import numpy as np
-from utils import find_angle, get_landmark_features, draw_text, draw_dotted_line
+from .utils import find_angle, get_landmark_features, draw_text, draw_dotted_line
+from .pose_filter import SkippingPose
+from .roi import RoiCropper
 
 
 class ProcessFrame:
-    def __init__(self, thresholds, flip_frame = False):
+    # Drawing settings and landmark ids never change, so every instance shares them.
+
+    # Font type.
+    font = cv2.FONT_HERSHEY_SIMPLEX
+
+    # line type
+    linetype = cv2.LINE_AA
+
+    # set radius to draw arc
+    radius = 20
+
+    # Colors in BGR format.
+    COLORS = {
+                'blue'       : (0, 127, 255),
+                'red'        : (255, 50, 50),
+                'green'      : (0, 255, 127),
+                'light_green': (100, 233, 127),
+                'yellow'     : (255, 255, 0),
+                'magenta'    : (255, 0, 255),
+                'white'      : (255,255,255),
+                'cyan'       : (0, 255, 255),
+                'light_blue' : (102, 204, 255)
+              }
+
+    # Dictionary to maintain the various landmark features.
+    left_features = {
+                        'shoulder': 11,
+                        'elbow'   : 13,
+                        'wrist'   : 15,                    
+                        'hip'     : 23,
+                        'knee'    : 25,
+                        'ankle'   : 27,
+                        'foot'    : 31
+                     }
+
+    right_features = {
+                        'shoulder': 12,
+                        'elbow'   : 14,
+                        'wrist'   : 16,
+                        'hip'     : 24,
+                        'knee'    : 26,
+                        'ankle'   : 28,
+                        'foot'    : 32
+                      }
+
+    dict_features = {
+                        'left' : left_features,
+                        'right': right_features,
+                        'nose' : 0
+                    }
+
+    FEEDBACK_ID_MAP = {
+                        0: ('BEND BACKWARDS', 215, (0, 153, 255)),
+                        1: ('BEND FORWARD', 215, (0, 153, 255)),
+                        2: ('KNEE FALLING OVER TOE', 170, (255, 80, 80)),
+                        3: ('SQUAT TOO DEEP', 125, (255, 80, 80))
+                       }
+
+    def __init__(self, thresholds, flip_frame = False, roi_crop = False):
         
         # Set if frame should be flipped or not.
         self.flip_frame = flip_frame
 
-        # self.thresholds
-        self.thresholds = thresholds
-
-        # Font type.
-        self.font = cv2.FONT_HERSHEY_SIMPLEX
-
-        # line type
-        self.linetype = cv2.LINE_AA
-
-        # set radius to draw arc
-        self.radius = 20
-
-        # Colors in BGR format.
-        self.COLORS = {
-                        'blue'       : (0, 127, 255),
-                        'red'        : (255, 50, 50),
-                        'green'      : (0, 255, 127),
-                        'light_green': (100, 233, 127),
-                        'yellow'     : (255, 255, 0),
-                        'magenta'    : (255, 0, 255),
-                        'white'      : (255,255,255),
-                        'cyan'       : (0, 255, 255),
-                        'light_blue' : (102, 204, 255)
-                      }
+        # Run pose inference on a crop around the athlete, see RoiCropper.
+        self.roi = None
+        if roi_crop:
+            landmark_ids = [self.dict_features['nose'], *self.left_features.values(), *self.right_features.values()]
+            self.roi = RoiCropper(landmark_ids)
 
-        # Dictionary to maintain the various landmark features.
-        self.dict_features = {}
-        self.left_features = {
-                                'shoulder': 11,
-                                'elbow'   : 13,
-                                'wrist'   : 15,                    
-                                'hip'     : 23,
-                                'knee'    : 25,
-                                'ankle'   : 27,
-                                'foot'    : 31
-                             }
-
-        self.right_features = {
-                                'shoulder': 12,
-                                'elbow'   : 14,
-                                'wrist'   : 16,
-                                'hip'     : 24,
-                                'knee'    : 26,
-                                'ankle'   : 28,
-                                'foot'    : 32
-                              }
-
-        self.dict_features['left'] = self.left_features
-        self.dict_features['right'] = self.right_features
-        self.dict_features['nose'] = 0
+        # Thresholds are read-only and may be shared, see set_thresholds.
+        self.thresholds = thresholds
 
         
         # For tracking counters and sharing states in and out of callbacks.
@@ -82,25 +102,34 @@ class ProcessFrame:
             'prev_state': None,
             'curr_state':None,
 
+            # Knee-vertical angle of the last frame, None if it was not measured.
+            'knee_angle': None,
+
             'SQUAT_COUNT': 0,
             'IMPROPER_SQUAT':0
         }
-        
-        self.FEEDBACK_ID_MAP = {
-                                0: ('BEND BACKWARDS', 215, (0, 153, 255)),
-                                1: ('BEND FORWARD', 215, (0, 153, 255)),
-                                2: ('KNEE FALLING OVER TOE', 170, (255, 80, 80)),
-                                3: ('SQUAT TOO DEEP', 125, (255, 80, 80))
-                               }
-
-    def _get_state(self, knee_angle):
+
+    def set_thresholds(self, thresholds):
+        # Swap the threshold set of a live processor, counters are kept.
+        # process() reads the attribute once per frame, so a frame never
+        # mixes two threshold sets.
+        self.thresholds = thresholds
+
+    def reset_inactivity_timers(self):
+        # Restart the inactivity clocks, e.g. after a session was resumed.
+        self.state_tracker['start_inactive_time'] = time.perf_counter()
+        self.state_tracker['start_inactive_time_front'] = time.perf_counter()
+        self.state_tracker['INACTIVE_TIME'] = 0.0
+        self.state_tracker['INACTIVE_TIME_FRONT'] = 0.0
+
+    def _get_state(self, knee_angle, thresholds):
         knee = None        
 
-        if self.thresholds['HIP_KNEE_VERT']['NORMAL'][0] <= knee_angle <= self.thresholds['HIP_KNEE_VERT']['NORMAL'][1]:
+        if thresholds['HIP_KNEE_VERT']['NORMAL'][0] <= knee_angle <= thresholds['HIP_KNEE_VERT']['NORMAL'][1]:
             knee = 1
-        elif self.thresholds['HIP_KNEE_VERT']['TRANS'][0] <= knee_angle <= self.thresholds['HIP_KNEE_VERT']['TRANS'][1]:
+        elif thresholds['HIP_KNEE_VERT']['TRANS'][0] <= knee_angle <= thresholds['HIP_KNEE_VERT']['TRANS'][1]:
             knee = 2
-        elif self.thresholds['HIP_KNEE_VERT']['PASS'][0] <= knee_angle <= self.thresholds['HIP_KNEE_VERT']['PASS'][1]:
+        elif thresholds['HIP_KNEE_VERT']['PASS'][0] <= knee_angle <= thresholds['HIP_KNEE_VERT']['PASS'][1]:
             knee = 3
 
         return f's{knee}' if knee else None
@@ -139,6 +168,8 @@ class ProcessFrame:
 
     def process(self, frame: np.array, pose):
         play_sound = None
+        thresholds = self.thresholds
+        self.state_tracker['knee_angle'] = None
         
         # Get frame dimensions
         if frame is None:
@@ -151,7 +182,13 @@ class ProcessFrame:
 
         # Process the image.
         try:
-            keypoints = pose.process(frame)
+            if isinstance(pose, SkippingPose):
+                # Crops before its filter, which needs full-frame landmarks
+                keypoints = pose.process(frame, roi=self.roi)
+            elif self.roi is not None:
+                keypoints = self.roi.process(frame, pose)
+            else:
+                keypoints = pose.process(frame)
         except Exception as e:
             logging.error(f"Error processing pose: {str(e)}")
             return frame, None
@@ -167,7 +204,7 @@ class ProcessFrame:
 
             offset_angle = find_angle(left_shldr_coord, right_shldr_coord, nose_coord)
 
-            if offset_angle > self.thresholds['OFFSET_THRESH']:
+            if offset_angle > thresholds['OFFSET_THRESH']:
                 
                 display_inactivity = False
 
@@ -175,7 +212,7 @@ class ProcessFrame:
                 self.state_tracker['INACTIVE_TIME_FRONT'] += end_time - self.state_tracker['start_inactive_time_front']
                 self.state_tracker['start_inactive_time_front'] = end_time
 
-                if self.state_tracker['INACTIVE_TIME_FRONT'] >= self.thresholds['INACTIVE_THRESH']:
+                if self.state_tracker['INACTIVE_TIME_FRONT'] >= thresholds['INACTIVE_THRESH']:
                     self.state_tracker['SQUAT_COUNT'] = 0
                     self.state_tracker['IMPROPER_SQUAT'] = 0
                     display_inactivity = True
@@ -322,8 +359,9 @@ class ProcessFrame:
                     cv2.circle(frame, ankle_coord, 7, self.COLORS['yellow'], -1,  lineType=self.linetype)
                     cv2.circle(frame, foot_coord, 7, self.COLORS['yellow'], -1,  lineType=self.linetype)
 
-                    current_state = self._get_state(int(knee_vertical_angle))
+                    current_state = self._get_state(int(knee_vertical_angle), thresholds)
                     self.state_tracker['curr_state'] = current_state
+                    self.state_tracker['knee_angle'] = knee_vertical_angle
                     self._update_state_sequence(current_state)
 
                     # -------------------------------------- COMPUTE COUNTERS --------------------------------------
@@ -348,27 +386,27 @@ class ProcessFrame:
                     # -------------------------------------- PERFORM FEEDBACK ACTIONS --------------------------------------
 
                     else:
-                        if hip_vertical_angle > self.thresholds['HIP_THRESH'][1]:
+                        if hip_vertical_angle > thresholds['HIP_THRESH'][1]:
                             self.state_tracker['DISPLAY_TEXT'][0] = True
                             
 
-                        elif hip_vertical_angle < self.thresholds['HIP_THRESH'][0] and \
+                        elif hip_vertical_angle < thresholds['HIP_THRESH'][0] and \
                                 self.state_tracker['state_seq'].count('s2')==1:
                                 self.state_tracker['DISPLAY_TEXT'][1] = True
                             
                                             
                         
-                        if self.thresholds['KNEE_THRESH'][0] < knee_vertical_angle < self.thresholds['KNEE_THRESH'][1] and \
+                        if thresholds['KNEE_THRESH'][0] < knee_vertical_angle < thresholds['KNEE_THRESH'][1] and \
                             self.state_tracker['state_seq'].count('s2')==1:
                             self.state_tracker['LOWER_HIPS'] = True
 
 
-                        elif knee_vertical_angle > self.thresholds['KNEE_THRESH'][2]:
+                        elif knee_vertical_angle > thresholds['KNEE_THRESH'][2]:
                             self.state_tracker['DISPLAY_TEXT'][3] = True
                             self.state_tracker['INCORRECT_POSTURE'] = True
 
                         
-                        if (ankle_vertical_angle > self.thresholds['ANKLE_THRESH']):
+                        if (ankle_vertical_angle > thresholds['ANKLE_THRESH']):
                             self.state_tracker['DISPLAY_TEXT'][2] = True
                             self.state_tracker['INCORRECT_POSTURE'] = True
                     
@@ -382,7 +420,7 @@ class ProcessFrame:
                         self.state_tracker['INACTIVE_TIME'] += end_time - self.state_tracker['start_inactive_time']
                         self.state_tracker['start_inactive_time'] = end_time
 
-                        if self.state_tracker['INACTIVE_TIME'] >= self.thresholds['INACTIVE_THRESH']:
+                        if self.state_tracker['INACTIVE_TIME'] >= thresholds['INACTIVE_THRESH']:
                             self.state_tracker['SQUAT_COUNT'] = 0
                             self.state_tracker['IMPROPER_SQUAT'] = 0
                             display_inactivity = True
@@ -442,8 +480,8 @@ class ProcessFrame:
                     )  
                     
                     
-                    self.state_tracker['DISPLAY_TEXT'][self.state_tracker['COUNT_FRAMES'] > self.thresholds['CNT_FRAME_THRESH']] = False
-                    self.state_tracker['COUNT_FRAMES'][self.state_tracker['COUNT_FRAMES'] > self.thresholds['CNT_FRAME_THRESH']] = 0    
+                    self.state_tracker['DISPLAY_TEXT'][self.state_tracker['COUNT_FRAMES'] > thresholds['CNT_FRAME_THRESH']] = False
+                    self.state_tracker['COUNT_FRAMES'][self.state_tracker['COUNT_FRAMES'] > thresholds['CNT_FRAME_THRESH']] = 0    
                     self.state_tracker['prev_state'] = current_state
                 except Exception as e:
                     logging.error(f"Error in aligned camera processing: {str(e)}")
@@ -461,7 +499,7 @@ class ProcessFrame:
 
             display_inactivity = False
 
-            if self.state_tracker['INACTIVE_TIME'] >= self.thresholds['INACTIVE_THRESH']:
+            if self.state_tracker['INACTIVE_TIME'] >= thresholds['INACTIVE_THRESH']:
                 self.state_tracker['SQUAT_COUNT'] = 0
                 self.state_tracker['IMPROPER_SQUAT'] = 0
                 display_inactivity = True
@@ -0,0 +1,106 @@
+import numpy as np
+
+from .pose_replay import Landmark, PoseLandmarks, PoseResult
+
+
+class RoiCropper:
+    """
+    Runs pose inference on a padded crop around the athlete instead of the
+    whole frame, and maps the landmarks back to full-frame coordinates.
+
+    The box comes from the previous frame's key landmarks (the ids
+    ProcessFrame reads), padded by `padding` times its larger side. It only
+    moves when the athlete gets close to its edge or it grows much larger
+    than needed, so MediaPipe's own tracking sees a steady image. When no
+    pose is found in the crop, or the mean visibility of the key landmarks
+    drops below `min_visibility`, the frame is re-detected in full.
+
+    MediaPipe's tracking mode already crops internally around the previous
+    pose, so this mostly pays off for large frames with a small athlete and
+    for models that look at the whole image; it is off by default.
+    """
+
+    def __init__(self, landmark_ids, padding=0.3, min_visibility=0.5, min_size=96):
+        self.landmark_ids = list(landmark_ids)
+        self.padding = padding
+        self.min_visibility = min_visibility
+        self.min_size = min_size
+        self.box = None
+
+        self.frames_cropped = 0
+        self.frames_full = 0
+
+    def reset(self):
+        self.box = None
+
+    def process(self, frame, pose):
+        frame_height, frame_width = frame.shape[:2]
+
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            result = pose.process(np.ascontiguousarray(frame[y0:y1, x0:x1]))
+            if self._confident(result):
+                self.frames_cropped += 1
+                result = self._to_frame(result, self.box, frame_width, frame_height)
+                self._update_box(result, frame_width, frame_height)
+                return result
+
+        # First frame, or the crop lost the athlete: detect on the full frame
+        self.frames_full += 1
+        result = pose.process(frame)
+        if self._confident(result):
+            self._update_box(result, frame_width, frame_height)
+        else:
+            self.box = None
+        return result
+
+    def _confident(self, result):
+        if not result.pose_landmarks:
+            return False
+        landmarks = result.pose_landmarks.landmark
+        visibility = np.mean([landmarks[i].visibility for i in self.landmark_ids])
+        return visibility >= self.min_visibility
+
+    @staticmethod
+    def _to_frame(result, box, frame_width, frame_height):
+        x0, y0, x1, y1 = box
+        scale_x = (x1 - x0) / frame_width
+        scale_y = (y1 - y0) / frame_height
+        offset_x = x0 / frame_width
+        offset_y = y0 / frame_height
+
+        # z uses the same scale as x in MediaPipe
+        return PoseResult(PoseLandmarks([
+            Landmark(offset_x + lm.x * scale_x, offset_y + lm.y * scale_y, lm.z * scale_x, lm.visibility)
+            for lm in result.pose_landmarks.landmark
+        ]))
+
+    def _update_box(self, result, frame_width, frame_height):
+        landmarks = result.pose_landmarks.landmark
+        xs = np.array([landmarks[i].x for i in self.landmark_ids]) * frame_width
+        ys = np.array([landmarks[i].y for i in self.landmark_ids]) * frame_height
+        left, right = xs.min(), xs.max()
+        top, bottom = ys.min(), ys.max()
+
+        if self.box is not None:
+            # Keep the box while the landmarks stay clear of its edges (edges
+            # on the frame border do not count) and it is not far too large
+            x0, y0, x1, y1 = self.box
+            margin = self.padding / 4 * max(right - left, bottom - top)
+            inside = (left - margin >= x0 or x0 == 0) and (right + margin <= x1 or x1 == frame_width) and \
+                     (top - margin >= y0 or y0 == 0) and (bottom + margin <= y1 or y1 == frame_height)
+            needed = (right - left) * (bottom - top) * (1 + 2 * self.padding) ** 2
+            if inside and (x1 - x0) * (y1 - y0) <= 3 * needed:
+                return
+
+        pad = self.padding * max(right - left, bottom - top, self.min_size)
+        center_x, center_y = (left + right) / 2, (top + bottom) / 2
+        half_width = max(right - left + 2 * pad, self.min_size) / 2
+        half_height = max(bottom - top + 2 * pad, self.min_size) / 2
+
+        self.box = (
+            int(max(0, center_x - half_width)),
+            int(max(0, center_y - half_height)),
+            int(min(frame_width, center_x + half_width)),
+            int(min(frame_height, center_y + half_height)),
+        )
@@ -0,0 +1,146 @@
+import math
+from numbers import Real
+from types import MappingProxyType
+
+
+def freeze_thresholds(thresholds):
+    # Read-only copy that can be shared by every ProcessFrame instance.
+    frozen = {}
+    for key, value in thresholds.items():
+        if isinstance(value, dict):
+            value = MappingProxyType({k: tuple(v) for k, v in value.items()})
+        elif isinstance(value, (list, tuple)):
+            value = tuple(value)
+        frozen[key] = value
+
+    return MappingProxyType(frozen)
+
+
+def _check_number(name, value, integer=False):
+    if isinstance(value, bool) or not isinstance(value, Real):
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be finite")
+    if integer and int(value) != value:
+        raise ValueError(f"{name} must be an integer")
+    if value < 0:
+        raise ValueError(f"{name} must not be negative")
+
+
+def _check_ascending(name, values, length):
+    if not isinstance(values, (list, tuple)) or len(values) != length:
+        raise ValueError(f"{name} must be a list of {length} numbers")
+    for value in values:
+        _check_number(name, value)
+    if list(values) != sorted(values):
+        raise ValueError(f"{name} must be in ascending order")
+
+
+def validate_thresholds(thresholds):
+    """
+    Validate a client supplied threshold profile and return it frozen.
+
+    Raises ValueError describing the first problem found.
+    """
+    if not isinstance(thresholds, dict):
+        raise ValueError("Thresholds must be an object")
+
+    missing = set(THRESHOLDS_BEGINNER) - set(thresholds)
+    if missing:
+        raise ValueError(f"Missing thresholds: {', '.join(sorted(missing))}")
+
+    unknown = set(thresholds) - set(THRESHOLDS_BEGINNER)
+    if unknown:
+        raise ValueError(f"Unknown thresholds: {', '.join(sorted(unknown))}")
+
+    hip_knee_vert = thresholds['HIP_KNEE_VERT']
+    if not isinstance(hip_knee_vert, dict) or set(hip_knee_vert) != {'NORMAL', 'TRANS', 'PASS'}:
+        raise ValueError("HIP_KNEE_VERT must have exactly NORMAL, TRANS and PASS ranges")
+    for state, angle_range in hip_knee_vert.items():
+        _check_ascending(f"HIP_KNEE_VERT.{state}", angle_range, 2)
+
+    _check_ascending('HIP_THRESH', thresholds['HIP_THRESH'], 2)
+    _check_ascending('KNEE_THRESH', thresholds['KNEE_THRESH'], 3)
+    _check_number('ANKLE_THRESH', thresholds['ANKLE_THRESH'])
+    _check_number('OFFSET_THRESH', thresholds['OFFSET_THRESH'])
+    _check_number('INACTIVE_THRESH', thresholds['INACTIVE_THRESH'])
+    _check_number('CNT_FRAME_THRESH', thresholds['CNT_FRAME_THRESH'], integer=True)
+
+    return freeze_thresholds(thresholds)
+
+
+# Thresholds for beginner mode (more relaxed)
+THRESHOLDS_BEGINNER = freeze_thresholds({
+                    'HIP_KNEE_VERT': {
+                                        'NORMAL' : (0,  40),  # Increased upper bound
+                                        'TRANS'  : (30, 75),  # Wider transition range
+                                        'PASS'   : (65, 100)  # Lower minimum, higher maximum
+                                     },
+                    'HIP_THRESH'   : [5, 60],     # More forgiving hip thresholds
+                    'ANKLE_THRESH' : 55,          # Increased ankle threshold
+                    'KNEE_THRESH'  : [40, 65, 100], # Relaxed knee thresholds
+                    'OFFSET_THRESH'    : 45.0,    # Increased offset threshold
+                    'INACTIVE_THRESH'  : 20.0,    # Increased inactive threshold
+                    'CNT_FRAME_THRESH' : 40       # Reduced frame threshold
+                })
+
+# Thresholds for pro mode (slightly relaxed)
+THRESHOLDS_PRO = freeze_thresholds({
+                    'HIP_KNEE_VERT': {
+                                        'NORMAL' : (0,  35),  # Slightly increased
+                                        'TRANS'  : (32, 70),  # Wider transition range
+                                        'PASS'   : (75, 100)  # Slightly relaxed max
+                                     },
+                    'HIP_THRESH'   : [12, 55],    # Slightly relaxed
+                    'ANKLE_THRESH' : 35,          # Slightly increased
+                    'KNEE_THRESH'  : [45, 75, 100], # Relaxed thresholds
+                    'OFFSET_THRESH'    : 40.0,    # Increased offset threshold
+                    'INACTIVE_THRESH'  : 18.0,    # Increased inactive threshold
+                    'CNT_FRAME_THRESH' : 45       # Slightly reduced
+                })
+
+# The Streamlit app's original, stricter profiles
+THRESHOLDS_STRICT_BEGINNER = freeze_thresholds({
+                    'HIP_KNEE_VERT': {
+                                        'NORMAL' : (0,  32),
+                                        'TRANS'  : (35, 65),
+                                        'PASS'   : (70, 95)
+                                     },
+                    'HIP_THRESH'   : [10, 50],
+                    'ANKLE_THRESH' : 45,
+                    'KNEE_THRESH'  : [50, 70, 95],
+                    'OFFSET_THRESH'    : 35.0,
+                    'INACTIVE_THRESH'  : 15.0,
+                    'CNT_FRAME_THRESH' : 50
+                })
+
+THRESHOLDS_STRICT_PRO = freeze_thresholds({
+                    'HIP_KNEE_VERT': {
+                                        'NORMAL' : (0,  32),
+                                        'TRANS'  : (35, 65),
+                                        'PASS'   : (80, 95)
+                                     },
+                    'HIP_THRESH'   : [15, 50],
+                    'ANKLE_THRESH' : 30,
+                    'KNEE_THRESH'  : [50, 80, 95],
+                    'OFFSET_THRESH'    : 35.0,
+                    'INACTIVE_THRESH'  : 15.0,
+                    'CNT_FRAME_THRESH' : 50
+                })
+
+
+# Get thresholds for beginner mode (shared, read-only)
+def get_thresholds_beginner():
+    return THRESHOLDS_BEGINNER
+
+# Get thresholds for pro mode (shared, read-only)
+def get_thresholds_pro():
+    return THRESHOLDS_PRO
+
+# Get the strict thresholds for beginner mode (shared, read-only)
+def get_thresholds_strict_beginner():
+    return THRESHOLDS_STRICT_BEGINNER
+
+# Get the strict thresholds for pro mode (shared, read-only)
+def get_thresholds_strict_pro():
+    return THRESHOLDS_STRICT_PRO
@@ -0,0 +1,84 @@
+import cv2
+
+
+# Widths of the thumbnails written for a video, in pixels
+THUMBNAIL_WIDTHS = {'small': 160, 'medium': 320, 'large': 640}
+THUMBNAIL_FORMATS = {
+    'jpg': [cv2.IMWRITE_JPEG_QUALITY, 85],
+    'webp': [cv2.IMWRITE_WEBP_QUALITY, 80],
+}
+
+
+class ThumbnailPicker:
+    """
+    Picks a thumbnail while a video is processed: the frame at the deepest
+    point (largest knee-vertical angle) of the best rep, where correct reps
+    beat improper ones and deeper beats shallower.
+
+    Feed every processed frame to `add()` together with its ProcessFrame.
+    Only the deepest frame of the current rep and of the best rep so far are
+    kept. Without any counted rep, the deepest frame of the unfinished rep,
+    or else the first frame, is used.
+    """
+
+    def __init__(self):
+        self.best_frame = None
+        self.best_score = None
+
+        self._first_frame = None
+        self._rep_frame = None
+        self._rep_depth = -1.0
+        self._prev_counts = (0, 0)
+
+    def add(self, frame, processor):
+        state_tracker = processor.state_tracker
+
+        if self._first_frame is None:
+            self._first_frame = frame.copy()
+
+        knee_angle = state_tracker['knee_angle']
+        if knee_angle is not None and state_tracker['curr_state'] in ('s2', 's3') and knee_angle > self._rep_depth:
+            self._rep_depth = knee_angle
+            self._rep_frame = frame.copy()
+
+        counts = (state_tracker['SQUAT_COUNT'], state_tracker['IMPROPER_SQUAT'])
+        prev_correct, prev_incorrect = self._prev_counts
+        self._prev_counts = counts
+
+        if sum(counts) > prev_correct + prev_incorrect:
+            score = (counts[0] > prev_correct, self._rep_depth)
+            if self._rep_frame is not None and (self.best_score is None or score > self.best_score):
+                self.best_score = score
+                self.best_frame = self._rep_frame
+            self._reset_rep()
+        elif sum(counts) < prev_correct + prev_incorrect:
+            # Counters were reset after inactivity
+            self._reset_rep()
+
+    def _reset_rep(self):
+        self._rep_frame = None
+        self._rep_depth = -1.0
+
+    def save(self, path_prefix, widths=THUMBNAIL_WIDTHS, formats=THUMBNAIL_FORMATS):
+        """
+        Write the thumbnail as `<path_prefix>_<size>.<format>` for every width
+        and format. Returns {size: {format: path}}, empty without any frame.
+        """
+        frame = self.best_frame if self.best_frame is not None else self._rep_frame
+        if frame is None:
+            frame = self._first_frame
+        if frame is None:
+            return {}
+
+        height, width = frame.shape[:2]
+        paths = {}
+        for size, thumb_width in widths.items():
+            thumb_width = min(thumb_width, width)
+            thumb = cv2.resize(frame, (thumb_width, round(height * thumb_width / width)), interpolation=cv2.INTER_AREA)
+
+            paths[size] = {}
+            for extension, params in formats.items():
+                path = f"{path_prefix}_{size}.{extension}"
+                if cv2.imwrite(path, thumb, params):
+                    paths[size][extension] = path
+        return paths
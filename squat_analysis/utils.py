@@ -1,5 +1,4 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 
 def draw_rounded_rect(img, rect_start, rect_end, corner_width, box_color):
@@ -113,6 +112,10 @@ def get_mediapipe_pose(
                       min_detection_confidence = 0.5,
                       min_tracking_confidence = 0.5
                      ):
+    # Imported here so the rest of the package works without MediaPipe,
+    # e.g. when replaying recorded landmarks.
+    import mediapipe as mp
+
     pose = mp.solutions.pose.Pose(
                                   static_image_mode = static_image_mode,
                                   model_complexity = model_complexity,
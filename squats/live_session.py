@@ -0,0 +1,115 @@
+import os
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from squat_analysis import ProcessFrame, get_mediapipe_pose
+
+
+# Worker threads shared by every browser session on this Streamlit server
+LIVE_WORKERS = int(os.environ.get('LIVE_WORKERS', os.cpu_count() or 1))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LIVE_WORKERS, thread_name_prefix='live-session')
+        return _executor
+
+
+
+class LiveSession:
+    """
+    Squat analysis state for one browser session of the live stream page.
+
+    The WebRTC frame callback hands frames to `submit()`, which never waits
+    for the analysis: it returns the most recent processed frame while the
+    new one is analysed on the shared worker pool. Each session has at most
+    one frame in flight and one waiting; a newer frame replaces the waiting
+    one (latest frame wins), so a slow session drops frames instead of
+    building up latency or holding workers needed by other sessions.
+    """
+
+    def __init__(self, thresholds, flip_frame=True):
+        self.processor = ProcessFrame(thresholds=thresholds, flip_frame=flip_frame)
+        self.pose = None
+
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+
+        self._lock = threading.Lock()
+        self._busy = False
+        self._pending = None
+        self._output = None
+        self._closed = False
+
+
+    def set_thresholds(self, thresholds):
+        self.processor.set_thresholds(thresholds)
+
+
+    def submit(self, frame):
+        with self._lock:
+            self.frames_received += 1
+            self._closed = False
+
+            # The worker draws on its frame in place, while the camera frame may
+            # still be encoded by WebRTC as the passthrough output: give it a copy
+            if self._busy:
+                if self._pending is not None:
+                    self.frames_dropped += 1
+                self._pending = frame.copy()
+            else:
+                self._busy = True
+                get_executor().submit(self._run, frame.copy())
+
+            output = self._output
+
+        # Nothing processed yet: pass the camera frame through
+        return frame if output is None else output
+
+
+    def close(self):
+        # Release the pose once the stream stops; it is recreated on the next frame
+        with self._lock:
+            self._closed = True
+            self._pending = None
+            if not self._busy:
+                self._close_pose()
+
+
+    def _run(self, frame):
+        output = None
+        try:
+            if self.pose is None:
+                self.pose = get_mediapipe_pose()
+            output, _ = self.processor.process(frame, self.pose)
+        except Exception as e:
+            logging.error(f"Error processing live frame: {str(e)}")
+            logging.error(traceback.format_exc())
+
+        with self._lock:
+            if output is not None:
+                self._output = output
+                self.frames_processed += 1
+
+            # Re-queue instead of looping, so busy sessions take turns on the pool
+            frame, self._pending = self._pending, None
+            if frame is not None:
+                get_executor().submit(self._run, frame)
+            else:
+                self._busy = False
+                if self._closed:
+                    self._close_pose()
+
+
+    def _close_pose(self):
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
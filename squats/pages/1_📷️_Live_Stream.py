@@ -6,13 +6,14 @@ from streamlit_webrtc import VideoHTMLAttributes, webrtc_streamer
 from aiortc.contrib.media import MediaRecorder
 
 
-BASE_DIR = os.path.abspath(os.path.join(__file__, '../../'))
+# The analysis core lives in the squat_analysis package at the repository root
+BASE_DIR = os.path.abspath(os.path.join(__file__, '../../../'))
 sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'squats'))
 
 
-from utils import get_mediapipe_pose
-from process_frame import ProcessFrame
-from thresholds import get_thresholds_beginner, get_thresholds_pro
+from squat_analysis import get_thresholds_strict_beginner, get_thresholds_strict_pro
+from live_session import LiveSession
 
 
 st.title('AI Fitness Trainer: Squats Analysis')
@@ -22,15 +23,19 @@ mode = st.radio('Select Mode', ['Beginner', 'Pro'], horizontal=True)
 thresholds = None 
 
 if mode == 'Beginner':
-    thresholds = get_thresholds_beginner()
+    thresholds = get_thresholds_strict_beginner()
 
 elif mode == 'Pro':
-    thresholds = get_thresholds_pro()
+    thresholds = get_thresholds_strict_pro()
 
 
-live_process_frame = ProcessFrame(thresholds=thresholds, flip_frame=True)
-# Initialize face mesh solution
-pose = get_mediapipe_pose()
+# One processor and pose per browser session, kept across reruns; changing
+# the mode only swaps the thresholds so the counters survive.
+if 'live_session' not in st.session_state:
+    st.session_state['live_session'] = LiveSession(thresholds, flip_frame=True)
+
+live_session = st.session_state['live_session']
+live_session.set_thresholds(thresholds)
 
 
 if 'download' not in st.session_state:
@@ -42,7 +47,7 @@ output_video_file = f'output_live.flv'
 
 def video_frame_callback(frame: av.VideoFrame):
     frame = frame.to_ndarray(format="rgb24")  # Decode and get RGB frame
-    frame, _ = live_process_frame.process(frame, pose)  # Process frame
+    frame = live_session.submit(frame)  # Latest processed frame, analysis runs off the callback
     return av.VideoFrame.from_ndarray(frame, format="rgb24")  # Encode and return BGR frame
 
 
@@ -59,6 +64,9 @@ ctx = webrtc_streamer(
                         out_recorder_factory=out_recorder_factory
                     )
 
+if not ctx.state.playing:
+    live_session.close()
+
 
 download_button = st.empty()
 
@@ -1,18 +1,18 @@
-import av
 import os
 import sys
+import time
 import streamlit as st
-import cv2
 import tempfile
 
 
-BASE_DIR = os.path.abspath(os.path.join(__file__, '../../'))
+# The analysis core lives in the squat_analysis package at the repository root
+BASE_DIR = os.path.abspath(os.path.join(__file__, '../../../'))
 sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'squats'))
 
 
-from utils import get_mediapipe_pose
-from process_frame import ProcessFrame
-from thresholds import get_thresholds_beginner, get_thresholds_pro
+from squat_analysis import get_thresholds_strict_beginner, get_thresholds_strict_pro
+from upload_job import UploadJob
 
 
 
@@ -25,17 +25,14 @@ mode = st.radio('Select Mode', ['Beginner', 'Pro'], horizontal=True)
 thresholds = None 
 
 if mode == 'Beginner':
-    thresholds = get_thresholds_beginner()
+    thresholds = get_thresholds_strict_beginner()
 
 elif mode == 'Pro':
-    thresholds = get_thresholds_pro()
+    thresholds = get_thresholds_strict_pro()
 
 
-
-upload_process_frame = ProcessFrame(thresholds=thresholds)
-
-# Initialize face mesh solution
-pose = get_mediapipe_pose()
+# Browser preview rate while a video is processed in the background.
+PREVIEW_FPS = 4
 
 
 download = None
@@ -43,11 +40,8 @@ download = None
 if 'download' not in st.session_state:
     st.session_state['download'] = False
 
-
-output_video_file = f'output_recorded.mp4'
-
-if os.path.exists(output_video_file):
-    os.remove(output_video_file)
+# Processing runs in a background job that survives script reruns.
+job = st.session_state.get('upload_job')
 
 
 with st.form('Upload', clear_on_submit=True):
@@ -55,6 +49,8 @@ with st.form('Upload', clear_on_submit=True):
     uploaded = st.form_submit_button("Upload")
 
 stframe = st.empty()
+progress_bar = st.empty()
+cancel_button = st.empty()
 
 ip_vid_str = '<p style="font-family:Helvetica; font-weight: bold; font-size: 16px;">Input Video</p>'
 warning_str = '<p style="font-family:Helvetica; font-weight: bold; color: Red; font-size: 17px;">Please Upload a Video first!!!</p>'
@@ -64,72 +60,78 @@ warn = st.empty()
 
 download_button = st.empty()
 
-if up_file and uploaded:
+if uploaded and not up_file:
+    warn.markdown(warning_str, unsafe_allow_html=True)
+
+elif up_file and uploaded:
     
     download_button.empty()
+    warn.empty()
+
+    # A new upload replaces whatever this session was processing before.
+    if job is not None:
+        job.cancel()
+        if job.status == 'done' and os.path.exists(job.output_path):
+            os.remove(job.output_path)
+
     tfile = tempfile.NamedTemporaryFile(delete=False)
+    tfile.write(up_file.read())
+    tfile.close()
 
-    try:
-        warn.empty()
-        tfile.write(up_file.read())
-
-        vf = cv2.VideoCapture(tfile.name)
-
-        # ---------------------  Write the processed video frame. --------------------
-        fps = int(vf.get(cv2.CAP_PROP_FPS))
-        width = int(vf.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(vf.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        frame_size = (width, height)
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        video_output = cv2.VideoWriter(output_video_file, fourcc, fps, frame_size)
-        # -----------------------------------------------------------------------------
-
-        
-        txt = st.sidebar.markdown(ip_vid_str, unsafe_allow_html=True)   
-        ip_video = st.sidebar.video(tfile.name) 
-
-        while vf.isOpened():
-            ret, frame = vf.read()
-            if not ret:
-                break
-
-            # convert frame from BGR to RGB before processing it.
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            out_frame, _ = upload_process_frame.process(frame, pose)
-            stframe.image(out_frame)
-            video_output.write(out_frame[...,::-1])
-
-        
-        vf.release()
-        video_output.release()
-        stframe.empty()
-        ip_video.empty()
-        txt.empty()
-        tfile.close()
-    
-    except AttributeError:
-        warn.markdown(warning_str, unsafe_allow_html=True)   
+    output_fd, output_video_file = tempfile.mkstemp(suffix='.mp4')
+    os.close(output_fd)
 
+    st.session_state['input_video'] = up_file.getvalue()
+    job = UploadJob(tfile.name, output_video_file, thresholds, preview_fps=PREVIEW_FPS)
+    job.start()
+    st.session_state['upload_job'] = job
+    st.session_state['download'] = False
 
 
-if os.path.exists(output_video_file):
-    with open(output_video_file, 'rb') as op_vid:
-        download = download_button.download_button('Download Video', data = op_vid, file_name='output_recorded.mp4')
-    
-    if download:
-        st.session_state['download'] = True
+if job is not None and job.is_alive():
 
+    txt = st.sidebar.markdown(ip_vid_str, unsafe_allow_html=True)   
+    ip_video = st.sidebar.video(st.session_state['input_video']) 
 
+    if cancel_button.button('Cancel'):
+        job.cancel()
 
-if os.path.exists(output_video_file) and st.session_state['download']:
-    os.remove(output_video_file)
-    st.session_state['download'] = False
-    download_button.empty()
+    # Poll the job; clicking Cancel reruns the script, which ends this loop.
+    shown_preview = None
+    while job.is_alive():
+        preview_id, preview = job.latest_preview()
+        if preview is not None and preview_id != shown_preview:
+            stframe.image(preview)
+            shown_preview = preview_id
+        progress_bar.progress(job.progress, text=f'Processing frame {job.frames_done}/{job.frames_total}')
+        time.sleep(1 / PREVIEW_FPS)
+
+    stframe.empty()
+    progress_bar.empty()
+    cancel_button.empty()
+    ip_video.empty()
+    txt.empty()
+
+
+if job is not None and job.status == 'failed':
+    warn.markdown(f'<p style="font-family:Helvetica; font-weight: bold; color: Red; font-size: 17px;">Processing failed: {job.error}</p>', unsafe_allow_html=True)
+
+elif job is not None and job.status == 'cancelled':
+    warn.info('Processing cancelled.')
 
 
-    
-    
 
+if job is not None and job.status == 'done' and os.path.exists(job.output_path):
+    with open(job.output_path, 'rb') as op_vid:
+        download = download_button.download_button('Download Video', data = op_vid, file_name='output_recorded.mp4')
     
+    if download:
+        st.session_state['download'] = True
 
 
+
+if job is not None and job.status == 'done' and os.path.exists(job.output_path) and st.session_state['download']:
+    os.remove(job.output_path)
+    st.session_state['download'] = False
+    st.session_state.pop('upload_job')
+    download_button.empty()
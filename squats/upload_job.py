@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+import cv2
+
+from squat_analysis import ProcessFrame, get_mediapipe_pose
+from squat_analysis.media import VideoReader, VideoWriter
+
+
+class UploadJob(threading.Thread):
+    """
+    Processes an uploaded video in the background, independent of the
+    Streamlit script run that started it.
+
+    The page polls `progress` and `latest_preview()`; only one preview
+    frame per 1/preview_fps seconds is kept, so processing speed is not tied
+    to how fast the browser can render frames. The input file is owned by
+    the job and removed once it finishes.
+    """
+
+    def __init__(self, input_path, output_path, thresholds, preview_fps=4.0):
+        super().__init__(daemon=True)
+        self.input_path = input_path
+        self.output_path = output_path
+        self.thresholds = thresholds
+        self.preview_interval = 1.0 / preview_fps
+
+        self.status = 'queued'
+        self.error = None
+        self.frames_done = 0
+        self.frames_total = 0
+
+        self._cancel = threading.Event()
+        self._preview_lock = threading.Lock()
+        self._preview = None
+        self._preview_id = 0
+
+    @property
+    def progress(self):
+        if not self.frames_total:
+            return 0.0
+        return min(1.0, self.frames_done / self.frames_total)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def latest_preview(self):
+        # (preview id, RGB frame); the id tells the page whether it is new
+        with self._preview_lock:
+            return self._preview_id, self._preview
+
+    def run(self):
+        self.status = 'running'
+        pose = None
+        vf = None
+        video_output = None
+
+        try:
+            # Decoding and encoding run on their own threads next to this one
+            vf = VideoReader(self.input_path)
+            self.frames_total = vf.frame_count
+            video_output = VideoWriter(self.output_path, vf.fps, (vf.width, vf.height))
+
+            processor = ProcessFrame(thresholds=self.thresholds)
+            pose = get_mediapipe_pose()
+            last_preview = 0.0
+
+            for frame in vf:
+                if self._cancel.is_set():
+                    break
+
+                # convert frame from BGR to RGB before processing it.
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                out_frame, _ = processor.process(frame, pose)
+                video_output.write(cv2.cvtColor(out_frame, cv2.COLOR_RGB2BGR))
+                self.frames_done += 1
+
+                now = time.monotonic()
+                if now - last_preview >= self.preview_interval:
+                    last_preview = now
+                    with self._preview_lock:
+                        self._preview = out_frame.copy()
+                        self._preview_id += 1
+
+            # Flush the encoder before the page can offer the file
+            video_output.close()
+            self.status = 'cancelled' if self._cancel.is_set() else 'done'
+
+        except Exception as e:
+            self.error = str(e)
+            self.status = 'failed'
+
+        finally:
+            if vf is not None:
+                vf.close()
+            if video_output is not None and self.status != 'done':
+                try:
+                    video_output.close()
+                except Exception:
+                    pass
+            if pose is not None:
+                pose.close()
+            if os.path.exists(self.input_path):
+                os.remove(self.input_path)
+            if self.status != 'done' and os.path.exists(self.output_path):
+                os.remove(self.output_path)